@@ -0,0 +1,196 @@
+import hashlib
+import itertools
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, List
+
+import numpy as np
+from spacy.language import Language
+from spacy.tokens import Doc, DocBin
+
+from dataset import KeyValueDataset, _field_values
+from initialize import DocCache, doc_cache
+
+"""
+Precomputed spaCy annotations of a dataset, so that the runs transforming
+or filtering it again and again don't parse it again.
+
+    annotate_dataset(dataset, "sst2-annotations", spacy_model())
+    with Annotations("sst2-annotations"):
+        dataset.apply_transformation(ChangePersonNamedEntities())
+
+The annotations (tokens, part-of-speech tags, dependencies, entities and
+sentence boundaries) are saved in a directory as DocBin files of chunk_size
+Docs, with an index of the hashes of the texts. While in use, they back the
+Doc cache of initialize.py: the operations parsing a text with parse() get
+its Doc from the annotations, provided they were made by the same pipeline
+package running the components the operation needs (or more). The chunks
+are read when first needed, and only a few are kept decoded: two while the
+texts are looked up in the order they were annotated (as in a full run),
+more once a chunk has to be decoded again (e.g. for the shuffled sample of
+a budgeted run), up to as many Docs as the Doc cache holds.
+"""
+
+META_FILE = "meta.json"
+INDEX_FILE = "index.npy"
+
+
+def _text_hash(text: str) -> int:
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _chunk_file(path: str, index: int) -> str:
+    return os.path.join(path, "chunk-{:05d}.spacy".format(index))
+
+
+# texts: the texts annotated
+# path: the directory the annotations are saved in
+# nlp: the spaCy pipeline annotating the texts
+# disable: the components of the pipeline not run
+# chunk_size: the number of Docs of every DocBin file
+# batch_size: the number of texts nlp.pipe parses at a time
+# n_process: the number of processes nlp.pipe parses with
+def annotate(
+    texts: Iterable[str],
+    path: str,
+    nlp: Language,
+    disable: Iterable[str] = (),
+    chunk_size: int = 1000,
+    batch_size: int = 64,
+    n_process: int = 1,
+) -> int:
+    """Annotates the texts and saves them in path, returns their number."""
+    disable = list(disable)
+    os.makedirs(path, exist_ok=True)
+    hashes = []
+    doc_bin = DocBin()
+    chunk_num = 0
+    parsed = nlp.pipe(
+        texts, disable=disable, batch_size=batch_size, n_process=n_process
+    )
+    for doc in parsed:
+        hashes.append(_text_hash(doc.text))
+        doc_bin.add(doc)
+        if len(doc_bin) == chunk_size:
+            doc_bin.to_disk(_chunk_file(path, chunk_num))
+            chunk_num += 1
+            doc_bin = DocBin()
+    if len(doc_bin) > 0:
+        doc_bin.to_disk(_chunk_file(path, chunk_num))
+    np.save(
+        os.path.join(path, INDEX_FILE), np.asarray(hashes, dtype=np.uint64)
+    )
+    meta = {
+        "pipeline": DocCache.pipeline_key(nlp, disable),
+        "chunk_size": chunk_size,
+        "doc_num": len(hashes),
+    }
+    with open(os.path.join(path, META_FILE), "w") as file:
+        json.dump(meta, file)
+    return len(hashes)
+
+
+# fields: the fields of a KeyValueDataset annotated, its first one (e.g.
+#   the sentence or the context) by default
+def annotate_dataset(
+    dataset, path: str, nlp: Language, fields: List[str] = None, **kwargs
+) -> int:
+    """
+    Annotates the texts of a TextLineDataset, or the given fields of a
+    KeyValueDataset, with the arguments of annotate.
+    """
+    if isinstance(dataset, KeyValueDataset):
+        fields = dataset.fields[:1] if fields is None else fields
+        texts = itertools.chain.from_iterable(
+            _field_values(dataset.data, field) for field in fields
+        )
+    else:
+        texts = iter(dataset.data)
+    return annotate(texts, path, nlp, **kwargs)
+
+
+class Annotations(object):
+    """
+    The annotations saved by annotate, backing the Doc cache of this
+    process while used as a context manager (or added to it with
+    doc_cache.add_store).
+    """
+
+    # path: the directory the annotations were saved in
+    # max_chunks: the number of DocBin files kept decoded, adapted to the
+    #   order the texts are looked up in by default
+    def __init__(self, path: str, max_chunks: int = None):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as file:
+            meta = json.load(file)
+        lang, name, version, components = meta["pipeline"]
+        self.pipeline_key = (lang, name, version, tuple(components))
+        self.chunk_size = meta["chunk_size"]
+        self._adaptive = max_chunks is None
+        self.max_chunks = 2 if max_chunks is None else max_chunks
+        # the chunks holding as many Docs as the Doc cache
+        self._chunk_limit = max(
+            self.max_chunks, -(-doc_cache.max_entries // self.chunk_size)
+        )
+        self.decoded_num = 0
+        self._decoded = set()
+        hashes = np.load(os.path.join(path, INDEX_FILE))
+        # the positions of the texts, sorted by hash
+        self._order = np.argsort(hashes, kind="stable")
+        self._hashes = hashes[self._order]
+        self._chunks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def covers(self, pipeline_key: tuple) -> bool:
+        return DocCache.covers(self.pipeline_key, pipeline_key)
+
+    def _chunk(self, vocab, index: int) -> List[Doc]:
+        # called with the lock held
+        docs = self._chunks.get(index)
+        if docs is None:
+            if self._adaptive and index in self._decoded:
+                # the texts aren't looked up in order
+                self.max_chunks = min(2 * self.max_chunks, self._chunk_limit)
+            doc_bin = DocBin().from_disk(_chunk_file(self.path, index))
+            docs = list(doc_bin.get_docs(vocab))
+            self.decoded_num += 1
+            self._decoded.add(index)
+            self._chunks[index] = docs
+            while len(self._chunks) > self.max_chunks:
+                self._chunks.popitem(last=False)
+        else:
+            self._chunks.move_to_end(index)
+        return docs
+
+    def get(self, nlp: Language, text: str, pipeline_key: tuple) -> Doc:
+        """
+        The annotated Doc of the text, None if the text wasn't annotated or
+        not with the components of the pipeline.
+        """
+        if not self.covers(pipeline_key):
+            return None
+        text_hash = np.uint64(_text_hash(text))
+        position = np.searchsorted(self._hashes, text_hash)
+        if (
+            position == len(self._hashes)
+            or self._hashes[position] != text_hash
+        ):
+            return None
+        index = int(self._order[position])
+        with self._lock:
+            chunk = self._chunk(nlp.vocab, index // self.chunk_size)
+        doc = chunk[index % self.chunk_size]
+        return doc if doc.text == text else None
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def __enter__(self):
+        doc_cache.add_store(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        doc_cache.remove_store(self)
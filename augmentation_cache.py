@@ -0,0 +1,178 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+from typing import Dict, Iterable, List
+
+"""
+A persistent, content-addressed cache of the outputs of transformations.
+
+Entries are keyed by the operation (its name, constructor arguments and seed)
+and a hash of the example it was applied on, and are kept in a local SQLite
+database. Once the database grows over max_size bytes, the least recently
+used entries are evicted.
+
+    cache = AugmentationCache("augmentations.sqlite")
+    dataset.apply_transformation(ButterFingersPerturbation(), cache=cache)
+"""
+
+
+class AugmentationCache(object):
+    # the number of entries evicted at a time once the cache is full
+    eviction_batch_size = 1000
+
+    def __init__(self, path: str, max_size: int = 1 << 30):
+        """
+        path: the SQLite database file, created if it does not exist.
+        max_size: the maximum total size (in bytes) of the cached outputs.
+        """
+        self.path = path
+        self.max_size = max_size
+        self._connection = None
+
+    def __getstate__(self):
+        # connections can't be shared between processes, every worker
+        # process opens its own one
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        return state
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._create_tables(self._connection)
+        return self._connection
+
+    @staticmethod
+    def _create_tables(connection: sqlite3.Connection):
+        with connection:
+            # write-ahead logging lets worker processes read while another
+            # one writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key BLOB PRIMARY KEY, value BLOB, size INTEGER, "
+                "last_used REAL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_last_used "
+                "ON entries(last_used)"
+            )
+            # the total size is kept up to date by triggers rather than
+            # summed over the whole table on every insertion
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS total (size INTEGER)"
+            )
+            if connection.execute("SELECT size FROM total").fetchone() is None:
+                connection.execute("INSERT INTO total VALUES (0)")
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT "
+                "ON entries BEGIN "
+                "UPDATE total SET size = size + new.size; END"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE "
+                "ON entries BEGIN "
+                "UPDATE total SET size = size - old.size; END"
+            )
+
+    @staticmethod
+    def operation_key(operation, adapter: str = "") -> bytes:
+        """
+        Identifies the outputs of an operation: its class, constructor
+        arguments and seed, and the adapter applying it to the datapoints.
+        """
+        cls, args, kwargs = operation.init_spec()
+        description = repr(
+            (
+                cls.__module__,
+                cls.__name__,
+                args,
+                sorted(kwargs.items()),
+                operation.seed,
+                adapter,
+            )
+        )
+        return hashlib.blake2b(
+            description.encode("utf-8"), digest_size=16
+        ).digest()
+
+    @staticmethod
+    def example_key(operation_key: bytes, content_hash: bytes) -> bytes:
+        return hashlib.blake2b(
+            operation_key + content_hash, digest_size=16
+        ).digest()
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, object]:
+        """Returns the cached outputs of the keys found in the cache."""
+        found = {}
+        if not keys:
+            return found
+        connection = self.connection
+        # SQLite limits the number of parameters of a query
+        for start in range(0, len(keys), 500):
+            batch = keys[start : start + 500]
+            rows = connection.execute(
+                "SELECT key, value FROM entries WHERE key IN ({})".format(
+                    ", ".join("?" * len(batch))
+                ),
+                batch,
+            ).fetchall()
+            for key, value in rows:
+                found[bytes(key)] = pickle.loads(value)
+        if found:
+            now = time.time()
+            with connection:
+                connection.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+        return found
+
+    def put_many(self, items: Iterable):
+        """Caches the outputs of every (key, outputs) pair."""
+        now = time.time()
+        entries = []
+        for key, value in items:
+            value = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            entries.append((key, value, len(value), now))
+        if not entries:
+            return
+        connection = self.connection
+        with connection:
+            # the outputs of a key never change, existing ones are kept
+            connection.executemany(
+                "INSERT OR IGNORE INTO entries VALUES (?, ?, ?, ?)", entries
+            )
+        self._evict()
+
+    def _evict(self):
+        connection = self.connection
+        while self.size() > self.max_size:
+            with connection:
+                connection.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM "
+                    "entries ORDER BY last_used LIMIT ?)",
+                    (self.eviction_batch_size,),
+                )
+
+    def size(self) -> int:
+        return self.connection.execute("SELECT size FROM total").fetchone()[0]
+
+    def __len__(self):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM entries"
+        ).fetchone()[0]
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM entries")
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -1,9 +1,25 @@
 from __future__ import annotations
 
-from typing import Iterable, List
-
+import asyncio
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import time
+from collections import deque
+from collections.abc import Mapping
+from collections.abc import Sequence as SequenceABC
+from functools import cached_property, partial
+from typing import Callable, Iterable, List, Sequence
+
+import numpy as np
 from tqdm import tqdm
 
+from augmentation_cache import AugmentationCache
+from example_timeout import ExampleTimeoutGuard
+from exporters import DatasetWriter, open_writer
 from interfaces import Operation
 from interfaces.QuestionAnswerOperation import QuestionAnswerOperation
 from interfaces.SentenceOperation import (
@@ -11,13 +27,1345 @@ from interfaces.SentenceOperation import (
     SentenceAndTargetsOperation,
     SentenceOperation,
 )
+from run_stats import TransformationStats
 from tasks.TaskTypes import TaskType
 
+try:
+    import pyarrow as pa
+except ImportError:  # only needed by the columnar backend
+    pa = None
+
+"""
+Helpers shared by the datasets to run an operation over their data, batch by
+batch, either serially or chunk by chunk in a pool of worker processes.
+"""
+
+# the operation, adapter function, batch size, cache and timeout guard held
+# by each worker
+_worker_transformation = None
+_worker_transform_func = None
+_worker_batch_size = None
+_worker_cache = None
+_worker_guard = None
+
+
+def _batched(data: Iterable, batch_size: int) -> Iterable[Sequence]:
+    if isinstance(data, SequenceABC):
+        # slices keep the storage of the data, e.g. columnar
+        for start in range(0, len(data), batch_size):
+            yield data[start : start + batch_size]
+        return
+    batch = []
+    for datapoint in data:
+        batch.append(datapoint)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# keys: the key of every datapoint (see BaseDataset.example_keys), either a
+#   numpy array of indices or a list, None for the indices 0, 1...
+def _keys_at(keys: Sequence, indices: Iterable[int]) -> List:
+    """The keys of the datapoints at the given indices, as python objects."""
+    if keys is None:
+        return [int(index) for index in indices]
+    if isinstance(keys, np.ndarray):
+        return keys[np.asarray(indices, dtype=np.int64)].tolist()
+    return [keys[index] for index in indices]
+
+
+def _taken_keys(keys: Sequence, indices: Iterable[int]) -> Sequence:
+    # the keys of a view of the datapoints at the given indices
+    indices = np.asarray(indices, dtype=np.int64)
+    if keys is None:
+        return indices.copy()
+    if isinstance(keys, np.ndarray):
+        return keys[indices]
+    return [keys[index] for index in indices]
+
+
+def _output_keys(source_keys: List, outputs: List[List]) -> List:
+    # the j-th output of a datapoint is keyed by (the key of the datapoint,
+    # j), as the outputs of a Pipeline stage
+    return [
+        (key, j)
+        for key, pt_examples in zip(source_keys, outputs)
+        for j in range(len(pt_examples))
+    ]
+
+
+def _source_index(key) -> int:
+    # the index in the whole source dataset of the datapoint a key comes
+    # from, through the transformations the datapoint went through
+    while isinstance(key, tuple):
+        key = key[0]
+    return key
+
+
+def _init_transformation_worker(
+    spec, transform_func: Callable, batch_size: int, cache=None, guard=None
+):
+    global _worker_transformation, _worker_transform_func, _worker_batch_size
+    global _worker_cache, _worker_guard
+    # build the operation once per worker rather than once per chunk
+    cls, args, kwargs = spec
+    _worker_transformation = cls(*args, **kwargs)
+    _worker_transform_func = transform_func
+    _worker_batch_size = batch_size
+    _worker_cache = cache
+    _worker_guard = guard
+
+
+def _adapter_key(transform_func: Callable) -> str:
+    # the adapters of a KeyValueDataset also depend on its fields
+    adapter = transform_func.__qualname__
+    owner = getattr(transform_func, "__self__", None)
+    if owner is not None:
+        adapter += repr(getattr(owner, "fields", None))
+    return adapter
+
+
+def _cache_keys(
+    operation_key: bytes, batch: Sequence, example_keys: List
+) -> List[bytes]:
+    # the outputs depend on the key of the datapoint as well as its content
+    contents = (
+        [repr(example_key), datapoint]
+        if isinstance(datapoint, str)
+        else [repr(example_key)]
+        + [item for pair in datapoint.items() for item in pair]
+        for example_key, datapoint in zip(example_keys, batch)
+    )
+    return [
+        AugmentationCache.example_key(operation_key, content_hash.tobytes())
+        for content_hash in _content_hashes(contents)
+    ]
+
+
+def _cached_outputs(pt_examples: List) -> List:
+    # rows sharing their storage with the data are stored as plain dicts
+    return [
+        dict(pt_example) if isinstance(pt_example, Mapping) else pt_example
+        for pt_example in pt_examples
+    ]
+
+
+def _guarded_transform(
+    transform_func: Callable,
+    transformation: Operation,
+    batch: Sequence,
+    example_keys: List,
+    guard: ExampleTimeoutGuard,
+):
+    """
+    Transforms the datapoints one at a time, within the time limit of the
+    guard. The datapoints timing out, or skipped once the guard disabled the
+    transformation, get their unchanged input as output. Returns the outputs
+    and the indices of those datapoints.
+    """
+    outputs = []
+    fallbacks = []
+    for index, key in enumerate(example_keys):
+        with Operation.example_keys([key]):
+            completed, pt_examples = guard.call(
+                transform_func, _take(batch, [index]), transformation
+            )
+        if completed:
+            outputs.extend(pt_examples)
+        else:
+            outputs.append([batch[index]])
+            fallbacks.append(index)
+    return outputs, fallbacks
+
+
+def _call_transform(
+    transform_func: Callable,
+    transformation: Operation,
+    batch: Sequence,
+    example_keys: List,
+    guard: ExampleTimeoutGuard = None,
+):
+    # the outputs, and the indices of the datapoints left unchanged by guard
+    if guard is not None:
+        return _guarded_transform(
+            transform_func, transformation, batch, example_keys, guard
+        )
+    with Operation.example_keys(example_keys):
+        return transform_func(batch, transformation), []
+
+
+def _transform_batch(
+    transform_func: Callable,
+    transformation: Operation,
+    batch: Sequence,
+    example_keys: List,
+    cache: AugmentationCache = None,
+    operation_key: bytes = None,
+    guard: ExampleTimeoutGuard = None,
+):
+    # the outputs, and the set of the indices of the datapoints left
+    # unchanged by guard
+    if cache is None:
+        outputs, fallbacks = _call_transform(
+            transform_func, transformation, batch, example_keys, guard
+        )
+        return outputs, set(fallbacks)
+    keys = _cache_keys(operation_key, batch, example_keys)
+    found = cache.get_many(keys)
+    # the operation only runs on the datapoints missing from the cache
+    missing = [index for index, key in enumerate(keys) if key not in found]
+    batch_fallbacks = set()
+    if missing:
+        missing_outputs, fallbacks = _call_transform(
+            transform_func,
+            transformation,
+            _take(batch, missing),
+            [example_keys[index] for index in missing],
+            guard,
+        )
+        # the unchanged inputs of the datapoints timing out aren't cached
+        fallbacks = set(fallbacks)
+        cache.put_many(
+            (keys[index], _cached_outputs(pt_examples))
+            for position, (index, pt_examples) in enumerate(
+                zip(missing, missing_outputs)
+            )
+            if position not in fallbacks
+        )
+        found.update(
+            (keys[index], pt_examples)
+            for index, pt_examples in zip(missing, missing_outputs)
+        )
+        batch_fallbacks = {missing[position] for position in fallbacks}
+    return [found[key] for key in keys], batch_fallbacks
+
+
+def _transform_chunk(
+    transform_func: Callable,
+    transformation: Operation,
+    chunk: Sequence,
+    batch_size: int,
+    cache: AugmentationCache = None,
+    keys: List = None,
+    guard: ExampleTimeoutGuard = None,
+):
+    """
+    Transforms a chunk of datapoints, keyed by the given keys (their index
+    in the chunk by default). Returns the outputs of every
+    datapoint, the number of successful and failed perturbations, the
+    (time, size) of every batch and the number of datapoints which timed
+    out and were skipped by the guard, which aren't counted as successful
+    or failed perturbations.
+    """
+    outputs = []
+    successful_num = 0
+    failed_num = 0
+    batch_times = []
+    if guard is not None:
+        guard_num = (guard.timeout_num, guard.skipped_num)
+        # the guard transforms the datapoints one at a time, each of them is
+        # then timed on its own
+        batch_size = 1
+    operation_key = None
+    if cache is not None:
+        operation_key = AugmentationCache.operation_key(
+            transformation, _adapter_key(transform_func)
+        )
+    for batch in _batched(chunk, batch_size):
+        example_keys = _keys_at(
+            keys, range(len(outputs), len(outputs) + len(batch))
+        )
+        start_time = time.perf_counter()
+        batch_outputs, fallbacks = _transform_batch(
+            transform_func,
+            transformation,
+            batch,
+            example_keys,
+            cache,
+            operation_key,
+            guard,
+        )
+        batch_times.append((time.perf_counter() - start_time, len(batch)))
+        for index, (datapoint, pt_examples) in enumerate(
+            zip(batch, batch_outputs)
+        ):
+            outputs.append(pt_examples)
+            # the datapoints left unchanged by the guard weren't perturbed
+            # at all, they are counted as timeouts instead
+            if index in fallbacks:
+                continue
+            successful_pt, failed_pt = transformation.compare(
+                datapoint, pt_examples
+            )
+            successful_num += successful_pt
+            failed_num += failed_pt
+    timeout_nums = (0, 0)
+    if guard is not None:
+        timeout_nums = (
+            guard.timeout_num - guard_num[0],
+            guard.skipped_num - guard_num[1],
+        )
+    return outputs, successful_num, failed_num, batch_times, timeout_nums
+
+
+def _transform_chunk_in_worker(job):
+    keys, chunk = job
+    return _transform_chunk(
+        _worker_transform_func,
+        _worker_transformation,
+        chunk,
+        _worker_batch_size,
+        _worker_cache,
+        keys,
+        _worker_guard,
+    )
+
+
+class _TransformationCheckpoint(object):
+    """
+    Work directory of a transformation run, holding the outputs of every
+    completed chunk and the running counters, so that an interrupted run
+    can resume after its last completed chunk.
+    """
+
+    def __init__(self, directory: str, fingerprint: str):
+        self.directory = directory
+        self.fingerprint = fingerprint
+        self.state_path = os.path.join(directory, "state.json")
+        os.makedirs(directory, exist_ok=True)
+
+    def _chunk_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"chunk-{index:06d}.pkl")
+
+    @staticmethod
+    def _write(path: str, content: bytes):
+        # written next to the final file then renamed, so that a crash never
+        # leaves a partially written file behind
+        with open(path + ".tmp", "wb") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+
+    def load(self):
+        """
+        Returns the outputs of the completed chunks, the running counters
+        and the number of completed chunks.
+        """
+        if not os.path.exists(self.state_path):
+            return [], 0, 0, 0
+        with open(self.state_path) as file:
+            state = json.load(file)
+        if state["fingerprint"] != self.fingerprint:
+            raise ValueError(
+                f"The checkpoint in {self.directory} belongs to another run "
+                "(different operation, data size or chunk size)."
+            )
+        outputs = []
+        for index in range(state["completed_chunks"]):
+            with open(self._chunk_path(index), "rb") as file:
+                outputs.extend(pickle.load(file))
+        return (
+            outputs,
+            state["successful_num"],
+            state["failed_num"],
+            state["completed_chunks"],
+        )
+
+    def save(
+        self,
+        index: int,
+        chunk_outputs: List,
+        successful_num: int,
+        failed_num: int,
+    ):
+        # the chunk is written before the state which refers to it
+        chunk_outputs = [
+            _cached_outputs(pt_examples) for pt_examples in chunk_outputs
+        ]
+        self._write(
+            self._chunk_path(index),
+            pickle.dumps(chunk_outputs, protocol=pickle.HIGHEST_PROTOCOL),
+        )
+        state = {
+            "fingerprint": self.fingerprint,
+            "completed_chunks": index + 1,
+            "successful_num": successful_num,
+            "failed_num": failed_num,
+        }
+        self._write(self.state_path, json.dumps(state).encode("utf-8"))
+
+
+def _run_transformation(
+    transform_func: Callable,
+    transformation: Operation,
+    data: Sequence,
+    batch_size: int = 32,
+    num_workers: int = 0,
+    chunk_size: int = 1000,
+    cache: AugmentationCache = None,
+    checkpoint_dir: str = None,
+    keys: Sequence = None,
+    guard: ExampleTimeoutGuard = None,
+):
+    """
+    Applies transform_func(batch, transformation) to every batch of
+    datapoints, which returns the list of outputs of each datapoint.
+    Returns the outputs of every datapoint (in the original order), the
+    number of successful and failed perturbations and the TransformationStats
+    of the run (which only cover the chunks transformed by this run).
+
+    batch_size: the number of datapoints passed to the operation at a time.
+    num_workers: the number of worker processes, 0 runs in this process.
+    chunk_size: the number of datapoints sent to a worker at a time.
+    cache: an AugmentationCache, the datapoints found in it are not
+        transformed again.
+    checkpoint_dir: a work directory where every completed chunk is saved,
+        a run given the directory of an interrupted one resumes after its
+        last completed chunk.
+    keys: the key of every datapoint (see BaseDataset.example_keys), their
+        index by default.
+    guard: an ExampleTimeoutGuard limiting the time taken by every
+        datapoint, which are then transformed one at a time.
+    """
+    outputs = []
+    successful_num = 0
+    failed_num = 0
+    completed_chunks = 0
+    checkpoint = None
+    stats = TransformationStats(transformation.name())
+    stats.start()
+    if checkpoint_dir is not None:
+        fingerprint = "{}-{}-{}".format(
+            AugmentationCache.operation_key(
+                transformation, _adapter_key(transform_func)
+            ).hex(),
+            len(data),
+            chunk_size,
+        )
+        checkpoint = _TransformationCheckpoint(checkpoint_dir, fingerprint)
+        (
+            outputs,
+            successful_num,
+            failed_num,
+            completed_chunks,
+        ) = checkpoint.load()
+    chunks = (
+        (
+            _keys_at(keys, range(start, min(start + chunk_size, len(data)))),
+            data[start : start + chunk_size],
+        )
+        for start in range(
+            completed_chunks * chunk_size, len(data), chunk_size
+        )
+    )
+    with tqdm(total=len(data), initial=len(outputs)) as progress:
+        with contextlib.ExitStack() as stack:
+            if num_workers > 0:
+                pool = stack.enter_context(
+                    multiprocessing.Pool(
+                        num_workers,
+                        initializer=_init_transformation_worker,
+                        initargs=(
+                            transformation.init_spec(),
+                            transform_func,
+                            batch_size,
+                            cache,
+                            guard,
+                        ),
+                    )
+                )
+                # imap keeps the chunks in their original order
+                results = pool.imap(_transform_chunk_in_worker, chunks)
+            else:
+                results = (
+                    _transform_chunk(
+                        transform_func,
+                        transformation,
+                        chunk,
+                        batch_size,
+                        cache,
+                        chunk_keys,
+                        guard,
+                    )
+                    for chunk_keys, chunk in chunks
+                )
+            for index, result in enumerate(results, completed_chunks):
+                (
+                    chunk_outputs,
+                    successful_pt,
+                    failed_pt,
+                    batch_times,
+                    timeout_nums,
+                ) = result
+                outputs.extend(chunk_outputs)
+                successful_num += successful_pt
+                failed_num += failed_pt
+                stats.add_outputs(len(chunk_outputs), successful_pt, failed_pt)
+                stats.add_batches(*zip(*batch_times))
+                stats.add_timeouts(*timeout_nums)
+                if checkpoint is not None:
+                    checkpoint.save(
+                        index, chunk_outputs, successful_num, failed_num
+                    )
+                progress.update(len(chunk_outputs))
+    stats.stop()
+    return outputs, successful_num, failed_num, stats
+
+
+class _GenerateArguments(Exception):
+    pass
+
+
+class _BatchReplay(object):
+    """
+    Stands in for the transformation given to an adapter function, to read
+    the arguments the adapter passes to generate_batch, or to hand it the
+    outputs generated elsewhere.
+    """
+
+    def __init__(self, outputs: List = None):
+        self.outputs = outputs
+        self.batches = None
+
+    def generate_batch(self, *batches: List) -> List:
+        if self.outputs is None:
+            self.batches = batches
+            raise _GenerateArguments()
+        return self.outputs
+
+
+def _generate_arguments(transform_func: Callable, batch: Sequence) -> List:
+    # the arguments of generate for every datapoint of the batch
+    replay = _BatchReplay()
+    try:
+        transform_func(batch, replay)
+    except _GenerateArguments:
+        pass
+    return list(zip(*replay.batches))
+
+
+async def _run_transformation_async(
+    transform_func: Callable,
+    transformation: Operation,
+    data: Sequence,
+    batch_size: int = 32,
+    max_concurrency: int = 16,
+    keys: Sequence = None,
+):
+    """
+    Same as _run_transformation, awaiting transformation.generate_async on
+    every datapoint with at most max_concurrency of them in flight at once.
+    The outputs are kept in the original order, and each datapoint is keyed
+    by its key as in the other runs.
+    """
+    outputs = []
+    successful_num = 0
+    failed_num = 0
+    stats = TransformationStats(transformation.name())
+    stats.start()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def generate(key, arguments):
+        async with semaphore:
+            start_time = time.perf_counter()
+            with Operation.example_key(key):
+                output = await transformation.generate_async(*arguments)
+            return output, time.perf_counter() - start_time
+
+    # the batches whose datapoints are in flight, oldest first: enough
+    # batches are scheduled ahead to keep max_concurrency requests running
+    pending = deque()
+    pending_num = 0
+    batches = iter(_batched(data, batch_size))
+    try:
+        with tqdm(total=len(data)) as progress:
+            while True:
+                while pending_num < max_concurrency + batch_size:
+                    batch = next(batches, None)
+                    if batch is None:
+                        break
+                    start = len(outputs) + pending_num
+                    batch_keys = _keys_at(
+                        keys, range(start, start + len(batch))
+                    )
+                    arguments = _generate_arguments(transform_func, batch)
+                    results = asyncio.gather(
+                        *(
+                            generate(key, example)
+                            for key, example in zip(batch_keys, arguments)
+                        )
+                    )
+                    pending.append((batch, results))
+                    pending_num += len(batch)
+                if not pending:
+                    break
+                batch, results = pending.popleft()
+                generated, latencies = zip(*await results)
+                pending_num -= len(batch)
+                batch_outputs = transform_func(
+                    batch, _BatchReplay(list(generated))
+                )
+                batch_successful_num = 0
+                batch_failed_num = 0
+                for datapoint, pt_examples in zip(batch, batch_outputs):
+                    successful_pt, failed_pt = transformation.compare(
+                        datapoint, pt_examples
+                    )
+                    batch_successful_num += successful_pt
+                    batch_failed_num += failed_pt
+                    outputs.append(pt_examples)
+                successful_num += batch_successful_num
+                failed_num += batch_failed_num
+                stats.add_outputs(
+                    len(batch), batch_successful_num, batch_failed_num
+                )
+                # the latency of every datapoint is known on its own
+                stats.add_batches(list(latencies), [1] * len(batch))
+                progress.update(len(batch))
+    finally:
+        # a failed request cancels the ones still in flight
+        for _, results in pending:
+            results.cancel()
+    stats.stop()
+    return outputs, successful_num, failed_num, stats
+
+
+def _sample_order(
+    length: int, seed: int = 0, strata: Sequence = None
+) -> np.ndarray:
+    """
+    The order in which a budgeted run visits the datapoints: a random
+    permutation, so that the datapoints transformed before the budget runs
+    out are a uniform sample of the dataset. Given the stratum (e.g. the
+    label) of every datapoint, every prefix of the order also holds the
+    strata in their proportions in the dataset.
+    """
+    order = np.random.RandomState(seed).permutation(length)
+    if strata is None or length == 0:
+        return order
+    _, inverse, counts = np.unique(
+        np.asarray(strata)[order], return_inverse=True, return_counts=True
+    )
+    # the rank of every datapoint in its stratum, as a fraction of the
+    # stratum: sorting by it interleaves the strata
+    grouped = np.argsort(inverse, kind="stable")
+    starts = np.cumsum(counts) - counts
+    ranks = np.empty(length, dtype=np.int64)
+    ranks[grouped] = np.arange(length) - np.repeat(starts, counts)
+    fractions = (ranks + 0.5) / counts[inverse]
+    return order[np.argsort(fractions, kind="stable")]
+
+
+def _run_budgeted_transformation(
+    transform_func: Callable,
+    transformation: Operation,
+    data: Sequence,
+    order: np.ndarray,
+    batch_size: int = 32,
+    max_perturbed: int = None,
+    time_budget: float = None,
+    cache: AugmentationCache = None,
+    keys: Sequence = None,
+    guard: ExampleTimeoutGuard = None,
+):
+    """
+    Transforms the datapoints in the given order (see _sample_order) until
+    max_perturbed perturbed outputs have been generated or time_budget
+    seconds have passed, which is checked after every batch. The datapoints
+    are keyed as in a full run, so each one gets the same outputs. Returns the outputs and the indices of
+    the datapoints transformed, the number of successful and failed
+    perturbations and the TransformationStats of the run.
+    """
+    outputs = []
+    indices = []
+    successful_num = 0
+    failed_num = 0
+    stats = TransformationStats(transformation.name())
+    stats.start()
+    run_start_time = time.perf_counter()
+    operation_key = None
+    if cache is not None:
+        operation_key = AugmentationCache.operation_key(
+            transformation, _adapter_key(transform_func)
+        )
+    with tqdm(total=len(order)) as progress:
+        for start in range(0, len(order), batch_size):
+            batch_indices = order[start : start + batch_size]
+            batch = _take(data, batch_indices)
+            start_time = time.perf_counter()
+            batch_outputs, fallbacks = _transform_batch(
+                transform_func,
+                transformation,
+                batch,
+                _keys_at(keys, batch_indices),
+                cache,
+                operation_key,
+                guard,
+            )
+            stats.add_batches([time.perf_counter() - start_time], [len(batch)])
+            batch_successful_num = 0
+            batch_failed_num = 0
+            for index, (datapoint, pt_examples) in enumerate(
+                zip(batch, batch_outputs)
+            ):
+                if index in fallbacks:
+                    continue
+                successful_pt, failed_pt = transformation.compare(
+                    datapoint, pt_examples
+                )
+                batch_successful_num += successful_pt
+                batch_failed_num += failed_pt
+            successful_num += batch_successful_num
+            failed_num += batch_failed_num
+            stats.add_outputs(
+                len(batch), batch_successful_num, batch_failed_num
+            )
+            outputs.extend(batch_outputs)
+            indices.extend(batch_indices)
+            progress.update(len(batch))
+            if max_perturbed is not None and successful_num >= max_perturbed:
+                break
+            if (
+                time_budget is not None
+                and time.perf_counter() - run_start_time >= time_budget
+            ):
+                break
+    if guard is not None:
+        stats.add_timeouts(guard.timeout_num, guard.skipped_num)
+    stats.stop()
+    return (
+        outputs,
+        np.asarray(indices, dtype=np.int64),
+        successful_num,
+        failed_num,
+        stats,
+    )
+
+
+def _check_budgeted_run(num_workers: int, checkpoint_dir: str):
+    if num_workers > 0 or checkpoint_dir is not None:
+        raise ValueError(
+            "A budgeted run (max_perturbed or time_budget) runs in this "
+            "process, without checkpoints."
+        )
+
+
+def _timeout_guard(
+    example_timeout: float, max_timeouts: int
+) -> ExampleTimeoutGuard:
+    if example_timeout is None:
+        return None
+    guard = ExampleTimeoutGuard(example_timeout, max_timeouts)
+    guard.check()
+    return guard
+
+
+def _print_timeout_summary(stats: TransformationStats):
+    if stats.timeout_num == 0 and stats.skipped_num == 0:
+        return
+    print(
+        "{} examples timed out and {} were skipped after too many timeouts, all left unchanged".format(
+            stats.timeout_num, stats.skipped_num
+        )
+    )
+
+
+def _run_transformations(
+    transform_func: Callable,
+    transformations: List[Operation],
+    data: Sequence,
+    batch_size: int = 32,
+    keys: Sequence = None,
+):
+    """
+    Applies every transformation in a single pass over the data: each batch
+    is read (e.g. decoded from a TextBuffer) once and given to every
+    transformation in turn, with the same example keys as in a run of the
+    transformation alone. Returns the (outputs, number of successful and
+    failed perturbations, TransformationStats) of every transformation, the
+    wall time of which is that of the whole pass.
+    """
+    outputs = [[] for _ in transformations]
+    stats = [
+        TransformationStats(transformation.name())
+        for transformation in transformations
+    ]
+    for transformation_stats in stats:
+        transformation_stats.start()
+    data_num = 0
+    with tqdm(total=len(data)) as progress:
+        for batch in _batched(data, batch_size):
+            batch = _materialized(batch)
+            if isinstance(batch, TextBuffer):
+                batch = list(batch)
+            batch_keys = _keys_at(keys, range(data_num, data_num + len(batch)))
+            for index, transformation in enumerate(transformations):
+                start_time = time.perf_counter()
+                with Operation.example_keys(batch_keys):
+                    batch_outputs = transform_func(batch, transformation)
+                stats[index].add_batches(
+                    [time.perf_counter() - start_time], [len(batch)]
+                )
+                successful_num = 0
+                failed_num = 0
+                for datapoint, pt_examples in zip(batch, batch_outputs):
+                    successful_pt, failed_pt = transformation.compare(
+                        datapoint, pt_examples
+                    )
+                    successful_num += successful_pt
+                    failed_num += failed_pt
+                outputs[index].extend(batch_outputs)
+                stats[index].add_outputs(
+                    len(batch), successful_num, failed_num
+                )
+            data_num += len(batch)
+            progress.update(len(batch))
+    runs = []
+    for transformation_outputs, transformation_stats in zip(outputs, stats):
+        transformation_stats.stop()
+        runs.append(
+            (
+                transformation_outputs,
+                transformation_stats.successful_num,
+                transformation_stats.failed_num,
+                transformation_stats,
+            )
+        )
+    return runs
+
+
+def _provenance(
+    transformation: Operation, outputs: List[List], source_keys: List
+) -> dict:
+    # the transformation (with its constructor arguments), the indices in
+    # the whole source dataset of the datapoints transformed (a sample of
+    # them in a budgeted run), given their keys, and of the datapoint every
+    # output comes from
+    transformed_indices = np.asarray(
+        [_source_index(key) for key in source_keys], dtype=np.int64
+    )
+    return {
+        "transformation": transformation.name(),
+        "init_args": transformation.init_args,
+        "init_kwargs": transformation.init_kwargs,
+        "transformed_indices": transformed_indices,
+        "source_indices": np.repeat(
+            transformed_indices,
+            [len(pt_examples) for pt_examples in outputs],
+        ),
+    }
+
+
+def _print_transformation_summary(data_num, successful_num, failed_num):
+    total_num = successful_num + failed_num
+    print(
+        "Finished transformation! {} examples generated from {} original examples, with {} successfully transformed and {} unchanged ({} perturb rate)".format(
+            total_num,
+            data_num,
+            successful_num,
+            failed_num,
+            successful_num / total_num if total_num > 0 else 0,
+        )
+    )
+
+
+def _run_filter(
+    filter_func: Callable,
+    filter: Operation,
+    data: Sequence,
+    batch_size: int,
+    keys: Sequence = None,
+) -> List[bool]:
+    """
+    Applies filter_func(batch, filter) to every batch of datapoints and
+    returns whether each datapoint passes the filter. The datapoints are
+    keyed by their keys (see BaseDataset.example_keys).
+    """
+    passed = []
+    with tqdm(total=len(data)) as progress:
+        for start in range(0, len(data), batch_size):
+            batch = data[start : start + batch_size]
+            batch_keys = _keys_at(keys, range(start, start + len(batch)))
+            with Operation.example_keys(batch_keys):
+                passed.extend(filter_func(batch, filter))
+            progress.update(len(batch))
+    return passed
+
+
+def _filter_sentences(sentences: List[str], filter: SentenceOperation):
+    return filter.filter_batch(list(sentences))
+
+
+def _generate_sentences(
+    sentences: List[str], transformation: SentenceOperation
+):
+    return transformation.generate_batch(list(sentences))
+
+
+def _field_values(datapoints: Sequence, field: str) -> List:
+    datapoints = _materialized(datapoints)
+    if isinstance(datapoints, ColumnarData):
+        return datapoints.column(field)
+    return [datapoint[field] for datapoint in datapoints]
+
+
+def _with_values(datapoint: Mapping, values: dict) -> Mapping:
+    # don't want the original datapoint to be changed
+    if isinstance(datapoint, dict):
+        return {**datapoint, **values}
+    return UpdatedRow(datapoint, values)
+
+
+def _huggingface_table(dataset, max_size: int = None):
+    """
+    Returns a zero-copy slice of the arrow table holding the first max_size
+    rows of a HuggingFace dataset, or None if the dataset isn't stored as is
+    (e.g. it has an indices mapping after a shuffle, or an output format).
+    """
+    size = len(dataset) if max_size is None else min(max_size, len(dataset))
+    if (
+        getattr(dataset, "_indices", None) is None
+        and getattr(dataset, "format", {}).get("type") is None
+        and hasattr(getattr(dataset, "data", None), "slice")
+    ):
+        return dataset.data.slice(0, size)
+    return None
+
+
+def _huggingface_columns(dataset, columns: List[str], max_size: int = None):
+    """
+    Reads the given columns of the first max_size rows of a HuggingFace
+    dataset (or of a list of dicts), without decoding the other rows.
+    Returns a dict mapping each column to the list of its values.
+    """
+    table = _huggingface_table(dataset, max_size)
+    if table is not None:
+        # converted one column at a time
+        return {column: table.column(column).to_pylist() for column in columns}
+    size = len(dataset) if max_size is None else min(max_size, len(dataset))
+    # slicing the dataset decodes only the sliced rows
+    rows = dataset[:size]
+    if isinstance(rows, dict):
+        return {column: rows[column] for column in columns}
+    return {column: [row[column] for row in rows] for column in columns}
+
+
+"""
+Helpers for the set operations of the datasets, which compare datapoints by a
+compact hash of their content rather than by the content itself.
+"""
+
+# the number of bytes of the content hashes (8 or 16)
+CONTENT_HASH_SIZE = 16
+
+
+def _content_hashes(
+    datapoints: Iterable[Iterable], digest_size: int = None
+) -> np.ndarray:
+    """
+    Hashes the values of every datapoint (e.g. the values of its fields)
+    into an array holding one fixed-size hash per datapoint.
+    """
+    digest_size = digest_size or CONTENT_HASH_SIZE
+    digests = bytearray()
+    for values in datapoints:
+        content_hash = hashlib.blake2b(digest_size=digest_size)
+        for value in values:
+            if not isinstance(value, str):
+                value = repr(value)
+            encoded = value.encode("utf-8")
+            # the length prefix keeps e.g. ("a|", "b") and ("a", "|b") apart
+            content_hash.update(len(encoded).to_bytes(8, "little"))
+            content_hash.update(encoded)
+        digests += content_hash.digest()
+    return np.frombuffer(bytes(digests), dtype=np.dtype(f"V{digest_size}"))
+
+
+def _first_occurrences(hashes: np.ndarray) -> np.ndarray:
+    # the indices of the first occurrence of every hash, in their order
+    _, indices = np.unique(hashes, return_index=True)
+    return np.sort(indices)
+
+
+def _take(data: Sequence, indices: Iterable[int]) -> Sequence:
+    if isinstance(data, (ColumnarData, TextBuffer)):
+        return data.take(indices)
+    if isinstance(data, np.ndarray):
+        return data[np.asarray(indices, dtype=np.int64)]
+    return [data[index] for index in indices]
+
+
+def _concat(data: Sequence, other_data: Sequence) -> Sequence:
+    for storage in (ColumnarData, TextBuffer):
+        if isinstance(data, storage) and isinstance(other_data, storage):
+            return data + other_data
+    if isinstance(data, np.ndarray) and isinstance(other_data, np.ndarray):
+        return np.concatenate([data, other_data])
+    return list(data) + list(other_data)
+
+
+class ColumnarRow(Mapping):
+    """
+    Read-only datapoint of a ColumnarData, reading its values from the
+    columns of the batch it was converted with.
+    """
+
+    __slots__ = ("_columns", "_index")
+
+    def __init__(self, columns: dict, index: int):
+        self._columns = columns
+        self._index = index
+
+    def __getitem__(self, key):
+        return self._columns[key][self._index]
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def copy(self) -> dict:
+        return dict(self)
+
+
+class UpdatedRow(Mapping):
+    """
+    Datapoint with some of its values replaced, sharing the other values
+    with the original datapoint instead of copying it.
+    """
+
+    __slots__ = ("_datapoint", "_values")
+
+    def __init__(self, datapoint: Mapping, values: dict):
+        self._datapoint = datapoint
+        self._values = values
+
+    def __getitem__(self, key):
+        if key in self._values:
+            return self._values[key]
+        return self._datapoint[key]
+
+    def __iter__(self):
+        yield from self._datapoint
+        for key in self._values:
+            if key not in self._datapoint:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def copy(self) -> dict:
+        return dict(self)
+
+
+def _read_arrow_stream(buffer) -> ColumnarData:
+    return ColumnarData(pa.ipc.open_stream(buffer).read_all())
+
+
+class ColumnarData(SequenceABC):
+    """
+    Column-oriented storage of key-value datapoints, backed by a pyarrow
+    Table. Slices are zero-copy views and datapoints are exposed as
+    read-only mappings (ColumnarRow) instead of dicts.
+    """
+
+    # number of rows converted to python objects at a time when iterating
+    iteration_batch_size = 1024
+
+    def __init__(self, table):
+        if pa is None:
+            raise ImportError("The columnar backend requires pyarrow.")
+        self.table = table
+
+    @classmethod
+    def from_rows(
+        cls, rows: Iterable[Mapping], keys: List[str] = None
+    ) -> ColumnarData:
+        rows = list(rows)
+        if keys is None:
+            keys = list(rows[0].keys()) if rows else []
+        return cls(pa.table({key: [row[key] for row in rows] for key in keys}))
+
+    @property
+    def column_names(self) -> List[str]:
+        return self.table.column_names
+
+    def column(self, key: str) -> List:
+        return self.table.column(key).to_pylist()
+
+    def take(self, indices: Iterable[int]) -> ColumnarData:
+        return ColumnarData(
+            self.table.take(pa.array(indices, type=pa.int64()))
+        )
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return self.take(range(start, stop, step))
+            return ColumnarData(self.table.slice(start, max(stop - start, 0)))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ColumnarData index out of range")
+        return next(iter(self[index : index + 1]))
+
+    def __iter__(self):
+        for batch in self.table.to_batches(self.iteration_batch_size):
+            columns = {
+                key: column.to_pylist()
+                for key, column in zip(batch.schema.names, batch.columns)
+            }
+            for index in range(batch.num_rows):
+                yield ColumnarRow(columns, index)
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def __add__(self, other: ColumnarData) -> ColumnarData:
+        return ColumnarData(pa.concat_tables([self.table, other.table]))
+
+    def __reduce__(self):
+        # the arrow IPC format only writes the sliced part of the buffers,
+        # unlike pickling the table, e.g. when sent to worker processes
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, self.table.schema) as writer:
+            writer.write_table(self.table)
+        return _read_arrow_stream, (sink.getvalue(),)
+
+
+class TextBuffer(SequenceABC):
+    """
+    Compact storage of a sequence of strings: their UTF-8 encodings are
+    concatenated in a single buffer, the i-th string being found between
+    offsets[i] and offsets[i + 1]. The strings are only decoded when read,
+    and slices are views sharing the buffer.
+    """
+
+    def __init__(self, buffer, offsets: np.ndarray):
+        self.buffer = memoryview(buffer).cast("B")
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings: Iterable[str]) -> TextBuffer:
+        encoded = [string.encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return cls(b"".join(encoded), offsets)
+
+    @classmethod
+    def from_arrow(cls, array) -> TextBuffer:
+        """
+        Shares the buffers of a pyarrow string array (e.g. a column of a
+        HuggingFace dataset) without copying them.
+        """
+        if isinstance(array, pa.ChunkedArray):
+            array = (
+                array.combine_chunks()
+                if array.num_chunks != 1
+                else array.chunk(0)
+            )
+        if array.null_count > 0:
+            raise ValueError("The array should not contain nulls.")
+        offset_type = (
+            np.int64 if pa.types.is_large_string(array.type) else np.int32
+        )
+        _, offsets, data = array.buffers()
+        offsets = np.frombuffer(offsets, dtype=offset_type)[
+            array.offset : array.offset + len(array) + 1
+        ]
+        # an empty array may come without a data buffer
+        data = data if data is not None else b""
+        return cls(data, offsets.astype(np.int64))
+
+    def _decode(self, index: int) -> str:
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        return str(self.buffer[start:stop], "utf-8")
+
+    def take(self, indices: Iterable[int]) -> TextBuffer:
+        return TextBuffer.from_strings(self._decode(i) for i in indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return self.take(range(start, stop, step))
+            stop = max(stop, start)
+            return TextBuffer(self.buffer, self.offsets[start : stop + 1])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("TextBuffer index out of range")
+        return self._decode(index)
+
+    def __iter__(self):
+        buffer = self.buffer
+        offsets = self.offsets.tolist()
+        for start, stop in zip(offsets, offsets[1:]):
+            yield str(buffer[start:stop], "utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _compacted(self):
+        # the bytes of the strings of this (possibly sliced) view, and their
+        # offsets in them
+        start, stop = self.offsets[0], self.offsets[-1]
+        return bytes(self.buffer[start:stop]), self.offsets - start
+
+    def __add__(self, other: TextBuffer) -> TextBuffer:
+        buffer, offsets = self._compacted()
+        other_buffer, other_offsets = other._compacted()
+        return TextBuffer(
+            buffer + other_buffer,
+            np.concatenate([offsets, other_offsets[1:] + offsets[-1]]),
+        )
+
+    def __reduce__(self):
+        # only the sliced part of the buffer is pickled, e.g. when a chunk
+        # is sent to a worker process
+        return TextBuffer, self._compacted()
+
+    def __eq__(self, other):
+        if isinstance(other, (TextBuffer, list, tuple)):
+            return len(self) == len(other) and all(
+                a == b for a, b in zip(self, other)
+            )
+        return NotImplemented
+
+
+class IndexedView(SequenceABC):
+    """
+    The datapoints of a parent sequence (e.g. a TextBuffer or ColumnarData)
+    at some indices, e.g. those passing a filter. They are read from the
+    parent when accessed rather than copied, slices and views of a view
+    index the same parent.
+    """
+
+    # number of datapoints read from the parent at a time when iterating
+    iteration_batch_size = 1024
+
+    def __init__(self, parent: Sequence, indices: Iterable[int]):
+        indices = np.asarray(indices, dtype=np.int64)
+        if isinstance(parent, IndexedView):
+            indices = parent.indices[indices]
+            parent = parent.parent
+        self.parent = parent
+        self.indices = indices
+
+    @property
+    def mask(self) -> np.ndarray:
+        # whether each datapoint of the parent is in the view
+        mask = np.zeros(len(self.parent), dtype=bool)
+        mask[self.indices] = True
+        return mask
+
+    def materialize(self) -> Sequence:
+        """Copies the datapoints of the view, in the storage of the parent."""
+        return _take(self.parent, self.indices)
+
+    def take(self, indices: Iterable[int]) -> IndexedView:
+        return IndexedView(self, indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return IndexedView(self.parent, self.indices[index])
+        return self.parent[int(self.indices[index])]
+
+    def __iter__(self):
+        for start in range(0, len(self), self.iteration_batch_size):
+            yield from _take(
+                self.parent,
+                self.indices[start : start + self.iteration_batch_size],
+            )
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __reduce__(self):
+        # only the datapoints of the view are pickled, e.g. when sent to
+        # worker processes
+        data = self.materialize()
+        return IndexedView, (data, np.arange(len(data)))
+
+
+def _materialized(data: Sequence) -> Sequence:
+    return data.materialize() if isinstance(data, IndexedView) else data
+
+
+def _storage(data: Sequence) -> Sequence:
+    # the storage the datapoints are read from
+    return data.parent if isinstance(data, IndexedView) else data
+
+
+def _label_array(labels: Iterable):
+    # numerical labels are kept in a numpy array, other ones as they are
+    if isinstance(labels, np.ndarray):
+        return labels
+    array = np.asarray(labels)
+    if array.ndim == 1 and array.dtype.kind in "biuf":
+        return array
+    return labels if isinstance(labels, list) else list(labels)
+
 
 class BaseDataset(Iterable):
+    # the key of every datapoint, which keys the randomness of the
+    # operations: its index in the whole source dataset, kept by the shards
+    # and filtered views, or (the key of the datapoint it comes from, j) for
+    # the j-th output of a transformation. A numpy array of indices or a
+    # list, None for the indices 0, 1... of a source dataset
+    example_keys = None
+    # the (index, number of shards) of the shard a dataset comes from
+    shard_info = None
+    # the TransformationStats of the run a transformed dataset comes from
+    stats = None
+    # the transformation a transformed dataset comes from, and the datapoint
+    # each of its datapoints comes from (see _provenance)
+    provenance = None
+
     def __init__(self, data: Iterable):
         self.data = data
 
+    def shard(self, num_shards: int, index: int):
+        raise NotImplementedError(
+            "BaseDataset does not implement this function."
+        )
+
+    def _sharded(self, dataset: BaseDataset) -> BaseDataset:
+        # the datasets derived from a shard remember where they come from
+        dataset.shard_info = self.shard_info
+        return dataset
+
+    def _view(self, dataset: BaseDataset, indices: Iterable[int]):
+        # the dataset of the datapoints at the given indices keeps their keys
+        dataset.example_keys = _taken_keys(self.example_keys, indices)
+        return self._sharded(dataset)
+
+    # path: the file written, the format and compression of which are told
+    #   by its extension (e.g. .jsonl.gz, .tsv or .parquet) unless given
+    # chunk_size: the number of datapoints written at a time
+    def export(
+        self,
+        path: str,
+        format: str = None,
+        compression: str = None,
+        chunk_size: int = 1000,
+    ) -> int:
+        """
+        Writes the datapoints to a file, chunk by chunk, and returns their
+        number. Lazy datasets are transformed while they are written.
+        """
+        with open_writer(path, format, compression, chunk_size) as writer:
+            self._export_to(writer)
+        return writer.row_num
+
+    def _export_to(self, writer: DatasetWriter):
+        writer.write_rows(self)
+
     def apply_filter(self, condition: Operation):
         raise NotImplementedError(
             "BaseDataset does not implement this function."
@@ -62,95 +1410,307 @@ Dataset for data in plain texts where each line is a datapoint
 class TextLineDataset(BaseDataset):
     tasks = [TaskType.TEXT_CLASSIFICATION]
 
+    # data: the texts, kept in a TextBuffer (or a view of one)
+    # labels: their labels, kept in a numpy array if they are numerical
     def __init__(self, data: List[str], labels: List):
+        if not isinstance(data, (TextBuffer, IndexedView)):
+            data = TextBuffer.from_strings(data)
         super(TextLineDataset, self).__init__(data)
         assert len(data) == len(
             labels
         ), "The number of datapoint should be the same as the number of labels"
-        self.labels = labels
-        self.mapping = {
+        self.labels = _label_array(labels)
+
+    @cached_property
+    def mapping(self) -> dict:
+        # built on first use only, duplicated texts keep their last label
+        return {
             datapoint: label
-            for datapoint, label in zip(self.data, self.labels)
+            for datapoint, label in zip(self.data, self._label_list())
         }
 
+    def _label_list(self) -> List:
+        # the labels as python objects rather than numpy scalars
+        if isinstance(self.labels, np.ndarray):
+            return self.labels.tolist()
+        return self.labels
+
     @classmethod
     def from_huggingface(cls, dataset, task_type, fields, max_size=None):
-        data = []
-        labels = []
-        max_size = max_size or len(dataset)
-        for example in list(dataset)[:max_size]:
-            data.append(example[fields[0]])
-            labels.append(example[fields[1]])
-        return cls(data, labels)
-
-    def apply_filter(self, filter: SentenceOperation) -> TextLineDataset:
-        filtered_data = []
-        filtered_labels = []
+        table = _huggingface_table(dataset, max_size)
+        if table is not None:
+            texts = table.column(fields[0])
+            labels = table.column(fields[1])
+            if pa.types.is_string(texts.type) and texts.null_count == 0:
+                # the texts are read from the arrow buffers of the dataset
+                return cls(
+                    TextBuffer.from_arrow(texts),
+                    _label_array(labels.to_numpy(zero_copy_only=False)),
+                )
+        columns = _huggingface_columns(dataset, fields[:2], max_size)
+        return cls(columns[fields[0]], columns[fields[1]])
+
+    # batch_size: the number of datapoints passed to the filter at a time
+    def filter_mask(
+        self, filter: SentenceOperation, batch_size: int = 32
+    ) -> np.ndarray:
+        """
+        Whether each datapoint passes the filter, as a boolean array which
+        can be combined with the masks of other filters (&, |, ~) and
+        given to select.
+        """
         print("Applying filtering:")
-        for datapoint, label in tqdm(
-            zip(self.data, self.labels), total=len(self.data)
-        ):
-            if filter.filter(datapoint):
-                filtered_data.append(datapoint)
-                filtered_labels.append(label)
-
-        return TextLineDataset(filtered_data, filtered_labels)
-
+        passed = _run_filter(
+            _filter_sentences, filter, self.data, batch_size, self.example_keys
+        )
+        return np.asarray(passed, dtype=bool)
+
+    # mask: a boolean array over the datapoints, or the indices to keep
+    def select(self, mask: np.ndarray) -> TextLineDataset:
+        """
+        The datapoints at the True entries of the mask, in a dataset which
+        reads them from this one rather than copying them.
+        """
+        mask = np.asarray(mask)
+        indices = np.flatnonzero(mask) if mask.dtype == bool else mask
+        return self._view(self._select(indices), indices)
+
+    # batch_size: the number of datapoints passed to the filter at a time
+    def apply_filter(
+        self, filter: SentenceOperation, batch_size: int = 32
+    ) -> TextLineDataset:
+        # filtering a filtered dataset only runs the filter on the
+        # datapoints left, and views the same parent data
+        return self.select(self.filter_mask(filter, batch_size))
+
+    # batch_size: the number of datapoints passed to the transformation at a time
+    # num_workers: the number of worker processes, 0 runs in this process
+    # chunk_size: the number of datapoints sent to a worker at a time
+    # cache: an AugmentationCache holding the outputs of earlier runs
+    # checkpoint_dir: a work directory to save the progress in, and resume from
+    # max_perturbed: stop after this many perturbed outputs, and time_budget
+    #   after this many seconds: the datapoints are then visited in a random
+    #   order, and only the sample transformed is returned
+    # stratified: sample the datapoints in the proportions of their labels
+    # sample_seed: the seed of the order of a budgeted run
+    # example_timeout: the time limit (in seconds) of every datapoint, which
+    #   is left unchanged past it, the datapoints then being transformed one
+    #   at a time
+    # max_timeouts: the number of datapoints timing out after which the
+    #   transformation is disabled, leaving the rest unchanged
     def apply_transformation(
-        self, transformation: SentenceOperation
+        self,
+        transformation: SentenceOperation,
+        batch_size: int = 32,
+        num_workers: int = 0,
+        chunk_size: int = 1000,
+        cache: AugmentationCache = None,
+        checkpoint_dir: str = None,
+        max_perturbed: int = None,
+        time_budget: float = None,
+        stratified: bool = False,
+        sample_seed: int = 0,
+        example_timeout: float = None,
+        max_timeouts: int = 10,
     ) -> TextLineDataset:
-        transformed_data = []
+        guard = _timeout_guard(example_timeout, max_timeouts)
         print("Applying transformation:")
-
-        # calculating ratio of transformed example to unchanged example
-        successful_num = 0
-        failed_num = 0
-
-        for line in tqdm(self.data):
-            pt_examples = transformation.generate(line)
-            successful_pt, failed_pt = transformation.compare(
-                line, pt_examples
-            )
-            successful_num += successful_pt
-            failed_num += failed_pt
-
-            transformed_data.extend(pt_examples)
-
-        total_num = successful_num + failed_num
-        print(
-            "Finished transformation! {} examples generated from {} original examples, with {} successfully transformed and {} unchanged ({} perturb rate)".format(
-                total_num,
+        if max_perturbed is not None or time_budget is not None:
+            _check_budgeted_run(num_workers, checkpoint_dir)
+            order = _sample_order(
                 len(self.data),
+                sample_seed,
+                self.labels if stratified else None,
+            )
+            (
+                outputs,
+                indices,
                 successful_num,
                 failed_num,
-                successful_num / total_num if total_num > 0 else 0,
+                stats,
+            ) = _run_budgeted_transformation(
+                _generate_sentences,
+                transformation,
+                self.data,
+                order,
+                batch_size=batch_size,
+                max_perturbed=max_perturbed,
+                time_budget=time_budget,
+                cache=cache,
+                keys=self.example_keys,
+                guard=guard,
             )
+            _print_timeout_summary(stats)
+            return self._transformed(
+                transformation,
+                outputs,
+                successful_num,
+                failed_num,
+                stats,
+                indices,
+            )
+        outputs, successful_num, failed_num, stats = _run_transformation(
+            _generate_sentences,
+            transformation,
+            self.data,
+            batch_size=batch_size,
+            num_workers=num_workers,
+            chunk_size=chunk_size,
+            cache=cache,
+            checkpoint_dir=checkpoint_dir,
+            keys=self.example_keys,
+            guard=guard,
+        )
+        _print_timeout_summary(stats)
+        return self._transformed(
+            transformation, outputs, successful_num, failed_num, stats
         )
-        if total_num == 0: return None
-        return TextLineDataset(transformed_data, self.labels)
+
+    # transformations: the transformations applied to every datapoint
+    # batch_size: the number of datapoints passed to a transformation at a time
+    def apply_transformations(
+        self, transformations: List[SentenceOperation], batch_size: int = 32
+    ) -> List[TextLineDataset]:
+        """
+        Applies every transformation in a single pass over the data. Returns
+        the dataset transformed by each of them, in the same order, the same
+        as the one returned by apply_transformation (None if it has no
+        output). Its provenance tells the transformation it comes from.
+        """
+        print("Applying transformations:")
+        runs = _run_transformations(
+            _generate_sentences,
+            transformations,
+            self.data,
+            batch_size,
+            self.example_keys,
+        )
+        return [
+            self._transformed(transformation, *run)
+            for transformation, run in zip(transformations, runs)
+        ]
+
+    # batch_size: the number of datapoints read from the dataset at a time
+    # max_concurrency: the number of examples generated concurrently
+    async def apply_transformation_async(
+        self,
+        transformation: SentenceOperation,
+        batch_size: int = 32,
+        max_concurrency: int = 16,
+    ) -> TextLineDataset:
+        """
+        Same as apply_transformation, awaiting the generate_async method of
+        the transformation, e.g. for a transformation backed by a model
+        server: asyncio.run(dataset.apply_transformation_async(t)).
+        """
+        print("Applying transformation:")
+        (
+            outputs,
+            successful_num,
+            failed_num,
+            stats,
+        ) = await _run_transformation_async(
+            _generate_sentences,
+            transformation,
+            self.data,
+            batch_size=batch_size,
+            max_concurrency=max_concurrency,
+            keys=self.example_keys,
+        )
+        return self._transformed(
+            transformation, outputs, successful_num, failed_num, stats
+        )
+
+    def _transformed(
+        self,
+        transformation: SentenceOperation,
+        outputs: List[List[str]],
+        successful_num: int,
+        failed_num: int,
+        stats: TransformationStats,
+        indices: np.ndarray = None,
+    ) -> TextLineDataset:
+        # indices: those of the datapoints transformed by a budgeted run
+        _print_transformation_summary(len(outputs), successful_num, failed_num)
+        # the datapoints left unchanged by the guard still have an output
+        if (
+            successful_num + failed_num + stats.timeout_num + stats.skipped_num
+            == 0
+        ):
+            return None
+
+        if indices is None:
+            indices = range(len(outputs))
+        source_keys = _keys_at(self.example_keys, indices)
+        labels = self._label_list()
+        labels = [labels[index] for index in indices]
+        # every perturbed sentence keeps the label of its original sentence
+        transformed_data = []
+        transformed_labels = []
+        for pt_examples, label in zip(outputs, labels):
+            transformed_data.extend(pt_examples)
+            transformed_labels.extend([label] * len(pt_examples))
+        transformed = TextLineDataset(transformed_data, transformed_labels)
+        transformed.stats = stats
+        transformed.provenance = _provenance(
+            transformation, outputs, source_keys
+        )
+        transformed.example_keys = _output_keys(source_keys, outputs)
+        return self._sharded(transformed)
+
+    # num_shards: the number of contiguous parts the dataset is split in
+    # index: the index of the part returned, from 0 to num_shards - 1
+    def shard(self, num_shards: int, index: int) -> TextLineDataset:
+        start, stop = _shard_bounds(len(self.data), num_shards, index)
+        shard = TextLineDataset(self.data[start:stop], self.labels[start:stop])
+        shard.example_keys = _taken_keys(self.example_keys, range(start, stop))
+        shard.shard_info = (index, num_shards)
+        return shard
 
     def __iter__(self):
-        for text, label in zip(self.data, self.labels):
+        for text, label in zip(self.data, self._label_list()):
             yield (text, label)
 
+    def _export_to(self, writer: DatasetWriter):
+        writer.write_rows(
+            {"text": text, "label": label}
+            for text, label in zip(self.data, self._label_list())
+        )
+
     def __len__(self):
         return len(self.data)
 
+    # the set operations compare datapoints by a hash of their text, keep the
+    # first occurrence of each datapoint (with its label) and keep the order
+    # of self followed by the order of other
+
+    def _hashes(self) -> np.ndarray:
+        return _content_hashes((text,) for text in self.data)
+
+    def _select(self, indices: Iterable[int]) -> TextLineDataset:
+        indices = np.asarray(indices, dtype=np.int64)
+        return TextLineDataset(
+            IndexedView(self.data, indices), _take(self.labels, indices)
+        )
+
     def __or__(self, other: TextLineDataset) -> TextLineDataset:
-        data = list(set(self.data).union(set(other.data)))
-        mapping = {**self.mapping, **other.mapping}
-        labels = [mapping[datapoint] for datapoint in data]
-        return TextLineDataset(data, labels)
+        hashes = np.concatenate([self._hashes(), other._hashes()])
+        union = TextLineDataset(
+            _concat(self.data, other.data), _concat(self.labels, other.labels)
+        )
+        return union._select(_first_occurrences(hashes))
 
     def __and__(self, other: TextLineDataset) -> TextLineDataset:
-        data = list(set(self.data).intersection(set(other.data)))
-        labels = [self.mapping[datapoint] for datapoint in data]
-        return TextLineDataset(data, labels)
+        hashes = self._hashes()
+        indices = _first_occurrences(hashes)
+        return self._select(indices[np.isin(hashes[indices], other._hashes())])
 
     def __sub__(self, other: TextLineDataset) -> TextLineDataset:
-        data = list(set(self.data).difference(set(other.data)))
-        labels = [self.mapping[datapoint] for datapoint in data]
-        return TextLineDataset(data, labels)
+        hashes = self._hashes()
+        indices = _first_occurrences(hashes)
+        return self._select(
+            indices[~np.isin(hashes[indices], other._hashes())]
+        )
 
 
 """
@@ -163,45 +1723,61 @@ class KeyValueDataset(BaseDataset):
         TaskType.TEXT_TO_TEXT_GENERATION,
         TaskType.QUESTION_ANSWERING,
         TaskType.QUESTION_GENERATION,
-        TaskType.TEXT_CLASSIFICATION, # for >1 field classification
+        TaskType.TEXT_CLASSIFICATION,  # for >1 field classification
     ]
 
-    # data: input data samples read from jsonl file
+    # data: input data samples read from jsonl file, either a list of dicts
+    #       or a pyarrow Table (or ColumnarData) for the columnar backend
     # task_type: task type specified
     # fields: list of relevant keys (e.g. to your sentence/target, context/question/answer, etc.)
     #         The number of keys should be aligned with the transform/filter operation.
     def __init__(
         self,
-        data: List[dict],
+        data: Sequence[Mapping],
         task_type=TaskType.TEXT_TO_TEXT_GENERATION,
         fields: List[str] = None,
     ):
+        if pa is not None and isinstance(data, pa.Table):
+            data = ColumnarData(data)
         super(KeyValueDataset, self).__init__(data)
         self.task_type = task_type
         self.fields = fields
         self.operation_type = None
 
+    # columnar: keep the data in arrow columns (see ColumnarData), the
+    #           columns of the HuggingFace dataset are then shared, not copied
     @classmethod
-    def from_huggingface(cls, dataset, task_type, fields, max_size=None):
-        data = []
-        max_size = max_size or len(dataset)
-        if task_type not in [
+    def from_huggingface(
+        cls, dataset, task_type, fields, max_size=None, columnar=False
+    ):
+        is_squad_format = task_type in [
             TaskType.QUESTION_ANSWERING,
             TaskType.QUESTION_GENERATION,
-        ]:
-            for example in list(dataset)[:max_size]:
-                data.append({key: example[key] for key in fields})
-        else:
+        ]
+        table = _huggingface_table(dataset, max_size) if columnar else None
+        if table is not None:
+            columns = {key: table.column(key) for key in fields}
+            if is_squad_format:
+                # the answers field of squad is a struct, keep only its text
+                answers = columns[fields[2]]
+                columns[fields[2]] = pa.chunked_array(
+                    [chunk.field("text") for chunk in answers.chunks]
+                )
+            return cls(pa.table(columns), task_type, fields)
+
+        columns = _huggingface_columns(dataset, fields, max_size)
+        if is_squad_format:
             # this is an ugly implementation, which hard-codes the squad data format
             # TODO might need a more elegant way to deal with the fields with hierachy, e.g. the answers field in squad data (exampl['answers']['text'])
-            for example in list(dataset)[:max_size]:
-                data.append(
-                    {
-                        fields[0]: example[fields[0]],
-                        fields[1]: example[fields[1]],
-                        fields[2]: example[fields[2]]["text"],
-                    }
-                )
+            columns[fields[2]] = [
+                answers["text"] for answers in columns[fields[2]]
+            ]
+        if columnar:
+            return cls(pa.table(columns), task_type, fields)
+        data = [
+            dict(zip(fields, values))
+            for values in zip(*[columns[key] for key in fields])
+        ]
         return cls(data, task_type, fields)
 
     def _analyze(self, subfields: List[str]):
@@ -243,146 +1819,396 @@ class KeyValueDataset(BaseDataset):
 
     # this function is an adapter and will call the corresponding filter function for the task
     # subfields: the fields to apply filter, it is a subset of self.fields
+    # batch_size: the number of datapoints passed to the filter at a time
     def apply_filter(
-        self, filter: Operation, subfields: List[str] = None
+        self,
+        filter: Operation,
+        subfields: List[str] = None,
+        batch_size: int = 32,
     ) -> KeyValueDataset:
+        # filtering a filtered dataset only runs the filter on the
+        # datapoints left, and views the same parent data
+        return self.select(self.filter_mask(filter, subfields, batch_size))
+
+    # subfields: the fields to apply filter, it is a subset of self.fields
+    # batch_size: the number of datapoints passed to the filter at a time
+    def filter_mask(
+        self,
+        filter: Operation,
+        subfields: List[str] = None,
+        batch_size: int = 32,
+    ) -> np.ndarray:
+        """
+        Whether each datapoint passes the filter, as a boolean array which
+        can be combined with the masks of other filters (&, |, ~) and
+        given to select.
+        """
         filter_func, _ = self._analyze(subfields)
 
-        filtered_data = []
         print("Applying filtering:")
-        for datapoint in tqdm(self.data):
-            if filter_func(datapoint, filter):
-                filtered_data.append(datapoint)
+        passed = _run_filter(
+            filter_func, filter, self.data, batch_size, self.example_keys
+        )
+        return np.asarray(passed, dtype=bool)
+
+    # mask: a boolean array over the datapoints, or the indices to keep
+    def select(self, mask: np.ndarray) -> KeyValueDataset:
+        """
+        The datapoints at the True entries of the mask, in a dataset which
+        reads them from this one rather than copying them.
+        """
+        mask = np.asarray(mask)
+        indices = np.flatnonzero(mask) if mask.dtype == bool else mask
+        return self._view(
+            KeyValueDataset(
+                IndexedView(self.data, indices), self.task_type, self.fields
+            ),
+            indices,
+        )
 
-        return KeyValueDataset(filtered_data, self.task_type, self.fields)
+    # the filter and transformation adapters below work on a batch of
+    # datapoints and return the result of the operation for each of them
 
     def _apply_sentence_filter(
-        self, datapoint: dict, filter: SentenceOperation
+        self, datapoints: Sequence[Mapping], filter: SentenceOperation
     ):
-        sentence = datapoint[self.fields[0]]
-        return filter.filter(sentence)
+        sentences = _field_values(datapoints, self.fields[0])
+        return filter.filter_batch(sentences)
 
     def _apply_sentence_and_target_filter(
-        self, datapoint: dict, filter: SentenceAndTargetOperation
+        self, datapoints: Sequence[Mapping], filter: SentenceAndTargetOperation
     ):
-        sentence = datapoint[self.fields[0]]
-        target = datapoint[self.fields[1]]
-        return filter.filter(sentence, target)
+        sentences = _field_values(datapoints, self.fields[0])
+        targets = _field_values(datapoints, self.fields[1])
+        return filter.filter_batch(sentences, targets)
 
     def _apply_sentence_and_targets_filter(
-        self, datapoint: dict, filter: SentenceAndTargetsOperation
+        self,
+        datapoints: Sequence[Mapping],
+        filter: SentenceAndTargetsOperation,
     ):
-        sentence = datapoint[self.fields[0]]
-        targets = [datapoint[target_key] for target_key in self.fields[1:]]
-        return filter.filter(sentence, targets)
+        sentences = _field_values(datapoints, self.fields[0])
+        targets = [
+            [datapoint[target_key] for target_key in self.fields[1:]]
+            for datapoint in datapoints
+        ]
+        return filter.filter_batch(sentences, targets)
 
     def _apply_question_answer_filter(
-        self, datapoint: dict, filter: QuestionAnswerOperation
+        self, datapoints: Sequence[Mapping], filter: QuestionAnswerOperation
     ):
-        context = datapoint[self.fields[0]]
-        question = datapoint[self.fields[1]]
-        answers = [datapoint[answer_key] for answer_key in self.fields[2:]]
-        return filter.filter(context, question, answers)
+        contexts = _field_values(datapoints, self.fields[0])
+        questions = _field_values(datapoints, self.fields[1])
+        answers = [
+            [datapoint[answer_key] for answer_key in self.fields[2:]]
+            for datapoint in datapoints
+        ]
+        return filter.filter_batch(contexts, questions, answers)
 
     # this function is an adapter and will call the corresponding transform function for the task
     # subfields: the fields to apply transformation, it is a subset of self.fields
+    # batch_size: the number of datapoints passed to the transformation at a time
+    # num_workers: the number of worker processes, 0 runs in this process
+    # chunk_size: the number of datapoints sent to a worker at a time
+    # cache: an AugmentationCache holding the outputs of earlier runs
+    # checkpoint_dir: a work directory to save the progress in, and resume from
+    # max_perturbed: stop after this many perturbed outputs, and time_budget
+    #   after this many seconds: the datapoints are then visited in a random
+    #   order, and only the sample transformed is returned
+    # stratify_by: sample the datapoints in the proportions of the values of
+    #   this field (e.g. a label)
+    # sample_seed: the seed of the order of a budgeted run
+    # example_timeout: the time limit (in seconds) of every datapoint, which
+    #   is left unchanged past it, the datapoints then being transformed one
+    #   at a time
+    # max_timeouts: the number of datapoints timing out after which the
+    #   transformation is disabled, leaving the rest unchanged
     def apply_transformation(
-        self, transformation: Operation, subfields: List[str] = None
+        self,
+        transformation: Operation,
+        subfields: List[str] = None,
+        batch_size: int = 32,
+        num_workers: int = 0,
+        chunk_size: int = 1000,
+        cache: AugmentationCache = None,
+        checkpoint_dir: str = None,
+        max_perturbed: int = None,
+        time_budget: float = None,
+        stratify_by: str = None,
+        sample_seed: int = 0,
+        example_timeout: float = None,
+        max_timeouts: int = 10,
     ) -> KeyValueDataset:
+        guard = _timeout_guard(example_timeout, max_timeouts)
         _, transformation_func = self._analyze(subfields)
-        transformed_data = []
+        # only the field layout (and not the data) is sent to the workers
+        transformation_func = getattr(
+            self._without_data(), transformation_func.__name__
+        )
         print("Applying transformation:")
-        
-        # calculating ratio of transformed example to unchanged example
-        successful_num = 0
-        failed_num = 0
-        
-        for datapoint in tqdm(self.data):
-            pt_examples = transformation_func(datapoint.copy(), transformation)
-            successful_pt, failed_pt = transformation.compare(
-                datapoint, pt_examples
+        if max_perturbed is not None or time_budget is not None:
+            _check_budgeted_run(num_workers, checkpoint_dir)
+            strata = None
+            if stratify_by is not None:
+                strata = _field_values(self.data, stratify_by)
+            order = _sample_order(len(self.data), sample_seed, strata)
+            (
+                outputs,
+                indices,
+                successful_num,
+                failed_num,
+                stats,
+            ) = _run_budgeted_transformation(
+                transformation_func,
+                transformation,
+                self.data,
+                order,
+                batch_size=batch_size,
+                max_perturbed=max_perturbed,
+                time_budget=time_budget,
+                cache=cache,
+                keys=self.example_keys,
+                guard=guard,
             )
-            successful_num += successful_pt
-            failed_num += failed_pt
-            
-            transformed_data.extend(pt_examples)  # don't want self.data to be changed
-        
-        total_num = successful_num + failed_num
-
-        print(
-            "Finished transformation! {} examples generated from {} original examples, with {} successfully transformed and {} unchanged ({} perturb rate)".format(
-                total_num,
-                len(self.data),
+            _print_timeout_summary(stats)
+            return self._transformed(
+                transformation,
+                outputs,
                 successful_num,
                 failed_num,
-                successful_num / total_num if total_num > 0 else 0,
+                stats,
+                indices,
             )
+        outputs, successful_num, failed_num, stats = _run_transformation(
+            transformation_func,
+            transformation,
+            self.data,
+            batch_size=batch_size,
+            num_workers=num_workers,
+            chunk_size=chunk_size,
+            cache=cache,
+            checkpoint_dir=checkpoint_dir,
+            keys=self.example_keys,
+            guard=guard,
+        )
+        _print_timeout_summary(stats)
+        return self._transformed(
+            transformation, outputs, successful_num, failed_num, stats
+        )
+
+    # transformations: the transformations applied to every datapoint
+    # subfields: the fields to apply the transformations on
+    # batch_size: the number of datapoints passed to a transformation at a time
+    def apply_transformations(
+        self,
+        transformations: List[Operation],
+        subfields: List[str] = None,
+        batch_size: int = 32,
+    ) -> List[KeyValueDataset]:
+        """
+        Applies every transformation in a single pass over the data. Returns
+        the dataset transformed by each of them, in the same order, the same
+        as the one returned by apply_transformation (None if it has no
+        output). Its provenance tells the transformation it comes from.
+        """
+        _, transformation_func = self._analyze(subfields)
+        print("Applying transformations:")
+        runs = _run_transformations(
+            transformation_func,
+            transformations,
+            self.data,
+            batch_size,
+            self.example_keys,
+        )
+        return [
+            self._transformed(transformation, *run)
+            for transformation, run in zip(transformations, runs)
+        ]
+
+    # subfields: the fields to apply the transformation on
+    # batch_size: the number of datapoints read from the dataset at a time
+    # max_concurrency: the number of examples generated concurrently
+    async def apply_transformation_async(
+        self,
+        transformation: Operation,
+        subfields: List[str] = None,
+        batch_size: int = 32,
+        max_concurrency: int = 16,
+    ) -> KeyValueDataset:
+        """
+        Same as apply_transformation, awaiting the generate_async method of
+        the transformation, e.g. for a transformation backed by a model
+        server.
+        """
+        _, transformation_func = self._analyze(subfields)
+        print("Applying transformation:")
+        (
+            outputs,
+            successful_num,
+            failed_num,
+            stats,
+        ) = await _run_transformation_async(
+            transformation_func,
+            transformation,
+            self.data,
+            batch_size=batch_size,
+            max_concurrency=max_concurrency,
+            keys=self.example_keys,
+        )
+        return self._transformed(
+            transformation, outputs, successful_num, failed_num, stats
+        )
+
+    def _transformed(
+        self,
+        transformation: Operation,
+        outputs: List[List[Mapping]],
+        successful_num: int,
+        failed_num: int,
+        stats: TransformationStats,
+        indices: np.ndarray = None,
+    ) -> KeyValueDataset:
+        # indices: those of the datapoints transformed by a budgeted run
+        _print_transformation_summary(len(outputs), successful_num, failed_num)
+        # the datapoints left unchanged by the guard still have an output
+        if (
+            successful_num + failed_num + stats.timeout_num + stats.skipped_num
+            == 0
+        ):
+            return None
+
+        transformed_data = []
+        for pt_examples in outputs:
+            transformed_data.extend(pt_examples)
+        if isinstance(_storage(self.data), ColumnarData):
+            transformed_data = ColumnarData.from_rows(transformed_data)
+        transformed = KeyValueDataset(
+            transformed_data, self.task_type, self.fields
+        )
+        if indices is None:
+            indices = range(len(outputs))
+        source_keys = _keys_at(self.example_keys, indices)
+        transformed.stats = stats
+        transformed.provenance = _provenance(
+            transformation, outputs, source_keys
+        )
+        transformed.example_keys = _output_keys(source_keys, outputs)
+        return self._sharded(transformed)
+
+    # num_shards: the number of contiguous parts the dataset is split in
+    # index: the index of the part returned, from 0 to num_shards - 1
+    def shard(self, num_shards: int, index: int) -> KeyValueDataset:
+        start, stop = _shard_bounds(len(self.data), num_shards, index)
+        shard = KeyValueDataset(
+            self.data[start:stop], self.task_type, self.fields
         )
-        if total_num == 0: return None
-        return KeyValueDataset(transformed_data, self.task_type, self.fields)
+        shard.example_keys = _taken_keys(self.example_keys, range(start, stop))
+        shard.shard_info = (index, num_shards)
+        return shard
+
+    def _without_data(self) -> KeyValueDataset:
+        layout = KeyValueDataset([], self.task_type, self.fields)
+        layout.operation_type = self.operation_type
+        return layout
+
+    # the transformation adapters never change the given datapoints, the
+    # perturbed ones share their unchanged values with the original ones
 
     def _apply_sentence_transformation(
-        self, datapoint: dict, transformation: SentenceOperation
+        self, datapoints: Sequence[Mapping], transformation: SentenceOperation
     ):
-        sentence = datapoint[self.fields[0]]
-        transformed_sentence = transformation.generate(sentence)
-        datapoint[self.fields[0]] = transformed_sentence
-        return [datapoint]
+        sentences = _field_values(datapoints, self.fields[0])
+        transformed = transformation.generate_batch(sentences)
+        return [
+            [_with_values(datapoint, {self.fields[0]: transformed_sentence})]
+            for datapoint, transformed_sentence in zip(datapoints, transformed)
+        ]
 
     def _apply_sentence_and_target_transformation(
-        self, datapoint: dict, transformation: SentenceAndTargetOperation
+        self,
+        datapoints: Sequence[Mapping],
+        transformation: SentenceAndTargetOperation,
     ):
-        sentence = datapoint[self.fields[0]]
-        target = datapoint[self.fields[1]]
-        transformed_sentence, transformed_target = transformation.generate(
-            sentence, target
-        )
-        datapoint[self.fields[0]] = transformed_sentence
-        datapoint[self.fields[1]] = transformed_target
-        return [datapoint]
+        sentences = _field_values(datapoints, self.fields[0])
+        targets = _field_values(datapoints, self.fields[1])
+        transformed = transformation.generate_batch(sentences, targets)
+        pt_examples = []
+        for datapoint, (transformed_sentence, transformed_target) in zip(
+            datapoints, transformed
+        ):
+            datapoint_n = _with_values(
+                datapoint,
+                {
+                    self.fields[0]: transformed_sentence,
+                    self.fields[1]: transformed_target,
+                },
+            )
+            pt_examples.append([datapoint_n])
+        return pt_examples
 
     def _apply_sentence_and_targets_transformation(
-        self, datapoint: dict, transformation: SentenceAndTargetsOperation
+        self,
+        datapoints: Sequence[Mapping],
+        transformation: SentenceAndTargetsOperation,
     ):
-        sentence = datapoint[self.fields[0]]
-        targets = [datapoint[target_key] for target_key in self.fields[1:]]
-        transformed = transformation.generate(sentence, targets)
-        datapoints = []
-        for to in transformed:
-            datapoint_n = dict()
-            datapoint_n[self.fields[0]] = to[0]
-            for i, target_key in enumerate(self.fields[1:]):
-                datapoint[target_key] = to[1][
-                    1 + i
-                ]  # targets starting from pos 1
-            datapoints.append(datapoint_n)
-        return datapoints
+        sentences = _field_values(datapoints, self.fields[0])
+        targets = [
+            [datapoint[target_key] for target_key in self.fields[1:]]
+            for datapoint in datapoints
+        ]
+        pt_examples = []
+        for transformed in transformation.generate_batch(sentences, targets):
+            datapoints_n = []
+            for to in transformed:
+                datapoint_n = dict()
+                datapoint_n[self.fields[0]] = to[0]
+                for i, target_key in enumerate(self.fields[1:]):
+                    datapoint_n[target_key] = to[1][
+                        1 + i
+                    ]  # targets starting from pos 1
+                datapoints_n.append(datapoint_n)
+            pt_examples.append(datapoints_n)
+        return pt_examples
 
     def _apply_question_answer_transformation(
-        self, datapoint: dict, transformation: QuestionAnswerOperation
+        self,
+        datapoints: Sequence[Mapping],
+        transformation: QuestionAnswerOperation,
     ):
-        context = datapoint[self.fields[0]]
-        question = datapoint[self.fields[1]]
-        answers = [datapoint[answer_key] for answer_key in self.fields[2:]]
-        transformed = transformation.generate(context, question, answers)
-
-        datapoints = []
-        for to in transformed:
-            datapoint_n = dict()
-            datapoint_n[self.fields[0]] = to[0]
-            datapoint_n[self.fields[1]] = to[1]
-            for i, answers_key in enumerate(self.fields[2:]):
-                datapoint_n[answers_key] = to[
-                    2 + i
-                ]  # answers starting from pos 2
-            datapoints.append(datapoint_n)
-
-        return datapoints
+        contexts = _field_values(datapoints, self.fields[0])
+        questions = _field_values(datapoints, self.fields[1])
+        answers = [
+            [datapoint[answer_key] for answer_key in self.fields[2:]]
+            for datapoint in datapoints
+        ]
+        pt_examples = []
+        for transformed in transformation.generate_batch(
+            contexts, questions, answers
+        ):
+            datapoints_n = []
+            for to in transformed:
+                datapoint_n = dict()
+                datapoint_n[self.fields[0]] = to[0]
+                datapoint_n[self.fields[1]] = to[1]
+                for i, answers_key in enumerate(self.fields[2:]):
+                    datapoint_n[answers_key] = to[
+                        2 + i
+                    ]  # answers starting from pos 2
+                datapoints_n.append(datapoint_n)
+            pt_examples.append(datapoints_n)
+        return pt_examples
 
     def __iter__(self):
         for datapoint in self.data:
             yield (datapoint[field] for field in self.fields)
 
+    def _export_to(self, writer: DatasetWriter):
+        if isinstance(_storage(self.data), ColumnarData):
+            # the rows of a filtered dataset are only copied here
+            writer.write_table(_materialized(self.data).table)
+        else:
+            writer.write_rows(self.data)
+
     def __len__(self):
         return len(self.data)
 
@@ -397,53 +2223,279 @@ class KeyValueDataset(BaseDataset):
             other.fields
         ), "You cannot do dataset operation on datasets with different number fields"
 
-    def _data2identifier(self, data: List[str]):
-        id2datapoint = {}
-        identifier2id = {}
-        identifiers = []
-        for idx, datapoint in enumerate(data):
-            id2datapoint[idx] = datapoint
-            # "|||" is a naive separator
-            identifier = "|||".join(
-                [datapoint[field] for field in self.fields]
-            )
-            identifiers.append(identifier)
-            identifier2id[identifier] = idx
-        identifiers = set(identifiers)  # remove duplicates
-        return id2datapoint, identifier2id, identifiers
+    # the set operations compare datapoints by a hash of their fields, keep
+    # the first occurrence of each datapoint and keep the order of self
+    # followed by the order of other
 
-    def _identifier2data(self, id2datapoint, identifier2id, identifiers):
-        result_data = []
-        for identifier in identifiers:
-            result_data.append(id2datapoint[identifier2id[identifier]])
-        return result_data
+    def _hashes(self) -> np.ndarray:
+        return _content_hashes(
+            (datapoint[field] for field in self.fields)
+            for datapoint in self.data
+        )
 
     def __or__(self, other: KeyValueDataset) -> KeyValueDataset:
         self._sanity_check(other)
-        id2datapoint, identifier2id, identifiers = self._data2identifier(
-            self.data + other.data
+        hashes = np.concatenate([self._hashes(), other._hashes()])
+        data = _take(
+            _concat(self.data, other.data), _first_occurrences(hashes)
         )
-        data = self._identifier2data(id2datapoint, identifier2id, identifiers)
         return KeyValueDataset(data, self.task_type, self.fields)
 
     def __and__(self, other: KeyValueDataset) -> KeyValueDataset:
         self._sanity_check(other)
-        id2datapoint, identifier2id, identifiers = self._data2identifier(
-            self.data
+        hashes = self._hashes()
+        indices = _first_occurrences(hashes)
+        indices = indices[np.isin(hashes[indices], other._hashes())]
+        return KeyValueDataset(
+            _take(self.data, indices), self.task_type, self.fields
         )
-        _, _, identifiers2 = self._data2identifier(other.data)
-
-        identifiers = identifiers.intersection(identifiers2)
-        data = self._identifier2data(id2datapoint, identifier2id, identifiers)
-        return KeyValueDataset(data, self.task_type, self.fields)
 
     def __sub__(self, other: KeyValueDataset) -> KeyValueDataset:
         self._sanity_check(other)
-        id2datapoint, identifier2id, identifiers = self._data2identifier(
-            self.data
+        hashes = self._hashes()
+        indices = _first_occurrences(hashes)
+        indices = indices[~np.isin(hashes[indices], other._hashes())]
+        return KeyValueDataset(
+            _take(self.data, indices), self.task_type, self.fields
         )
-        _, _, identifiers2 = self._data2identifier(other.data)
 
-        identifiers = identifiers.difference(identifiers2)
-        data = self._identifier2data(id2datapoint, identifier2id, identifiers)
-        return KeyValueDataset(data, self.task_type, self.fields)
+
+def _shard_bounds(length: int, num_shards: int, index: int):
+    if not 0 <= index < num_shards:
+        raise ValueError(f"The shard index should be in [0, {num_shards}).")
+    return length * index // num_shards, length * (index + 1) // num_shards
+
+
+def merge_shards(shards: List[BaseDataset]) -> BaseDataset:
+    """
+    Reassembles the shards of a dataset, or the datasets derived from them
+    (e.g. their transformed versions), into a single dataset in the
+    original order. None values (transformations without any output) are
+    ignored.
+    """
+    shards = [shard for shard in shards if shard is not None]
+    if any(shard.shard_info is None for shard in shards):
+        raise ValueError("Only the shards of a dataset can be merged.")
+    if len({shard.shard_info[1] for shard in shards}) > 1:
+        raise ValueError("The shards come from different shardings.")
+    shards = sorted(shards, key=lambda shard: shard.shard_info[0])
+    indices = [shard.shard_info[0] for shard in shards]
+    if len(set(indices)) != len(indices):
+        raise ValueError("The same shard is given more than once.")
+
+    first = shards[0]
+    if isinstance(first, TextLineDataset):
+        merged = TextLineDataset(
+            [text for shard in shards for text in shard.data],
+            [label for shard in shards for label in shard._label_list()],
+        )
+    else:
+        for shard in shards[1:]:
+            first._sanity_check(shard)
+        if all(
+            isinstance(_storage(shard.data), ColumnarData) for shard in shards
+        ):
+            data = ColumnarData(
+                pa.concat_tables(
+                    [_materialized(shard.data).table for shard in shards]
+                )
+            )
+        else:
+            data = [datapoint for shard in shards for datapoint in shard.data]
+        merged = KeyValueDataset(data, first.task_type, first.fields)
+    keys = [
+        _taken_keys(shard.example_keys, range(len(shard))) for shard in shards
+    ]
+    if all(isinstance(shard_keys, np.ndarray) for shard_keys in keys):
+        merged.example_keys = np.concatenate(keys)
+    else:
+        merged.example_keys = [
+            key for shard_keys in keys for key in shard_keys
+        ]
+    return merged
+
+
+class _LazyData(Iterable):
+    """
+    Re-iterable wrapper around a function returning a fresh iterator over the
+    datapoints, so that nothing is read or computed until it is iterated.
+    """
+
+    def __init__(self, iterator_func: Callable[[], Iterable]):
+        self.iterator_func = iterator_func
+
+    def __iter__(self):
+        return iter(self.iterator_func())
+
+
+def _read_text_lines(path: str, field: str):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield {field: line.rstrip("\n")}
+
+
+def _read_jsonl(path: str):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+"""
+Dataset for data streamed from disk (a plain text file or a jsonl file).
+Filters and transformations are applied lazily, one datapoint at a time, when
+the dataset is iterated, so memory stays bounded whatever the corpus size.
+"""
+
+
+class StreamingDataset(BaseDataset):
+    tasks = KeyValueDataset.tasks
+    # a re-iterable of the (key, datapoint) pairs of a filtered or
+    # transformed stream (see BaseDataset.example_keys), None for a source
+    # stream keyed by the index of its datapoints
+    keyed_data = None
+
+    # data: a re-iterable of datapoints in the key-value format
+    # task_type and fields: as in KeyValueDataset
+    def __init__(
+        self,
+        data: Iterable[dict],
+        task_type=TaskType.TEXT_TO_TEXT_GENERATION,
+        fields: List[str] = None,
+    ):
+        super(StreamingDataset, self).__init__(data)
+        self.task_type = task_type
+        self.fields = fields
+
+    @classmethod
+    def from_text_file(
+        cls,
+        path: str,
+        task_type=TaskType.TEXT_TO_TEXT_GENERATION,
+        field: str = "text",
+    ) -> StreamingDataset:
+        # each line of the file is a datapoint with a single field
+        data = _LazyData(partial(_read_text_lines, path, field))
+        return cls(data, task_type, [field])
+
+    @classmethod
+    def from_jsonl(
+        cls,
+        path: str,
+        task_type=TaskType.TEXT_TO_TEXT_GENERATION,
+        fields: List[str] = None,
+    ) -> StreamingDataset:
+        data = _LazyData(partial(_read_jsonl, path))
+        return cls(data, task_type, fields)
+
+    def _adapters(self, subfields: List[str] = None):
+        # reuse the filter and transformation adapters of KeyValueDataset
+        return KeyValueDataset([], self.task_type, self.fields)._analyze(
+            subfields
+        )
+
+    def _keyed(self) -> Iterable:
+        if self.keyed_data is None:
+            return enumerate(self.data)
+        return iter(self.keyed_data)
+
+    def apply_filter(
+        self,
+        filter: Operation,
+        subfields: List[str] = None,
+        batch_size: int = 32,
+    ) -> StreamingDataset:
+        filter_func, _ = self._adapters(subfields)
+
+        def keyed_data():
+            for batch in _batched(self._keyed(), batch_size):
+                # the datapoints are keyed by their index in the source
+                # stream, whatever filters ran before
+                keys = [key for key, _ in batch]
+                datapoints = [datapoint for _, datapoint in batch]
+                with Operation.example_keys(keys):
+                    passed = filter_func(datapoints, filter)
+                for key, datapoint, keep in zip(keys, datapoints, passed):
+                    if keep:
+                        yield key, datapoint
+
+        def filtered_data():
+            return (datapoint for _, datapoint in keyed_data())
+
+        filtered = StreamingDataset(
+            _LazyData(filtered_data), self.task_type, self.fields
+        )
+        filtered.keyed_data = _LazyData(keyed_data)
+        return filtered
+
+    def apply_transformation(
+        self,
+        transformation: Operation,
+        subfields: List[str] = None,
+        batch_size: int = 32,
+        cache: AugmentationCache = None,
+    ) -> StreamingDataset:
+        _, transformation_func = self._adapters(subfields)
+
+        def keyed_data():
+            # calculating ratio of transformed example to unchanged example
+            data_num = 0
+            successful_num = 0
+            failed_num = 0
+            stats = TransformationStats(transformation.name())
+            stats.start()
+            for batch in _batched(self._keyed(), batch_size):
+                # the datapoints are keyed by their index in the source
+                # stream, as in apply_filter
+                keys = [key for key, _ in batch]
+                result = _transform_chunk(
+                    transformation_func,
+                    transformation,
+                    [datapoint for _, datapoint in batch],
+                    batch_size,
+                    cache,
+                    keys,
+                )
+                outputs, successful_pt, failed_pt, batch_times, _ = result
+                data_num += len(batch)
+                successful_num += successful_pt
+                failed_num += failed_pt
+                stats.add_outputs(len(batch), successful_pt, failed_pt)
+                stats.add_batches(*zip(*batch_times))
+                yield from zip(
+                    _output_keys(keys, outputs),
+                    (
+                        pt_example
+                        for pt_examples in outputs
+                        for pt_example in pt_examples
+                    ),
+                )
+            stats.stop()
+            # the statistics of the last complete pass over the stream
+            transformed.stats = stats
+            _print_transformation_summary(data_num, successful_num, failed_num)
+
+        def transformed_data():
+            return (datapoint for _, datapoint in keyed_data())
+
+        transformed = StreamingDataset(
+            _LazyData(transformed_data), self.task_type, self.fields
+        )
+        transformed.keyed_data = _LazyData(keyed_data)
+        return transformed
+
+    def to_key_value_dataset(self) -> KeyValueDataset:
+        return KeyValueDataset(list(self.data), self.task_type, self.fields)
+
+    def __iter__(self):
+        for datapoint in self.data:
+            yield (datapoint[field] for field in self.fields)
+
+    def _export_to(self, writer: DatasetWriter):
+        # the datapoints are written as they are read and transformed
+        writer.write_rows(self.data)
+
+    def __len__(self):
+        # TypeError (rather than NotImplementedError) lets list() and
+        # friends fall back to plain iteration
+        raise TypeError("The length of a StreamingDataset is not known.")
@@ -0,0 +1,196 @@
+import hashlib
+import re
+import zlib
+from collections import deque
+from typing import List
+
+import numpy as np
+
+from interfaces.Operation import Operation
+
+"""
+Removes the exact and near duplicates from a stream of datapoints, e.g. the
+outputs of a transformation which often repeat their input or each other.
+
+    dedup = Deduplicator()
+    pipeline = Pipeline([dedup, SynonymSubstitution(max_outputs=3), dedup])
+
+The Deduplicator is a filter remembering every datapoint it let through: the
+same instance placed before and after a transformation drops the outputs
+identical (or nearly so) to an original datapoint or to an earlier output.
+Exact duplicates are found by a hash of the text, near duplicates by the
+MinHash signature of its character n-grams, looked up with locality
+sensitive hashing. At most max_entries datapoints are remembered, the
+oldest being forgotten first, so that the memory stays bounded: about
+1.7 KB per datapoint with the default 64 permutations and 16 bands (mostly
+the LSH buckets and the signature), i.e. about 170 MB for the default
+100000 datapoints, and about 250 bytes with near_duplicates=False.
+"""
+
+# the hash functions of MinHash are (a * x + b) mod a prime below 2^32, so
+# that the products fit in 64 bits
+_PRIME = (1 << 31) - 1
+# the multiplier folding the rows of a band into a single 64-bit key
+_BAND_MULTIPLIER = np.uint64(0x100000001B3)
+
+
+class MinHasher(object):
+    # num_perm: the number of hash functions, i.e. the size of a signature
+    # ngram_size: the number of characters of the shingles hashed
+    def __init__(self, num_perm: int = 64, ngram_size: int = 5, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, _PRIME, num_perm).astype(np.uint64)
+        self.b = rng.randint(0, _PRIME, num_perm).astype(np.uint64)
+        self.ngram_size = ngram_size
+
+    def shingles(self, text: str) -> np.ndarray:
+        # case and spacing differences don't make texts different
+        text = re.sub(r"\s+", " ", text.lower()).strip()
+        ngrams = {
+            text[start : start + self.ngram_size]
+            for start in range(max(len(text) - self.ngram_size + 1, 1))
+        }
+        return np.fromiter(
+            (zlib.crc32(ngram.encode("utf-8")) % _PRIME for ngram in ngrams),
+            dtype=np.uint64,
+            count=len(ngrams),
+        )
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = (np.outer(self.shingles(text), self.a) + self.b) % _PRIME
+        return hashes.min(axis=0).astype(np.uint32)
+
+
+class Deduplicator(Operation):
+    """
+    A filter passing the datapoints which are not a duplicate of one it
+    passed before. It keeps state across batches, so it should be run in
+    the main process (e.g. by a Pipeline or apply_filter) rather than in
+    worker processes.
+    """
+
+    # near_duplicates: whether to drop the near duplicates as well
+    # threshold: the estimated Jaccard similarity of the n-grams of two
+    #   texts from which they are near duplicates
+    # num_perm: the size of the MinHash signatures
+    # bands: the number of bands the signatures are split in for LSH, more
+    #   bands find less similar candidates
+    # max_entries: the number of datapoints remembered (about 1.7 KB each)
+    def __init__(
+        self,
+        near_duplicates: bool = True,
+        threshold: float = 0.8,
+        num_perm: int = 64,
+        bands: int = 16,
+        ngram_size: int = 5,
+        max_entries: int = 100000,
+    ):
+        super().__init__()
+        assert num_perm % bands == 0, "num_perm should be a multiple of bands"
+        self.near_duplicates = near_duplicates
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        self.hasher = MinHasher(num_perm, ngram_size)
+        self.reset()
+
+    def reset(self):
+        self.duplicate_num = 0
+        self.near_duplicate_num = 0
+        self._hashes = set()
+        # the (id, hash) of the entries, oldest first
+        self._entries = deque()
+        self._signatures = {}
+        # the entry id (or the list of ids, if several) of every band key
+        self._buckets = [dict() for _ in range(self.bands)]
+        self._entry_num = 0
+
+    @staticmethod
+    def _text(example: tuple) -> str:
+        # the fields of a datapoint, e.g. (sentence, target)
+        if len(example) == 1 and isinstance(example[0], str):
+            return example[0]
+        return "\x1f".join(
+            value if isinstance(value, str) else repr(value)
+            for value in example
+        )
+
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        # the rows of every band folded into an integer, the collisions only
+        # adding candidates whose signatures are then compared
+        rows = signature.reshape(self.bands, self.rows).astype(np.uint64)
+        keys = np.zeros(self.bands, dtype=np.uint64)
+        for row in rows.T:
+            keys = keys * _BAND_MULTIPLIER ^ row
+        return keys.tolist()
+
+    @staticmethod
+    def _entry_ids(bucket: dict, band_key: int) -> tuple:
+        entry_ids = bucket.get(band_key, ())
+        return entry_ids if isinstance(entry_ids, list) else (entry_ids,)
+
+    def _is_near_duplicate(self, signature, band_keys) -> bool:
+        checked = set()
+        for bucket, band_key in zip(self._buckets, band_keys):
+            if band_key not in bucket:
+                continue
+            for entry_id in self._entry_ids(bucket, band_key):
+                if entry_id in checked:
+                    continue
+                checked.add(entry_id)
+                similarity = np.mean(self._signatures[entry_id] == signature)
+                if similarity >= self.threshold:
+                    return True
+        return False
+
+    def _add(self, text: str) -> bool:
+        text_hash = hashlib.blake2b(
+            text.encode("utf-8"), digest_size=8
+        ).digest()
+        if text_hash in self._hashes:
+            self.duplicate_num += 1
+            return False
+        if self.near_duplicates:
+            signature = self.hasher.signature(text)
+            band_keys = self._band_keys(signature)
+            if self._is_near_duplicate(signature, band_keys):
+                self.near_duplicate_num += 1
+                return False
+            self._signatures[self._entry_num] = signature
+            for bucket, band_key in zip(self._buckets, band_keys):
+                entry_ids = bucket.get(band_key)
+                if entry_ids is None:
+                    bucket[band_key] = self._entry_num
+                elif isinstance(entry_ids, list):
+                    entry_ids.append(self._entry_num)
+                else:
+                    bucket[band_key] = [entry_ids, self._entry_num]
+        self._hashes.add(text_hash)
+        self._entries.append((self._entry_num, text_hash))
+        self._entry_num += 1
+        while len(self._entries) > self.max_entries:
+            self._forget_oldest()
+        return True
+
+    def _forget_oldest(self):
+        entry_id, text_hash = self._entries.popleft()
+        self._hashes.discard(text_hash)
+        signature = self._signatures.pop(entry_id, None)
+        if signature is None:
+            return
+        # the band keys are found again from the signature
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            entry_ids = bucket[band_key]
+            if not isinstance(entry_ids, list):
+                del bucket[band_key]
+                continue
+            entry_ids.remove(entry_id)
+            if len(entry_ids) == 1:
+                bucket[band_key] = entry_ids[0]
+
+    def filter(self, *example) -> bool:
+        return self._add(self._text(example))
+
+    def filter_batch(self, *batches: List) -> List[bool]:
+        return [self._add(self._text(example)) for example in zip(*batches)]
@@ -1,6 +1,8 @@
 import argparse
 
+from annotations import Annotations
 from evaluation.evaluation_engine import evaluate
+from initialize import doc_cache
 from TestRunner import get_implementation
 
 parser = argparse.ArgumentParser(
@@ -30,6 +32,34 @@ parser.add_argument(
     help="percentage of examples to test",
     default=20,
 )
+parser.add_argument(
+    "-b",
+    "--batch_size",
+    help="number of examples passed at once to the transformation or filter",
+    type=int,
+    default=32,
+)
+parser.add_argument(
+    "--max_perturbed",
+    help="stop transforming after this many perturbed examples, sampled "
+    "at random from the dataset",
+    type=int,
+    default=None,
+)
+parser.add_argument(
+    "--time_budget",
+    help="stop transforming after this many seconds, sampling the "
+    "examples at random from the dataset",
+    type=float,
+    default=None,
+)
+parser.add_argument(
+    "--annotations",
+    help="directories of spaCy annotations of the dataset saved by "
+    "annotations.annotate, read rather than parsing the examples again",
+    nargs="+",
+    default=[],
+)
 
 
 """
@@ -61,6 +91,8 @@ if __name__ == "__main__":
             raise ValueError(
                 f"The specified transformation is applicable only for the locales={languages}."
             )
+        for path in args.annotations:
+            doc_cache.add_store(Annotations(path))
         evaluate(
             implementation,
             args.task_type,
@@ -69,4 +101,7 @@ if __name__ == "__main__":
             args.dataset,
             args.percentage_of_examples,
             if_filter,
+            args.batch_size,
+            args.max_perturbed,
+            args.time_budget,
         )
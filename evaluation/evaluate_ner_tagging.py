@@ -1,3 +1,5 @@
+import time
+
 import numpy as np
 from datasets import load_dataset
 from seqeval.metrics import accuracy_score
@@ -57,7 +59,13 @@ def evaluate(
     model_name,
     dataset_name,
     split="validation[:20%]",
+    operation_batch_size=32,
+    max_perturbed=None,
+    time_budget=None,
 ):
+    # max_perturbed, time_budget: the budget of the transformation, checked
+    # after every batch: the examples are then visited in a random order,
+    # and the original accuracy is measured on the sample transformed
     # load modal
     if model_name is None:
         model_name = "dslim/bert-base-NER"
@@ -70,6 +78,14 @@ def evaluate(
     )
     dataset = load_dataset(dataset_name, split=split)
     tagging_pipeline = pipeline("ner", model=model_name, tokenizer=model_name)
+    budgeted = not evaluate_filter and (
+        max_perturbed is not None or time_budget is not None
+    )
+    if budgeted:
+        dataset = dataset.shuffle(seed=0)
+    start_time = time.perf_counter()
+    example_num = 0
+    perturbed_num = 0
 
     average_score = 0.0
     average_pertubed_score = 0.0
@@ -83,41 +99,69 @@ def evaluate(
         filter_false_count = (
             0  # This will track the number of examples where the filter is -ve
         )
-    for example in dataset:
-        # Calculating the performance on the original set
-        gold_tag_seq = convert_ner_ids_to_tags(example["ner_tags"])
-        prediction = tagging_pipeline(example["tokens"])
-        predicted_tag_seq = create_prediction_seq(
-            prediction, len(gold_tag_seq)
-        )
-        score = accuracy_score([gold_tag_seq], [predicted_tag_seq])
-        average_score += score
+    for start in range(0, len(dataset), operation_batch_size):
+        # the operation is called on a batch of examples at a time
+        examples = dataset[start : start + operation_batch_size]
+        token_sequences = examples["tokens"]
+        gold_tag_seqs = [
+            convert_ner_ids_to_tags(ner_tags)
+            for ner_tags in examples["ner_tags"]
+        ]
         if evaluate_filter:
-            # The Operation is a "filter"
-            if operation.filter(example["tokens"], gold_tag_seq):
-                filter_true_average_score += score
-                filter_true_count += 1
-            else:
-                filter_false_average_score += score
-                filter_false_count += 1
+            operation_results = operation.filter_batch(
+                token_sequences, gold_tag_seqs
+            )
         else:
-            # The Operation is a "transformation"
-            # Calculating the performance on the perturbed set
             # TODO: Needs to handle for multiple outputs.
-            trans_input, trans_gold_tag_seq = operation.generate(
-                example["tokens"], gold_tag_seq
+            operation_results = operation.generate_batch(
+                token_sequences, gold_tag_seqs
             )
-            trans_gold_tag_seq = convert_ner_ids_to_tags(trans_gold_tag_seq)
-            transformed_input_prediction = tagging_pipeline(trans_input)
-            trans_predicted_tag_seq = create_prediction_seq(
-                transformed_input_prediction, len(trans_gold_tag_seq)
+        for tokens, gold_tag_seq, operation_result in zip(
+            token_sequences, gold_tag_seqs, operation_results
+        ):
+            # Calculating the performance on the original set
+            prediction = tagging_pipeline(tokens)
+            predicted_tag_seq = create_prediction_seq(
+                prediction, len(gold_tag_seq)
             )
-            pt_score = accuracy_score(
-                [trans_gold_tag_seq], [trans_predicted_tag_seq]
+            score = accuracy_score([gold_tag_seq], [predicted_tag_seq])
+            average_score += score
+            example_num += 1
+            if evaluate_filter:
+                # The Operation is a "filter"
+                if operation_result:
+                    filter_true_average_score += score
+                    filter_true_count += 1
+                else:
+                    filter_false_average_score += score
+                    filter_false_count += 1
+            else:
+                # The Operation is a "transformation"
+                # Calculating the performance on the perturbed set
+                trans_input, trans_gold_tag_seq = operation_result
+                if list(trans_input) != list(tokens):
+                    perturbed_num += 1
+                trans_gold_tag_seq = convert_ner_ids_to_tags(
+                    trans_gold_tag_seq
+                )
+                transformed_input_prediction = tagging_pipeline(trans_input)
+                trans_predicted_tag_seq = create_prediction_seq(
+                    transformed_input_prediction, len(trans_gold_tag_seq)
+                )
+                pt_score = accuracy_score(
+                    [trans_gold_tag_seq], [trans_predicted_tag_seq]
+                )
+                average_pertubed_score += pt_score
+        if budgeted and (
+            (max_perturbed is not None and perturbed_num >= max_perturbed)
+            or (
+                time_budget is not None
+                and time.perf_counter() - start_time >= time_budget
             )
-            average_pertubed_score += pt_score
+        ):
+            break
 
-    average_score = average_score / len(dataset) * 100
+    average_score = average_score / example_num * 100
 
     print(
         f"Here is the performance of the model {model_name} on the {split} split of the {dataset} dataset"
@@ -130,6 +174,7 @@ def evaluate(
         "split": split,
         "dataset_name": dataset_name,
         "accuracy": np.round(average_score, 1),
+        "no_of_examples": example_num,
     }
     if evaluate_filter:
         filter_true_average_score = (
@@ -149,8 +194,8 @@ def evaluate(
         performance["filter_true_average_score"] = filter_true_average_score
         performance["filter_false_average_score"] = filter_false_average_score
     else:
-        performance["pt_accuracy"]: np.round(average_pertubed_score, 1)
-        average_pertubed_score = average_pertubed_score / len(dataset) * 100
+        average_pertubed_score = average_pertubed_score / example_num * 100
+        performance["pt_accuracy"] = np.round(average_pertubed_score, 1)
         print(
             f"The average accuracy on its perturbed set = {average_pertubed_score}"
         )
@@ -12,7 +12,12 @@ def evaluate(
     model_name,
     dataset_name,
     split="validation[:20%]",
+    operation_batch_size=32,
+    max_perturbed=None,
+    time_budget=None,
 ):
+    # max_perturbed, time_budget: the budget of the transformation, the
+    # original accuracy is then measured on the sample transformed
     # (1) load model
     if model_name is None:
         model_name = "mrm8488/bert-tiny-5-finetuned-squadv2"
@@ -39,17 +44,35 @@ def evaluate(
     )
 
     if evaluate_filter:
-        filtered_dataset = dataset.apply_filter(operation)
+        filtered_dataset = dataset.apply_filter(
+            operation, batch_size=operation_batch_size
+        )
         print("Starting evaluation on the filtered dataset.")
         performance = evaluate_on_dataset(filtered_dataset, qa_pipeline)
     else:
+        pt_dataset = dataset.apply_transformation(
+            operation,
+            batch_size=operation_batch_size,
+            max_perturbed=max_perturbed,
+            time_budget=time_budget,
+        )
+        if pt_dataset is not None and (
+            max_perturbed is not None or time_budget is not None
+        ):
+            dataset = dataset.select(
+                pt_dataset.provenance["transformed_indices"]
+            )
         print("Starting evaluation on the original dataset.")
         performance = evaluate_on_dataset(dataset, qa_pipeline)
 
-        print("Starting evaluation on the transformed dataset.")
-        pt_dataset = dataset.apply_transformation(operation)
-        pt_performance = evaluate_on_dataset(pt_dataset, qa_pipeline)
-        performance["pt_accuracy"] = pt_performance["accuracy"]
+        if pt_dataset is None:
+            print("No transformation applied.")
+            performance["pt_accuracy"] = 0
+        else:
+            print("Starting evaluation on the transformed dataset.")
+            pt_performance = evaluate_on_dataset(pt_dataset, qa_pipeline)
+            performance["pt_accuracy"] = pt_performance["accuracy"]
+            performance["transformation_stats"] = pt_dataset.stats.to_dict()
 
     # (3) Execute perturbation
     # (4) Execute the performance of the original set and the perturbed set
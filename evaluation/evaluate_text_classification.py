@@ -85,7 +85,10 @@ def _process_model_pred(model_name, pred):
 
 def evaluate(
     operation, evaluate_filter, model_name, 
-    dataset_name, split="test[:20%]", batch_size=8, is_cuda=True):
+    dataset_name, split="test[:20%]", batch_size=8, is_cuda=True,
+    operation_batch_size=32, max_perturbed=None, time_budget=None):
+    # max_perturbed, time_budget: the budget of the transformation, the
+    # original accuracy is then measured on the sample transformed
     if model_name is None: model_name = "aychang/roberta-base-imdb"
     if dataset_name is None: dataset_name = "imdb"
     print(f"Loading <{dataset_name}> dataset to evaluate <{model_name}> model.")
@@ -106,7 +109,8 @@ def evaluate(
 
     print(f"Here is the performance of the model {model_name} on the {split} split of the {dataset_name} dataset")
     if evaluate_filter:
-        filtered_dataset = dataset.apply_filter(operation)
+        filtered_dataset = dataset.apply_filter(
+            operation, batch_size=operation_batch_size)
         print("Here is the performance of the model on the filtered set")
         accuracy, total = evaluate_dataset(
             text_classification_pipeline, filtered_dataset, 
@@ -114,12 +118,19 @@ def evaluate(
         performance["accuracy"] = accuracy
         performance["no_of_examples"] = total
     else:
+        pt_dataset = dataset.apply_transformation(
+            operation, batch_size=operation_batch_size,
+            max_perturbed=max_perturbed, time_budget=time_budget,
+            stratified=True)
+        if pt_dataset is not None and (
+                max_perturbed is not None or time_budget is not None):
+            dataset = dataset.select(
+                pt_dataset.provenance["transformed_indices"])
         accuracy, total = evaluate_dataset(
             text_classification_pipeline, dataset, 
             model_name, label_func, batch_size=batch_size)
         performance["accuracy"] = accuracy
         performance["no_of_examples"] = total
-        pt_dataset = dataset.apply_transformation(operation)
         if pt_dataset is None:
             print(f"No transformation applied.")
             accuracy = 0
@@ -128,6 +139,7 @@ def evaluate(
             accuracy, _ = evaluate_dataset(
                 text_classification_pipeline, pt_dataset, 
                 model_name, label_func, batch_size=batch_size)
+            performance["transformation_stats"] = pt_dataset.stats.to_dict()
         performance["pt_accuracy"] = accuracy
     # (3) Execute perturbation
     # (4) Execute the performance of the original set and the perturbed set
@@ -12,8 +12,17 @@ def sacrebleu_score(hypotheses, references):
 
 
 def evaluate(
-    operation, evaluate_filter, model_name, dataset_name, split="test[:20%]"
+    operation,
+    evaluate_filter,
+    model_name,
+    dataset_name,
+    split="test[:20%]",
+    operation_batch_size=32,
+    max_perturbed=None,
+    time_budget=None,
 ):
+    # max_perturbed, time_budget: the budget of the transformation, the
+    # original BLEU is then measured on the sample transformed
     # load model
     if model_name is None:
         model_name = "sshleifer/distilbart-xsum-12-6"
@@ -41,11 +50,19 @@ def evaluate(
     )
     if evaluate_filter:
         performance = filter_performance(
-            dataset, summarization_pipeline, filter=operation
+            dataset,
+            summarization_pipeline,
+            filter=operation,
+            batch_size=operation_batch_size,
         )
     else:
         performance = transformation_performance(
-            dataset, summarization_pipeline, transformation=operation
+            dataset,
+            summarization_pipeline,
+            transformation=operation,
+            batch_size=operation_batch_size,
+            max_perturbed=max_perturbed,
+            time_budget=time_budget,
         )
 
     performance["model_name"] = model_name
@@ -54,9 +71,11 @@ def evaluate(
     return performance
 
 
-def filter_performance(dataset, summarization_pipeline, filter):
+def filter_performance(dataset, summarization_pipeline, filter, batch_size=32):
     print("Here is the performance of the model on the filtered set")
-    filtered_dataset = dataset.apply_filter(filter, subfields=["document"])
+    filtered_dataset = dataset.apply_filter(
+        filter, subfields=["document"], batch_size=batch_size
+    )
     return performance_on_dataset(filtered_dataset, summarization_pipeline)
 
 
@@ -67,19 +86,39 @@ and on the perturbed set.
 
 
 def transformation_performance(
-    dataset, summarization_pipeline, transformation
+    dataset,
+    summarization_pipeline,
+    transformation,
+    batch_size=32,
+    max_perturbed=None,
+    time_budget=None,
 ):
+    pt_dataset = dataset.apply_transformation(
+        transformation,
+        subfields=["document"],
+        batch_size=batch_size,
+        max_perturbed=max_perturbed,
+        time_budget=time_budget,
+    )
+    if pt_dataset is not None and (
+        max_perturbed is not None or time_budget is not None
+    ):
+        dataset = dataset.select(pt_dataset.provenance["transformed_indices"])
     performance = performance_on_dataset(
         dataset, summarization_pipeline
     )  # 15.989 BLEU
-    pt_dataset = dataset.apply_transformation(
-        transformation, subfields=["document"]
-    )
+    if pt_dataset is None:
+        print("No transformation applied.")
+        return {"bleu": performance["bleu"], "pt_bleu": 0}
     print("Here is the performance of the model on the transformed set")
     pt_performance = performance_on_dataset(
         pt_dataset, summarization_pipeline
     )  # 11.830 BLEU
-    return {"bleu": performance["bleu"], "pt_bleu": pt_performance["bleu"]}
+    return {
+        "bleu": performance["bleu"],
+        "pt_bleu": pt_performance["bleu"],
+        "transformation_stats": pt_dataset.stats.to_dict(),
+    }
 
 
 def performance_on_dataset(dataset, summarization_pipeline):
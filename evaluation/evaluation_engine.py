@@ -24,6 +24,9 @@ def evaluate(
     dataset=None,
     percentage_of_examples=None,
     evaluate_filter=False,
+    batch_size=32,
+    max_perturbed=None,
+    time_budget=None,
 ):
     # The evaluation engine would effectively do the following
     # (1) Loading a standard model and a test set (the model's original test set would be the best choice)
@@ -39,6 +42,9 @@ def evaluate(
         model_name=model,
         dataset=dataset,
         percentage_of_examples=percentage_of_examples,
+        batch_size=batch_size,
+        max_perturbed=max_perturbed,
+        time_budget=time_budget,
     )
     return
 
@@ -75,7 +81,13 @@ def execute_model(
     dataset=None,
     percentage_of_examples=20,
     evaluate_filter=False,
+    batch_size=32,
+    max_perturbed=None,
+    time_budget=None,
 ):
+    # batch_size: the number of examples passed at once to the operation
+    # max_perturbed, time_budget: the budget of the transformation, which
+    #   then only transforms (and evaluates) a sample of the examples
     interface = implementation.__bases__[0]  # SentenceTransformation
     impl = implementation()
     if locale is "en":
@@ -89,6 +101,9 @@ def execute_model(
                 model_name,
                 dataset,
                 split=f"test[:{percentage_of_examples}%]",
+                operation_batch_size=batch_size,
+                max_perturbed=max_perturbed,
+                time_budget=time_budget,
             )
 
         elif (
@@ -101,6 +116,9 @@ def execute_model(
                 model_name,
                 dataset,
                 split=f"validation[:{percentage_of_examples}%]",
+                operation_batch_size=batch_size,
+                max_perturbed=max_perturbed,
+                time_budget=time_budget,
             )
 
         elif (
@@ -113,6 +131,9 @@ def execute_model(
                 model_name,
                 dataset,
                 split=f"test[:{percentage_of_examples}%]",
+                operation_batch_size=batch_size,
+                max_perturbed=max_perturbed,
+                time_budget=time_budget,
             )
 
         elif (
@@ -125,6 +146,9 @@ def execute_model(
                 model_name,
                 dataset,
                 split=f"test[:{percentage_of_examples}%]",
+                operation_batch_size=batch_size,
+                max_perturbed=max_perturbed,
+                time_budget=time_budget,
             )
         # Other if else cases should be added here.
         else:
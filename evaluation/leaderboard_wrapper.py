@@ -1,3 +1,4 @@
+import json
 import sys
 
 import pandas as pd
@@ -82,6 +83,9 @@ def create_leaderboard_for_task(
     result_dict = {
         t.name(): {"Transformation": t.name()} for t in transformations
     }
+    # the statistics of every transformation run, saved next to the
+    # leaderboard to track the performance of the transformations
+    run_stats = {t.name(): [] for t in transformations}
     for model_name, dataset_name in DEFAULT_LEADERBOARD_MODELS[task_name]:
         # TODO: should we try to allow passing in models, rather than model names?
         # in this leaderboard case the default implementation will cause unnecessary
@@ -102,6 +106,13 @@ def create_leaderboard_for_task(
                 if "bleu" in result:
                     key, pt_key = "bleu", "pt_bleu"
                 result_dict[trans.name()][f"{model_name.split('/')[-1]}"] = f"{result[key]}->{result[pt_key]} ({result[pt_key]-result[key]})"
+                if "transformation_stats" in result:
+                    stats = result["transformation_stats"]
+                    run_stats[trans.name()].append(stats)
+                    # the throughput of the transformation (examples/s)
+                    result_dict[trans.name()]["Examples/s"] = round(
+                        stats["examples_per_second"], 1
+                    )
             except Exception as e:
                 print(f"\t Error on {trans.name()}: {e}")
     df_result = pd.DataFrame(list(result_dict.values()))
@@ -110,6 +121,9 @@ def create_leaderboard_for_task(
     filename = f"leaderboard_{TaskType(task_type).name}.csv"
     df_result.to_csv(filename)
     print("Saved the result to f{filename}")
+    stats_filename = f"leaderboard_{TaskType(task_type).name}_stats.json"
+    with open(stats_filename, "w") as file:
+        json.dump(run_stats, file, indent=2)
     return result_dict
 
 
@@ -0,0 +1,93 @@
+import contextlib
+import multiprocessing
+import signal
+import threading
+from typing import Callable
+
+"""
+Time limit on the transformation of every example, so that a pathological
+input (e.g. a very long document) can't stall a whole run.
+
+    dataset.apply_transformation(
+        t, num_workers=4, example_timeout=5, max_timeouts=10
+    )
+
+The limit is enforced with SIGALRM, in the main thread of this process or
+of the worker processes. An example over the limit gets its unchanged input
+as output, and is counted as a timeout rather than as a failed perturbation.
+Once max_timeouts examples timed out (in any of the workers), the guard trips
+and disables the transformation for the rest of the run.
+"""
+
+
+class ExampleTimeout(BaseException):
+    # a BaseException, so that the "except Exception" of the operations
+    # don't swallow it
+    pass
+
+
+@contextlib.contextmanager
+def time_limit(seconds: float):
+    """Raises ExampleTimeout in the block once the given seconds passed."""
+
+    def on_alarm(signum, frame):
+        raise ExampleTimeout()
+
+    previous_handler = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+class ExampleTimeoutGuard(object):
+    """
+    Runs the transformation of every example within the time limit. SIGALRM
+    can't interrupt a long-running C call (spaCy, numpy): an example stuck
+    in one times out only after the call returns, so the limit bounds the
+    Python code of the operations, not their calls into extensions.
+    """
+
+    # timeout: the time limit of every example, in seconds
+    # max_timeouts: the number of examples timing out after which the
+    #   transformation is disabled
+    def __init__(self, timeout: float, max_timeouts: int = 10):
+        self.timeout = timeout
+        self.max_timeouts = max_timeouts
+        # shared with the worker processes the guard is given to
+        self._shared_timeout_num = multiprocessing.Value("i", 0)
+        # the examples which timed out, or were skipped once disabled, in
+        # this process
+        self.timeout_num = 0
+        self.skipped_num = 0
+
+    def check(self):
+        if not hasattr(signal, "setitimer"):
+            raise ValueError("Example timeouts are not supported here.")
+        if threading.current_thread() is not threading.main_thread():
+            raise ValueError(
+                "Example timeouts can only be enforced in the main thread."
+            )
+
+    @property
+    def disabled(self) -> bool:
+        return self._shared_timeout_num.value >= self.max_timeouts
+
+    def call(self, func: Callable, *args):
+        """
+        Returns (True, func(*args)), or (False, None) if func timed out or
+        the guard is disabled.
+        """
+        if self.disabled:
+            self.skipped_num += 1
+            return False, None
+        try:
+            with time_limit(self.timeout):
+                return True, func(*args)
+        except ExampleTimeout:
+            self.timeout_num += 1
+            with self._shared_timeout_num.get_lock():
+                self._shared_timeout_num.value += 1
+            return False, None
@@ -0,0 +1,264 @@
+import gzip
+import io
+import json
+from collections.abc import Mapping
+from typing import Iterable, List
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only needed by the parquet writer
+    pa = None
+    pq = None
+
+try:
+    import zstandard
+except ImportError:  # only needed by the zstd compression
+    zstandard = None
+
+"""
+Writers saving datasets to disk, chunk by chunk: rows are buffered and
+every chunk is encoded and written at once, so that a dataset streamed
+through a pipeline can be written as it is transformed.
+
+    with open_writer("augmented.jsonl.gz") as writer:
+        writer.write_rows(rows)
+
+    pipeline.apply(StreamingDataset.from_jsonl(path)).export("out.parquet")
+"""
+
+FORMATS = {
+    ".jsonl": "jsonl",
+    ".json": "jsonl",
+    ".tsv": "tsv",
+    ".parquet": "parquet",
+}
+COMPRESSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+
+def _json_default(value):
+    # the labels and values read from numpy or arrow
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(
+        f"Object of type {type(value).__name__} is not JSON serializable"
+    )
+
+
+def _open_binary(path: str, compression: str = None):
+    if compression is None:
+        return open(path, "wb")
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=6)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("The zstd compression requires zstandard.")
+        # closing the writer closes the file
+        return zstandard.ZstdCompressor().stream_writer(open(path, "wb"))
+    raise ValueError(f"Unknown compression {compression}.")
+
+
+class DatasetWriter(object):
+    """
+    Base of the writers: buffers the rows (dicts) given to it and writes
+    them chunk_size at a time. Writers are context managers, closing the
+    file on exit.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 1000):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.row_num = 0
+        self._rows = []
+
+    def write(self, row: Mapping):
+        if not isinstance(row, dict):
+            # e.g. the rows of a columnar dataset
+            row = dict(row)
+        self._rows.append(row)
+        if len(self._rows) >= self.chunk_size:
+            self.flush()
+
+    def write_rows(self, rows: Iterable[Mapping]):
+        for row in rows:
+            self.write(row)
+
+    def write_table(self, table):
+        """Writes the rows of a pyarrow Table."""
+        self.flush()
+        for batch in table.to_batches(self.chunk_size):
+            self._write_chunk(batch.to_pylist())
+            self.row_num += batch.num_rows
+
+    def flush(self):
+        if self._rows:
+            self._write_chunk(self._rows)
+            self.row_num += len(self._rows)
+            self._rows = []
+
+    def _write_chunk(self, rows: List[dict]):
+        raise NotImplementedError(
+            "DatasetWriter does not implement this function."
+        )
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class JsonlWriter(DatasetWriter):
+    # compression: None, "gzip" or "zstd"
+    def __init__(
+        self, path: str, compression: str = None, chunk_size: int = 1000
+    ):
+        super(JsonlWriter, self).__init__(path, chunk_size)
+        self.file = _open_binary(path, compression)
+        # one encoder for every row, rather than one per json.dumps call
+        self.encoder = json.JSONEncoder(
+            ensure_ascii=False, default=_json_default
+        )
+
+    def _write_chunk(self, rows: List[dict]):
+        lines = "\n".join(map(self.encoder.encode, rows))
+        self.file.write((lines + "\n").encode("utf-8"))
+
+    def close(self):
+        super(JsonlWriter, self).close()
+        self.file.close()
+
+
+def _tsv_value(value) -> str:
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False, default=_json_default)
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class TsvWriter(DatasetWriter):
+    """
+    Writes a header followed by a line per row, the tabs and newlines of
+    the values being escaped and the values other than strings written as
+    JSON.
+    """
+
+    # fields: the columns written, those of the first row by default
+    # compression: None, "gzip" or "zstd"
+    def __init__(
+        self,
+        path: str,
+        fields: List[str] = None,
+        compression: str = None,
+        chunk_size: int = 1000,
+    ):
+        super(TsvWriter, self).__init__(path, chunk_size)
+        self.file = _open_binary(path, compression)
+        self.fields = fields
+
+    def _write_chunk(self, rows: List[dict]):
+        lines = io.StringIO()
+        if self.fields is None:
+            self.fields = list(rows[0].keys())
+        if self.row_num == 0:
+            lines.write("\t".join(map(_tsv_value, self.fields)) + "\n")
+        for row in rows:
+            lines.write(
+                "\t".join(_tsv_value(row[field]) for field in self.fields)
+                + "\n"
+            )
+        self.file.write(lines.getvalue().encode("utf-8"))
+
+    def close(self):
+        super(TsvWriter, self).close()
+        self.file.close()
+
+
+class ParquetWriter(DatasetWriter):
+    """
+    Writes a row group per chunk, with the schema of the first chunk.
+    Columnar datasets are written from their table without conversion.
+    """
+
+    # compression: the parquet codec, e.g. "snappy", "gzip" or "zstd"
+    def __init__(
+        self, path: str, compression: str = "snappy", chunk_size: int = 1000
+    ):
+        if pq is None:
+            raise ImportError("The parquet writer requires pyarrow.")
+        super(ParquetWriter, self).__init__(path, chunk_size)
+        self.compression = compression or "none"
+        self.writer = None
+
+    def write_table(self, table):
+        self.flush()
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(
+                self.path, table.schema, compression=self.compression
+            )
+        self.writer.write_table(table, row_group_size=self.chunk_size)
+        self.row_num += table.num_rows
+
+    def _write_chunk(self, rows: List[dict]):
+        schema = None if self.writer is None else self.writer.schema
+        table = pa.Table.from_pylist(rows, schema=schema)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(
+                self.path, table.schema, compression=self.compression
+            )
+        self.writer.write_table(table)
+
+    def close(self):
+        super(ParquetWriter, self).close()
+        if self.writer is not None:
+            self.writer.close()
+
+
+def _infer_format(path: str):
+    # e.g. "data.jsonl.gz" is gzipped JSON lines
+    name = path.lower()
+    compression = None
+    for extension, name_compression in COMPRESSIONS.items():
+        if name.endswith(extension):
+            name = name[: -len(extension)]
+            compression = name_compression
+    for extension, format in FORMATS.items():
+        if name.endswith(extension):
+            return format, compression
+    return None, compression
+
+
+# path: the file written
+# format: "jsonl", "tsv" or "parquet", told by the extension of the path
+#   (e.g. .jsonl.gz) by default, as is the compression
+# compression: "gzip" or "zstd", the codec for parquet
+# chunk_size: the number of rows written at a time
+def open_writer(
+    path: str,
+    format: str = None,
+    compression: str = None,
+    chunk_size: int = 1000,
+) -> DatasetWriter:
+    inferred_format, inferred_compression = _infer_format(str(path))
+    format = format or inferred_format
+    compression = compression or inferred_compression
+    if format == "jsonl":
+        return JsonlWriter(path, compression, chunk_size)
+    if format == "tsv":
+        return TsvWriter(path, compression=compression, chunk_size=chunk_size)
+    if format == "parquet":
+        return ParquetWriter(path, compression or "snappy", chunk_size)
+    raise ValueError(f"Can't tell the format to write {path} in.")
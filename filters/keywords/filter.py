@@ -1,7 +1,6 @@
 from interfaces.SentenceOperation import SentenceOperation
 from tasks.TaskTypes import TaskType
-from initialize import spacy_nlp
-import spacy
+from initialize import tokenize
 
 
 class TextContainsKeywordsFilter(SentenceOperation):
@@ -13,10 +12,8 @@ class TextContainsKeywordsFilter(SentenceOperation):
         if keywords is None:
             keywords = ["these", "keywords", "are", "only", "for", "demo"]
         self.keywords = keywords
-        self.nlp = spacy_nlp if spacy_nlp else spacy.load("en_core_web_sm")
 
     def filter(self, sentence: str = None) -> bool:
-        tokenized = self.nlp(sentence, disable=["parser", "tagger", "ner"])
-        tokenized = [token.text for token in tokenized]
+        tokenized = tokenize(sentence)
         contained_keywords = set(tokenized).intersection(set(self.keywords))
         return bool(contained_keywords)
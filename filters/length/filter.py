@@ -1,9 +1,7 @@
 import operator
 from typing import List
 
-import spacy
-
-from initialize import spacy_nlp
+from initialize import tokenize
 from interfaces.SentenceOperation import (
     SentenceAndTargetOperation,
     SentenceOperation,
@@ -23,7 +21,6 @@ class TextLengthFilter(SentenceOperation):
         super().__init__()
         self.operator = self.parse_operator(op)
         self.threshold = threshold
-        self.nlp = spacy_nlp if spacy_nlp else spacy.load("en_core_web_sm")
 
     @staticmethod
     def parse_operator(op):
@@ -37,8 +34,7 @@ class TextLengthFilter(SentenceOperation):
         return ops[op]
 
     def filter(self, sentence: str = None) -> bool:
-        tokenized = self.nlp(sentence, disable=["parser", "tagger", "ner"])
-        return self.operator(len(tokenized), self.threshold)
+        return self.operator(len(tokenize(sentence)), self.threshold)
 
 
 """
@@ -55,7 +51,6 @@ class SentenceAndTargetLengthFilter(SentenceAndTargetOperation):
         super().__init__()
         self.operators = [TextLengthFilter.parse_operator(op) for op in ops]
         self.thresholds = thresholds
-        self.nlp = spacy_nlp if spacy_nlp else spacy.load("en_core_web_sm")
 
         self._sanity_check()
 
@@ -68,12 +63,8 @@ class SentenceAndTargetLengthFilter(SentenceAndTargetOperation):
         ), "SentenceAndTargetOperation only support two inputs."
 
     def filter(self, sentence: str = None, target: str = None) -> bool:
-        tokenized_sentence = self.nlp(
-            sentence, disable=["parser", "tagger", "ner"]
-        )
-        tokenized_target = self.nlp(
-            target, disable=["parser", "tagger", "ner"]
-        )
+        tokenized_sentence = tokenize(sentence)
+        tokenized_target = tokenize(target)
 
         condition1 = self.operators[0](
             len(tokenized_sentence), self.thresholds[0]
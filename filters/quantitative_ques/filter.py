@@ -1,9 +1,9 @@
-import spacy
+from initialize import SpacyBatchMixin, parse, spacy_model
 from interfaces.QuestionAnswerOperation import QuestionAnswerOperation
 from tasks.TaskTypes import TaskType
 
 
-class QuantitativeQuestion(QuestionAnswerOperation):
+class QuantitativeQuestion(SpacyBatchMixin, QuestionAnswerOperation):
     '''
     This filter used to identify the quantitative questions in a dataset
     It identifies the commonly used quant questions based on lexical matching
@@ -11,10 +11,13 @@ class QuantitativeQuestion(QuestionAnswerOperation):
     '''
     tasks = [TaskType.QUESTION_ANSWERING, TaskType.QUESTION_GENERATION]
     languages = ["en"]
+    pipe_disable = ["parser", "tagger", "ner"]
+    # only the questions are parsed
+    parsed_arguments = (1,)
 
     def __init__(self):
         super().__init__()
-        self.nlp = spacy.load("en_core_web_sm")
+        self.nlp = spacy_model(owner=self)
         # Covers the broad types of quant questions: distance , age , measurable , un-measurable
         self.quant_ques = ['many','much',
                            'close','far',
@@ -28,7 +31,7 @@ class QuantitativeQuestion(QuestionAnswerOperation):
 
 
     def filter(self,context:str = None,question: str = None,answers:str = None) -> bool:
-        tokenized = self.nlp(question, disable=["parser", "tagger", "ner"])
+        tokenized = parse(self.nlp, question, self.pipe_disable)
         return ('how' == tokenized[0].text.lower() and tokenized[1].text.lower() in self.quant_ques)
 
 
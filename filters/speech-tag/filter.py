@@ -4,7 +4,7 @@ from typing import Union
 
 import spacy
 
-from initialize import spacy_nlp
+from initialize import SpacyBatchMixin, parse, spacy_model
 from interfaces.SentenceOperation import SentenceOperation
 from tasks.TaskTypes import TaskType
 
@@ -13,9 +13,11 @@ A filter on if the tokens contain specific speech tag a certain number of times.
 """
 
 
-class SpeechTagFilter(SentenceOperation):
+class SpeechTagFilter(SpacyBatchMixin, SentenceOperation):
     tasks = [TaskType.TEXT_CLASSIFICATION, TaskType.TEXT_TO_TEXT_GENERATION]
     languages = ["en"]
+    # only the part-of-speech tags are needed
+    pipe_disable = ["parser", "ner", "lemmatizer"]
 
     def __init__(
         self,
@@ -31,7 +33,7 @@ class SpeechTagFilter(SentenceOperation):
         self.final_operators = self.parse_operator(operations)
         self.final_speech_tags = self.convert_scalar_to_list(speech_tags)
         self.final_thresholds = self.convert_scalar_to_list(thresholds)
-        self.nlp = spacy_nlp if spacy_nlp else spacy.load("en_core_web_sm")
+        self.nlp = spacy_model(owner=self)
         self.percentages = percentages
         self.sanity_check()
 
@@ -116,7 +118,7 @@ class SpeechTagFilter(SentenceOperation):
                 )
 
     def filter(self, sentence):
-        doc = self.nlp(sentence)
+        doc = parse(self.nlp, sentence, self.pipe_disable)
         contained_speech_tags = doc.count_by(spacy.attrs.IDS["POS"])
         human_readable_tags = {}
         for pos, count in contained_speech_tags.items():
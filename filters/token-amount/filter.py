@@ -1,6 +1,6 @@
 import operator
-import spacy
 
+from initialize import tokenize
 from interfaces.SentenceOperation import SentenceOperation
 from tasks.TaskTypes import TaskType
 from collections import defaultdict
@@ -26,7 +26,6 @@ class TokenAmountFilter(SentenceOperation):
         self.final_operators = self.parse_operator(operations)
         self.final_keywords = self.convert_scalar_to_list(keywords)
         self.final_thresholds = self.convert_scalar_to_list(thresholds)
-        self.nlp = spacy.load("en_core_web_sm")
         self.sanity_check()
 
     def get_input_length(self, keywords, thresholds, operations):
@@ -108,10 +107,9 @@ class TokenAmountFilter(SentenceOperation):
                 )
 
     def filter(self, sentence):
-        tokenized = self.nlp(sentence, disable=["parser", "tagger", "ner"])
         contained_keywords = defaultdict(int)
-        for token in tokenized:
-            contained_keywords[token.text] += 1
+        for token in tokenize(sentence):
+            contained_keywords[token] += 1
 
         # Go through each comparison, stop if one of them evaluates to False
         for curr_keyword, curr_threshold, curr_operator in zip(
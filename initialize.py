@@ -1,4 +1,14 @@
+import functools
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Iterable, List, Tuple
+
 import spacy
+from spacy.language import Language
+from spacy.tokens import Doc
 
 # Use this file to initialize all the heavy common packages shared by multiple transformation and filters.
 
@@ -7,5 +17,382 @@ spacy_nlp = None
 
 def initialize_models():
     global spacy_nlp
-    # load spacy
-    spacy_nlp = spacy.load("en_core_web_sm")
+    # load spacy, kept loaded for the whole run
+    spacy_nlp = spacy_model("en_core_web_sm")
+
+
+def _resident_memory() -> int:
+    # the resident memory of this process (in bytes), None if unknown
+    try:
+        with open("/proc/self/statm") as file:
+            pages = int(file.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class _LoadedModel(object):
+    def __init__(self, nlp: Language, load_time: float, memory: int):
+        self.nlp = nlp
+        self.load_time = load_time
+        self.memory = memory
+        self.references = 0
+
+
+class ModelRegistry(object):
+    """
+    Loads every spaCy model once per process, the first time an operation
+    asks for it, and hands out the same pipeline to every operation asking
+    for it with the same components. A model is referenced by the operations
+    it was handed to and unloaded once all of them are garbage collected
+    (the models handed out without an owner stay loaded).
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, disable: Iterable[str], exclude: Iterable[str]):
+        return (name, tuple(sorted(disable)), tuple(sorted(exclude)))
+
+    # name: the package name or path of the model
+    # owner: the object using the model, which releases it when collected
+    # disable: the components loaded but not run
+    # exclude: the components not loaded at all
+    def acquire(
+        self,
+        name: str,
+        owner: object = None,
+        disable: Iterable[str] = (),
+        exclude: Iterable[str] = (),
+    ) -> Language:
+        key = self._key(name, disable, exclude)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                memory = _resident_memory()
+                start_time = time.perf_counter()
+                nlp = spacy.load(
+                    name, disable=list(disable), exclude=list(exclude)
+                )
+                load_time = time.perf_counter() - start_time
+                if memory is not None:
+                    memory = _resident_memory() - memory
+                model = _LoadedModel(nlp, load_time, memory)
+                self._models[key] = model
+            model.references += 1
+        if owner is not None:
+            weakref.finalize(owner, self._release, key)
+        return model.nlp
+
+    def _release(self, key: tuple):
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                return
+            model.references -= 1
+            if model.references > 0:
+                return
+            del self._models[key]
+        # the cached Docs hold on to the vocab of the model
+        doc_cache.discard(model.nlp)
+
+    def memory_report(self) -> dict:
+        """
+        The models loaded, with the number of operations referencing them,
+        their load time (in seconds) and the increase of the resident memory
+        of this process while loading them (in bytes, None if unknown).
+        """
+        with self._lock:
+            return {
+                "{} (disable={}, exclude={})".format(*key): {
+                    "references": model.references,
+                    "load_time": model.load_time,
+                    "memory": model.memory,
+                    "components": model.nlp.pipe_names,
+                }
+                for key, model in self._models.items()
+            }
+
+
+class DocCache(object):
+    """
+    A bounded LRU cache of the spaCy Docs parsed in this process, keyed by
+    the text and the configuration of the pipeline parsing it, so that the
+    filters and transformations run on the same text parse it only once.
+    A Doc parsed by some components of a pipeline also serves the requests
+    running fewer of them, whatever components they disable. The Docs are shared: operations must not
+    modify them. The Docs missing from the cache are looked up in the
+    stores added (e.g. precomputed annotations, see annotations.py) before
+    being parsed, and kept in the cache either way.
+    """
+
+    # max_entries: the number of Docs kept, the least recently used one
+    #   being dropped first
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._docs = OrderedDict()
+        # the pipeline keys of the Docs cached for every text
+        self._pipeline_keys = {}
+        self._stores = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def pipeline_key(nlp: Language, disable: Iterable[str] = ()) -> tuple:
+        # the pipelines of the same package running the same components
+        # annotate a text the same way
+        meta = nlp.meta
+        return (
+            meta.get("lang"),
+            meta.get("name"),
+            meta.get("version"),
+            tuple(name for name in nlp.pipe_names if name not in disable),
+        )
+
+    @staticmethod
+    def covers(parsed_key: tuple, pipeline_key: tuple) -> bool:
+        # a pipeline of the same package running some of the components
+        # which parsed a Doc gets the same annotations
+        return parsed_key[:3] == pipeline_key[:3] and set(
+            pipeline_key[3]
+        ).issubset(parsed_key[3])
+
+    # store: an object whose get(nlp, text, pipeline_key) returns the Doc of
+    #   the text annotated by the pipeline, or None
+    def add_store(self, store):
+        with self._lock:
+            self._stores.append(store)
+
+    def remove_store(self, store):
+        with self._lock:
+            self._stores.remove(store)
+
+    def _cached(self, text: str, pipeline_key: tuple):
+        # called with the lock held
+        for parsed_key in self._pipeline_keys.get(text, ()):
+            if self.covers(parsed_key, pipeline_key):
+                key = (text, parsed_key)
+                self._docs.move_to_end(key)
+                self.hits += 1
+                return self._docs[key]
+        return None
+
+    def _stored(self, nlp: Language, text: str, pipeline_key: tuple):
+        # called without the lock, as a store may have to read the Doc
+        with self._lock:
+            stores = list(self._stores)
+        for store in stores:
+            doc = store.get(nlp, text, pipeline_key)
+            if doc is not None:
+                return doc
+        return None
+
+    def _add(self, key: tuple, doc: Doc, parsed: bool):
+        # a Doc missing from the cache, found in a store or parsed
+        with self._lock:
+            if parsed:
+                self.misses += 1
+            else:
+                self.hits += 1
+            self._insert(key, doc)
+
+    def get(self, nlp: Language, text: str, disable: Iterable[str] = ()):
+        disable = list(disable)
+        pipeline_key = self.pipeline_key(nlp, disable)
+        with self._lock:
+            doc = self._cached(text, pipeline_key)
+        if doc is None:
+            doc = self._stored(nlp, text, pipeline_key)
+            parsed = doc is None
+            if parsed:
+                # parsed outside of the lock, so that threads parse
+                # concurrently
+                doc = nlp(text, disable=disable)
+            self._add((text, pipeline_key), doc, parsed)
+        return doc
+
+    # batch_size: the number of texts nlp.pipe parses at a time
+    # n_process: the number of processes nlp.pipe parses with
+    def get_many(
+        self,
+        nlp: Language,
+        texts: Iterable[str],
+        disable: Iterable[str] = (),
+        batch_size: int = 64,
+        n_process: int = 1,
+    ) -> List[Doc]:
+        """
+        The Docs of the texts, the ones missing from the cache being parsed
+        together by nlp.pipe.
+        """
+        texts = list(texts)
+        disable = list(disable)
+        pipeline_key = self.pipeline_key(nlp, disable)
+        docs = {}
+        with self._lock:
+            for text in texts:
+                if text not in docs:
+                    docs[text] = self._cached(text, pipeline_key)
+        missing = []
+        for text, doc in docs.items():
+            if doc is None:
+                doc = self._stored(nlp, text, pipeline_key)
+                if doc is None:
+                    missing.append(text)
+                else:
+                    docs[text] = doc
+                    self._add((text, pipeline_key), doc, False)
+        parsed = nlp.pipe(
+            missing,
+            disable=disable,
+            batch_size=batch_size,
+            n_process=n_process,
+        )
+        for text, doc in zip(missing, parsed):
+            docs[text] = doc
+            self._add((text, pipeline_key), doc, True)
+        return [docs[text] for text in texts]
+
+    def _insert(self, key: tuple, doc: Doc):
+        # called with the lock held
+        if key not in self._docs:
+            text, pipeline_key = key
+            self._pipeline_keys.setdefault(text, []).append(pipeline_key)
+        self._docs[key] = doc
+        self._docs.move_to_end(key)
+        while len(self._docs) > self.max_entries:
+            self._remove(next(iter(self._docs)))
+
+    def _remove(self, key: tuple):
+        # called with the lock held
+        del self._docs[key]
+        text, pipeline_key = key
+        pipeline_keys = self._pipeline_keys[text]
+        pipeline_keys.remove(pipeline_key)
+        if not pipeline_keys:
+            del self._pipeline_keys[text]
+
+    def put(self, key: tuple, doc: Doc):
+        with self._lock:
+            self._insert(key, doc)
+
+    def discard(self, nlp: Language):
+        """Drops the Docs parsed by the pipeline, e.g. once it's unloaded."""
+        package = self.pipeline_key(nlp)[:3]
+        with self._lock:
+            # the pipelines of the same package loaded separately have their
+            # own vocab, which their Docs hold on to
+            keys = [
+                key
+                for key, doc in self._docs.items()
+                if key[1][:3] == package and doc.vocab is nlp.vocab
+            ]
+            for key in keys:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self._pipeline_keys.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+
+# the Doc cache shared by every operation of this process
+doc_cache = DocCache()
+
+
+# nlp: the spaCy pipeline parsing the text
+# disable: the components of the pipeline the operation doesn't need
+def parse(nlp: Language, text: str, disable: Iterable[str] = ()) -> Doc:
+    """Returns the Doc of the text, parsed once per process and pipeline."""
+    return doc_cache.get(nlp, text, disable)
+
+
+def parse_batch(
+    nlp: Language,
+    texts: Iterable[str],
+    disable: Iterable[str] = (),
+    batch_size: int = 64,
+    n_process: int = 1,
+) -> List[Doc]:
+    """Same as parse for many texts, parsed together by nlp.pipe."""
+    return doc_cache.get_many(nlp, texts, disable, batch_size, n_process)
+
+
+@functools.lru_cache(maxsize=None)
+def english_tokenizer():
+    """
+    The tokenizer of spaCy's English pipelines, without loading a model: the
+    operations which only need tokens don't have to run a whole pipeline.
+    """
+    return spacy.blank("en").tokenizer
+
+
+@functools.lru_cache(maxsize=100000)
+def tokenize(text: str) -> Tuple[str, ...]:
+    """
+    The texts of the tokens of the text, as tokenized by the English
+    pipelines. Cached, so that the filters counting tokens share them.
+    """
+    return tuple(token.text for token in english_tokenizer()(text))
+
+
+class SpacyBatchMixin(object):
+    """
+    Gives an operation parsing its inputs with self.nlp a batched path:
+    generate_batch and filter_batch parse the whole batch with nlp.pipe
+    into the Doc cache, where generate and filter then find the Doc of each
+    example. Those should parse with parse(self.nlp, text, self.pipe_disable)
+    so that they look up the same Docs.
+    """
+
+    # the components of the pipeline the operation doesn't need
+    pipe_disable = ()
+    # the arguments of generate and filter holding the texts parsed
+    parsed_arguments = (0,)
+    # the number of texts parsed at a time, and of processes parsing them
+    pipe_batch_size = 64
+    n_process = 1
+
+    def parse_batches(self, batches):
+        for index in self.parsed_arguments:
+            parse_batch(
+                self.nlp,
+                batches[index],
+                self.pipe_disable,
+                self.pipe_batch_size,
+                self.n_process,
+            )
+
+    def generate_batch(self, *batches: List) -> List[List]:
+        self.parse_batches(batches)
+        return super().generate_batch(*batches)
+
+    def filter_batch(self, *batches: List) -> List[bool]:
+        self.parse_batches(batches)
+        return super().filter_batch(*batches)
+
+
+# the models shared by every operation of this process
+model_registry = ModelRegistry()
+
+
+# name: the package name or path of the model
+# owner: the operation using the model, which releases it when collected
+# disable: the components loaded but not run
+# exclude: the components not loaded at all
+def spacy_model(
+    name: str = "en_core_web_sm",
+    owner: object = None,
+    disable: Iterable[str] = (),
+    exclude: Iterable[str] = (),
+) -> Language:
+    """Returns the spaCy pipeline shared by the operations asking for it."""
+    return model_registry.acquire(name, owner, disable, exclude)
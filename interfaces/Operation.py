@@ -1,6 +1,55 @@
-from typing import Tuple, List
+import asyncio
+import contextlib
+import contextvars
+import hashlib
+import random
+import threading
+from typing import Hashable, Iterable, List, Tuple
+
+import numpy as np
+
 """Generic operation class. """
 
+# the keys of the examples being processed, e.g. their index in the whole
+# dataset, set by the datasets while they run an operation
+_example_keys = contextvars.ContextVar("example_keys", default=None)
+# the key of the example being processed by generate or filter
+_example_key = contextvars.ContextVar("example_key", default=None)
+# guards the global generators seeded for third-party code
+_global_rng_lock = threading.RLock()
+
+
+@contextlib.contextmanager
+def example_keys(keys: Iterable[Hashable]):
+    """
+    Runs operations knowing the keys of the examples in the batches given to
+    them, so that the randomness of each example derives from its key rather
+    than from the examples processed before it.
+    """
+    token = _example_keys.set(list(keys))
+    try:
+        yield
+    finally:
+        _example_keys.reset(token)
+
+
+def current_example_keys():
+    return _example_keys.get()
+
+
+@contextlib.contextmanager
+def example_key(key: Hashable):
+    """Runs generate or filter on the example with the given key."""
+    token = _example_key.set(key)
+    try:
+        yield
+    finally:
+        _example_key.reset(token)
+
+
+def current_example_key():
+    return _example_key.get()
+
 
 class Operation(object):
     languages = None
@@ -9,13 +58,107 @@ class Operation(object):
     heavy = False
     max_outputs = 1
 
+    def __new__(cls, *args, **kwargs):
+        # Keep the constructor arguments around so that an identical
+        # operation can be re-created elsewhere, e.g. in a worker process.
+        operation = super(Operation, cls).__new__(cls)
+        operation.init_args = args
+        operation.init_kwargs = kwargs
+        return operation
+
     def __init__(self, seed=0, verbose=False, max_outputs=1):
         self.seed = seed
         self.verbose = verbose
         self.max_outputs = max_outputs
         if self.verbose:
             print(f"Loading Operation {self.name()}")
-            
+
+    def generate_batch(self, *batches: List) -> List[List]:
+        """
+        Batched version of generate. Each argument is the list of values of
+        the corresponding argument of generate, e.g. (sentences, targets) for
+        a SentenceAndTargetOperation. Returns the outputs of generate for
+        every example. The default simply calls generate on each example;
+        operations which can process many examples at once should override it.
+        """
+        return self._map_examples(self.generate, batches)
+
+    async def generate_async(self, *args) -> List:
+        """
+        Asynchronous version of generate, with the same arguments. Operations
+        waiting on a remote service (e.g. a translation model server) should
+        override it to send their request without blocking, so that many
+        examples can be in flight at once. The default runs generate in the
+        default executor of the event loop, with the key of the example.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            None, context.run, self.generate, *args
+        )
+
+    def filter_batch(self, *batches: List) -> List[bool]:
+        """
+        Batched version of filter, with the same conventions as
+        generate_batch.
+        """
+        return self._map_examples(self.filter, batches)
+
+    def _map_examples(self, func, batches) -> List:
+        keys = current_example_keys()
+        if keys is None:
+            return [func(*example) for example in zip(*batches)]
+        outputs = []
+        for key, example in zip(keys, zip(*batches)):
+            with example_key(key):
+                outputs.append(func(*example))
+        return outputs
+
+    def example_seed(self, key: Hashable) -> int:
+        """
+        Derives the seed of an example from the seed of the operation and
+        the key of the example (e.g. its index in the whole dataset). The
+        seed is a hash of both, so no generator state is shared between
+        examples.
+        """
+        digest = hashlib.blake2b(
+            repr((self.seed, key)).encode("utf-8"), digest_size=4
+        ).digest()
+        return int.from_bytes(digest, "little")
+
+    def current_seed(self) -> int:
+        """
+        The seed of the example being processed: derived from its key during
+        a dataset run, the seed of the operation otherwise.
+        """
+        key = current_example_key()
+        return self.seed if key is None else self.example_seed(key)
+
+    def rng(self) -> random.Random:
+        """
+        Returns a new generator for the example being processed, which
+        operations should use rather than the global one of the random
+        module so that they can run concurrently.
+        """
+        return random.Random(self.current_seed())
+
+    def np_rng(self) -> np.random.RandomState:
+        """Same as rng, for operations sampling with numpy."""
+        return np.random.RandomState(self.current_seed())
+
+    @contextlib.contextmanager
+    def seeded_global_rng(self):
+        """
+        Seeds the global generators of random and numpy for the example
+        being processed, and holds them until the end of the block. Only
+        meant for third-party code which can't be given a generator.
+        """
+        with _global_rng_lock:
+            seed = self.current_seed()
+            random.seed(seed)
+            np.random.seed(seed)
+            yield
+
     @classmethod
     def compare(self, raw: object, pt: List[object]) -> Tuple[int, int]:
         successful_pt = 0
@@ -27,6 +170,10 @@ class Operation(object):
                 successful_pt += 1
         return successful_pt, failed_pt
 
+    def init_spec(self):
+        """Returns (class, args, kwargs) needed to rebuild this operation."""
+        return self.__class__, self.init_args, self.init_kwargs
+
     @classmethod
     def is_heavy(cls):
         return cls.heavy
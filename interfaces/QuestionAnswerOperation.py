@@ -22,3 +22,19 @@ class QuestionAnswerOperation(Operation):
 
     def filter(self, context: str, question: str, answers: [str]) -> bool:
         raise True
+
+    def generate_batch(
+        self,
+        contexts: List[str],
+        questions: List[str],
+        answers: List[List[str]],
+    ) -> List[List[Tuple[str, str, List[str]]]]:
+        return super().generate_batch(contexts, questions, answers)
+
+    def filter_batch(
+        self,
+        contexts: List[str],
+        questions: List[str],
+        answers: List[List[str]],
+    ) -> List[bool]:
+        return super().filter_batch(contexts, questions, answers)
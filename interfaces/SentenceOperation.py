@@ -24,6 +24,12 @@ class SentenceOperation(Operation):
     def filter(self, sentence: str) -> bool:
         raise NotImplementedError
 
+    def generate_batch(self, sentences: List[str]) -> List[List[str]]:
+        return super().generate_batch(sentences)
+
+    def filter_batch(self, sentences: List[str]) -> List[bool]:
+        return super().filter_batch(sentences)
+
 
 class SentenceAndTargetOperation(Operation):
     """
@@ -51,6 +57,16 @@ class SentenceAndTargetOperation(Operation):
     def filter(self, sentence: str, target: str) -> bool:
         raise NotImplementedError
 
+    def generate_batch(
+        self, sentences: List[str], targets: List[str]
+    ) -> List[List[Tuple[str, str]]]:
+        return super().generate_batch(sentences, targets)
+
+    def filter_batch(
+        self, sentences: List[str], targets: List[str]
+    ) -> List[bool]:
+        return super().filter_batch(sentences, targets)
+
 
 class SentenceAndTargetsOperation(Operation):
     """
@@ -79,3 +95,13 @@ class SentenceAndTargetsOperation(Operation):
 
     def filter(self, sentence: str, target: List[str]) -> bool:
         raise NotImplementedError
+
+    def generate_batch(
+        self, sentences: List[str], targets: List[List[str]]
+    ) -> List[List[Tuple[str, List[str]]]]:
+        return super().generate_batch(sentences, targets)
+
+    def filter_batch(
+        self, sentences: List[str], targets: List[List[str]]
+    ) -> List[bool]:
+        return super().filter_batch(sentences, targets)
@@ -27,3 +27,17 @@ class TaggingOperation(Operation):
         self, token_sequence: List[str], tag_sequence: List[str]
     ) -> bool:
         raise NotImplementedError
+
+    def generate_batch(
+        self,
+        token_sequences: List[List[str]],
+        tag_sequences: List[List[str]],
+    ) -> List[List[Tuple[List[str], List[str]]]]:
+        return super().generate_batch(token_sequences, tag_sequences)
+
+    def filter_batch(
+        self,
+        token_sequences: List[List[str]],
+        tag_sequences: List[List[str]],
+    ) -> List[bool]:
+        return super().filter_batch(token_sequences, tag_sequences)
@@ -0,0 +1,259 @@
+from typing import List, Sequence
+
+from tqdm import tqdm
+
+from dataset import (
+    ColumnarData,
+    KeyValueDataset,
+    StreamingDataset,
+    TextLineDataset,
+    _batched,
+    _filter_sentences,
+    _generate_sentences,
+    _keys_at,
+    _LazyData,
+    _storage,
+    _take,
+)
+from interfaces.Operation import Operation, example_keys
+
+"""
+Fuses filters and transformations into a single pass over a dataset.
+
+    pipeline = Pipeline([TextLengthFilter(">", 5), t1, t2])
+    transformed = pipeline.apply(dataset)
+
+Every batch of datapoints goes through all the stages before the next batch
+is read: no intermediate dataset is built, and the datapoints rejected by a
+filter skip the following stages. The outputs of a transformation are passed
+on to the next stage.
+
+Each datapoint is keyed by its index in the whole dataset, and the j-th
+output of a transformation by (the key of its datapoint, j), as by the
+chained apply_filter and apply_transformation calls: the randomness of every
+stage is the same whatever the batching or sharding, and as in those calls.
+"""
+
+
+def _overrides(operation: Operation, names: List[str]) -> bool:
+    # whether the operation implements one of the methods itself, rather
+    # than inheriting the placeholder of its interface
+    for cls in type(operation).__mro__:
+        if cls.__module__.startswith("interfaces."):
+            return False
+        if any(name in vars(cls) for name in names):
+            return True
+    return False
+
+
+class StageCounters(object):
+    def __init__(self, name: str, is_filter: bool):
+        self.name = name
+        self.is_filter = is_filter
+        # the number of datapoints given to the stage and returned by it
+        self.input_num = 0
+        self.output_num = 0
+        # the number of perturbed and unchanged outputs of a transformation
+        self.successful_num = 0
+        self.failed_num = 0
+
+    def __repr__(self):
+        if self.is_filter:
+            return "{}: {} of {} examples passed".format(
+                self.name, self.output_num, self.input_num
+            )
+        return (
+            "{}: {} examples generated from {} examples, with {} "
+            "successfully transformed and {} unchanged".format(
+                self.name,
+                self.output_num,
+                self.input_num,
+                self.successful_num,
+                self.failed_num,
+            )
+        )
+
+
+class Pipeline(object):
+    def __init__(self, stages: List[Operation]):
+        """
+        stages: the filters and transformations to apply, in order. Whether
+            an operation is a filter or a transformation is told by the
+            method it implements (filter or generate).
+        """
+        self.stages = []
+        for operation in stages:
+            is_filter = _overrides(operation, ["filter", "filter_batch"])
+            is_transformation = _overrides(
+                operation, ["generate", "generate_batch"]
+            )
+            if is_filter == is_transformation:
+                raise ValueError(
+                    f"Can't tell whether {operation.name()} is a filter or "
+                    "a transformation."
+                )
+            self.stages.append((operation, is_filter))
+        self.counters = []
+
+    def _reset_counters(self):
+        self.counters = [
+            StageCounters(operation.name(), is_filter)
+            for operation, is_filter in self.stages
+        ]
+
+    def _apply_batch(
+        self, batch: Sequence, filter_func, transform_func, keys: List
+    ):
+        """
+        Runs a batch of datapoints, with the given keys, through every
+        stage. Returns the outputs, the index (in the batch) of the
+        datapoint each one comes from and their keys.
+        """
+        datapoints = batch
+        sources = list(range(len(batch)))
+        for (operation, is_filter), counters in zip(
+            self.stages, self.counters
+        ):
+            if not sources:
+                # every datapoint has been rejected
+                break
+            counters.input_num += len(sources)
+            if is_filter:
+                with example_keys(keys):
+                    passed = filter_func(datapoints, operation)
+                kept = [index for index, keep in enumerate(passed) if keep]
+                datapoints = _take(datapoints, kept)
+                sources = [sources[index] for index in kept]
+                keys = [keys[index] for index in kept]
+            else:
+                with example_keys(keys):
+                    outputs = transform_func(datapoints, operation)
+                transformed = []
+                transformed_sources = []
+                transformed_keys = []
+                for datapoint, source, key, pt_examples in zip(
+                    datapoints, sources, keys, outputs
+                ):
+                    successful_pt, failed_pt = operation.compare(
+                        datapoint, pt_examples
+                    )
+                    counters.successful_num += successful_pt
+                    counters.failed_num += failed_pt
+                    transformed.extend(pt_examples)
+                    transformed_sources.extend([source] * len(pt_examples))
+                    transformed_keys.extend(
+                        (key, j) for j in range(len(pt_examples))
+                    )
+                datapoints = transformed
+                sources = transformed_sources
+                keys = transformed_keys
+            counters.output_num += len(sources)
+        return list(datapoints), sources, keys
+
+    def _print_summary(self):
+        print("Finished pipeline!")
+        for counters in self.counters:
+            print(counters)
+
+    # dataset: a TextLineDataset, KeyValueDataset or StreamingDataset
+    # subfields: the fields to apply the operations on (key-value datasets)
+    # batch_size: the number of datapoints passed to the operations at a time
+    def apply(
+        self, dataset, subfields: List[str] = None, batch_size: int = 32
+    ):
+        self._reset_counters()
+        if isinstance(dataset, TextLineDataset):
+            return self._apply_text_line(dataset, batch_size)
+        if isinstance(dataset, KeyValueDataset):
+            return self._apply_key_value(dataset, subfields, batch_size)
+        if isinstance(dataset, StreamingDataset):
+            return self._apply_streaming(dataset, subfields, batch_size)
+        raise TypeError(f"Unsupported dataset {type(dataset).__name__}.")
+
+    def _apply_text_line(self, dataset: TextLineDataset, batch_size: int):
+        data = []
+        labels = []
+        keys = []
+        print("Applying pipeline:")
+        with tqdm(total=len(dataset.data)) as progress:
+            for start in range(0, len(dataset.data), batch_size):
+                batch = dataset.data[start : start + batch_size]
+                outputs, sources, output_keys = self._apply_batch(
+                    batch,
+                    _filter_sentences,
+                    _generate_sentences,
+                    _keys_at(
+                        dataset.example_keys,
+                        range(start, start + len(batch)),
+                    ),
+                )
+                data.extend(outputs)
+                keys.extend(output_keys)
+                # every output keeps the label of its original sentence
+                labels.extend(dataset.labels[start + i] for i in sources)
+                progress.update(len(batch))
+        self._print_summary()
+        piped = TextLineDataset(data, labels)
+        # keyed as the outputs of the chained operations
+        piped.example_keys = keys
+        return dataset._sharded(piped)
+
+    def _apply_key_value(
+        self, dataset: KeyValueDataset, subfields: List[str], batch_size: int
+    ):
+        filter_func, transform_func = dataset._analyze(subfields)
+        data = []
+        keys = []
+        print("Applying pipeline:")
+        data_num = 0
+        with tqdm(total=len(dataset.data)) as progress:
+            for batch in _batched(dataset.data, batch_size):
+                outputs, _, output_keys = self._apply_batch(
+                    batch,
+                    filter_func,
+                    transform_func,
+                    _keys_at(
+                        dataset.example_keys,
+                        range(data_num, data_num + len(batch)),
+                    ),
+                )
+                data.extend(outputs)
+                keys.extend(output_keys)
+                data_num += len(batch)
+                progress.update(len(batch))
+        self._print_summary()
+        if isinstance(_storage(dataset.data), ColumnarData):
+            data = ColumnarData.from_rows(
+                data, _storage(dataset.data).column_names
+            )
+        piped = KeyValueDataset(data, dataset.task_type, dataset.fields)
+        piped.example_keys = keys
+        return dataset._sharded(piped)
+
+    def _apply_streaming(
+        self, dataset: StreamingDataset, subfields: List[str], batch_size: int
+    ):
+        filter_func, transform_func = dataset._adapters(subfields)
+
+        def keyed_data():
+            self._reset_counters()
+            # the datapoints are keyed by their index in the source stream,
+            # as in the chained operations
+            for batch in _batched(dataset._keyed(), batch_size):
+                outputs, _, output_keys = self._apply_batch(
+                    [datapoint for _, datapoint in batch],
+                    filter_func,
+                    transform_func,
+                    [key for key, _ in batch],
+                )
+                yield from zip(output_keys, outputs)
+            self._print_summary()
+
+        def piped_data():
+            return (datapoint for _, datapoint in keyed_data())
+
+        piped = StreamingDataset(
+            _LazyData(piped_data), dataset.task_type, dataset.fields
+        )
+        piped.keyed_data = _LazyData(keyed_data)
+        return piped
@@ -0,0 +1,163 @@
+import json
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+"""
+Statistics of a transformation run over a dataset: its throughput, the
+latency of the examples, its perturb rate and the memory it used. Only the
+examples transformed on their own (by the async runs, the runs with an
+example timeout or in batches of one example) have a latency; the batches of
+the other runs only have a time per example, which hides their slow
+examples.
+
+    transformed = dataset.apply_transformation(ButterFingersPerturbation())
+    print(transformed.stats.to_json())
+"""
+
+
+def _peak_memory(who) -> int:
+    peak = resource.getrusage(who).ru_maxrss
+    # kilobytes everywhere but on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class TransformationStats(object):
+    # the latency percentiles reported
+    percentiles = (50, 95, 99)
+
+    def __init__(self, operation_name: str):
+        self.operation_name = operation_name
+        self.example_num = 0
+        self.output_num = 0
+        self.successful_num = 0
+        self.failed_num = 0
+        # the examples which timed out, and those skipped once too many did,
+        # both left unchanged
+        self.timeout_num = 0
+        self.skipped_num = 0
+        self.wall_time = None
+        # the time taken by every batch and its number of examples
+        self.batch_times = []
+        self.batch_sizes = []
+        # the increase of the peak memory of this process, and the peak
+        # memory of the worker processes (in bytes)
+        self.peak_memory_delta = None
+        self.worker_peak_memory = None
+
+    def start(self):
+        self._start_time = time.perf_counter()
+        if resource is not None:
+            self._start_memory = _peak_memory(resource.RUSAGE_SELF)
+            self._start_worker_memory = _peak_memory(resource.RUSAGE_CHILDREN)
+
+    def stop(self):
+        self.wall_time = time.perf_counter() - self._start_time
+        if resource is not None:
+            self.peak_memory_delta = (
+                _peak_memory(resource.RUSAGE_SELF) - self._start_memory
+            )
+            worker_memory = _peak_memory(resource.RUSAGE_CHILDREN)
+            # only set if a worker process grew past the previous ones
+            if worker_memory > self._start_worker_memory:
+                self.worker_peak_memory = worker_memory
+
+    def add_batches(self, batch_times: List[float], batch_sizes: List[int]):
+        self.batch_times.extend(batch_times)
+        self.batch_sizes.extend(batch_sizes)
+
+    def add_outputs(
+        self, example_num: int, successful_num: int, failed_num: int
+    ):
+        self.example_num += example_num
+        self.output_num += successful_num + failed_num
+        self.successful_num += successful_num
+        self.failed_num += failed_num
+
+    def add_timeouts(self, timeout_num: int, skipped_num: int):
+        self.timeout_num += timeout_num
+        self.skipped_num += skipped_num
+
+    @property
+    def examples_per_second(self) -> float:
+        return self.example_num / self.wall_time if self.wall_time else 0.0
+
+    @property
+    def outputs_per_second(self) -> float:
+        return self.output_num / self.wall_time if self.wall_time else 0.0
+
+    @property
+    def perturb_rate(self) -> float:
+        return (
+            self.successful_num / self.output_num if self.output_num else 0.0
+        )
+
+    def latencies(self) -> np.ndarray:
+        """
+        The latency (in seconds) of every example transformed on its own,
+        i.e. in a batch of one example.
+        """
+        sizes = np.asarray(self.batch_sizes, dtype=np.int64)
+        times = np.asarray(self.batch_times, dtype=np.float64)
+        return times[sizes == 1]
+
+    def batch_latencies(self) -> np.ndarray:
+        """
+        The time (in seconds) per example of every batch, i.e. its time
+        divided by its number of examples: a batch-level average, not the
+        latency of its examples.
+        """
+        sizes = np.asarray(self.batch_sizes, dtype=np.int64)
+        times = np.asarray(self.batch_times, dtype=np.float64)
+        return times / np.maximum(sizes, 1)
+
+    def _percentiles(self, values: np.ndarray) -> dict:
+        if len(values) == 0:
+            return {f"p{p}": None for p in self.percentiles}
+        values = np.percentile(values, self.percentiles)
+        return {
+            f"p{p}": float(value) for p, value in zip(self.percentiles, values)
+        }
+
+    def latency_percentiles(self) -> dict:
+        return self._percentiles(self.latencies())
+
+    def batch_latency_percentiles(self) -> dict:
+        return self._percentiles(self.batch_latencies())
+
+    def to_dict(self) -> dict:
+        return {
+            "operation": self.operation_name,
+            "examples": self.example_num,
+            "outputs": self.output_num,
+            "successful": self.successful_num,
+            "failed": self.failed_num,
+            "timeouts": self.timeout_num,
+            "skipped": self.skipped_num,
+            "perturb_rate": self.perturb_rate,
+            "wall_time": self.wall_time,
+            "examples_per_second": self.examples_per_second,
+            "outputs_per_second": self.outputs_per_second,
+            "latency": self.latency_percentiles(),
+            "batch_latency": self.batch_latency_percentiles(),
+            "peak_memory_delta": self.peak_memory_delta,
+            "worker_peak_memory": self.worker_peak_memory,
+        }
+
+    def to_json(self, path: str = None) -> str:
+        """Returns the statistics as JSON, also written to path if given."""
+        content = json.dumps(self.to_dict(), indent=2)
+        if path is not None:
+            with open(path, "w") as file:
+                file.write(content)
+        return content
+
+    def __repr__(self):
+        return "TransformationStats({})".format(json.dumps(self.to_dict()))
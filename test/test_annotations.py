@@ -0,0 +1,90 @@
+import spacy
+
+from annotations import Annotations, annotate_dataset
+from dataset import KeyValueDataset, TextLineDataset
+from initialize import SpacyBatchMixin, doc_cache, parse
+from interfaces.SentenceOperation import SentenceOperation
+from tasks.TaskTypes import TaskType
+
+SENTENCES = [
+    "Andrew finally returned the book. Chris bought it last week.",
+    "The quick brown fox jumps over the lazy dog",
+    "Yes. No. Maybe.",
+]
+
+
+def sentencizer():
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    return nlp
+
+
+class SentenceCount(SpacyBatchMixin, SentenceOperation):
+    def __init__(self, nlp):
+        super().__init__()
+        self.nlp = nlp
+
+    def filter(self, sentence):
+        return len(list(parse(self.nlp, sentence).sents)) > 1
+
+
+def test_operations_read_precomputed_annotations(tmp_path):
+    path = str(tmp_path / "annotations")
+    dataset = TextLineDataset(SENTENCES, [0, 1, 0])
+    assert annotate_dataset(dataset, path, sentencizer(), chunk_size=2) == 3
+
+    doc_cache.clear()
+    operation = SentenceCount(sentencizer())
+    with Annotations(path) as annotations:
+        assert len(annotations) == len(SENTENCES)
+        filtered = dataset.apply_filter(operation)
+        assert list(filtered.data) == [SENTENCES[0], SENTENCES[2]]
+        # no sentence was parsed again
+        assert doc_cache.misses == 0
+        assert operation.filter("Not annotated. Parsed.")
+        assert doc_cache.misses == 1
+        # the annotations don't serve the pipelines running more components
+        key = annotations.pipeline_key[:3] + (("sentencizer", "ner"),)
+        assert annotations.get(operation.nlp, SENTENCES[0], key) is None
+    # the Docs read from the annotations stay in the cache
+    operation.filter_batch(SENTENCES)
+    assert doc_cache.misses == 1
+    doc_cache.clear()
+    operation.filter_batch(SENTENCES)
+    assert doc_cache.misses == len(SENTENCES)
+    doc_cache.clear()
+
+
+def test_key_value_fields_are_annotated(tmp_path):
+    path = str(tmp_path / "annotations")
+    data = [
+        {"sentence": sentence, "target": sentence.upper()}
+        for sentence in SENTENCES
+    ]
+    dataset = KeyValueDataset(
+        data, TaskType.TEXT_TO_TEXT_GENERATION, ["sentence", "target"]
+    )
+    nlp = sentencizer()
+    annotate_dataset(dataset, path, nlp, ["sentence", "target"])
+    annotations = Annotations(path)
+    key = doc_cache.pipeline_key(nlp)
+    doc = annotations.get(nlp, SENTENCES[2].upper(), key)
+    sentences = [sentence.text for sentence in doc.sents]
+    assert sentences == ["YES.", "NO.", "MAYBE."]
+
+
+def test_chunks_kept_decoded_follow_the_lookups(tmp_path):
+    path = str(tmp_path / "annotations")
+    nlp = sentencizer()
+    annotate_dataset(
+        TextLineDataset(SENTENCES, [0, 1, 0]), path, nlp, chunk_size=1
+    )
+    key = doc_cache.pipeline_key(nlp)
+    lookups = [SENTENCES[0], SENTENCES[2], SENTENCES[1]] * 3
+    fixed, adaptive = Annotations(path, max_chunks=2), Annotations(path)
+    for text in lookups:
+        assert fixed.get(nlp, text, key).text == text
+        assert adaptive.get(nlp, text, key).text == text
+    assert fixed.decoded_num == len(lookups)
+    # once the first chunk is decoded again, all of them are kept
+    assert adaptive.decoded_num == len(SENTENCES) + 1
@@ -0,0 +1,517 @@
+import asyncio
+import json
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from augmentation_cache import AugmentationCache
+from dataset import (
+    IndexedView,
+    KeyValueDataset,
+    StreamingDataset,
+    TextBuffer,
+    TextLineDataset,
+    merge_shards,
+)
+from interfaces import Operation
+from interfaces.SentenceOperation import SentenceOperation
+from tasks.TaskTypes import TaskType
+from transformations.butter_fingers_perturbation import (
+    ButterFingersPerturbation,
+)
+
+SENTENCES = [
+    "Andrew finally returned the French book to Chris that I bought last week",
+    "Alice in Wonderland is a 2010 American live-action/animated dark fantasy adventure film",
+    "Ujjal Dev Dosanjh served as 33rd Premier of British Columbia from 2000 to 2001",
+    "The quick brown fox jumps over the lazy dog",
+    "ok",
+]
+
+
+class LongerThan(SentenceOperation):
+    def __init__(self, length):
+        super().__init__()
+        self.length = length
+
+    def filter(self, sentence):
+        return len(sentence) > self.length
+
+
+class BatchUpperCase(SentenceOperation):
+    def __init__(self):
+        super().__init__()
+        self.batch_sizes = []
+
+    def generate_batch(self, sentences):
+        self.batch_sizes.append(len(sentences))
+        return [[sentence.upper()] for sentence in sentences]
+
+
+class SlowUpperCase(SentenceOperation):
+    # waits on a fake model server, answering in a shuffled order
+    def __init__(self):
+        super().__init__()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_async(self, sentence):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001 * (hash(sentence) % 5))
+        self.in_flight -= 1
+        return [sentence.upper()]
+
+
+def text_line_dataset():
+    return TextLineDataset(SENTENCES, [i % 2 for i in range(len(SENTENCES))])
+
+
+def key_value_dataset():
+    data = [
+        {"sentence": sentence, "target": sentence.upper()}
+        for sentence in SENTENCES
+    ]
+    return KeyValueDataset(
+        data, TaskType.TEXT_TO_TEXT_GENERATION, ["sentence", "target"]
+    )
+
+
+def test_text_line_multiprocess_transformation():
+    transformation = ButterFingersPerturbation(max_outputs=2)
+    dataset = text_line_dataset()
+    serial = dataset.apply_transformation(transformation)
+    parallel = dataset.apply_transformation(
+        transformation, num_workers=2, chunk_size=2
+    )
+    assert list(serial) == list(parallel)
+    assert len(serial) == 2 * len(dataset)
+
+
+def test_key_value_multiprocess_transformation():
+    transformation = ButterFingersPerturbation()
+    dataset = key_value_dataset()
+    serial = dataset.apply_transformation(transformation, ["sentence"])
+    parallel = dataset.apply_transformation(
+        transformation, ["sentence"], num_workers=2, chunk_size=2
+    )
+    assert serial.data == parallel.data
+
+
+def test_streaming_dataset_is_lazy(tmp_path):
+    path = tmp_path / "data.jsonl"
+    data = key_value_dataset().data
+    path.write_text("\n".join(json.dumps(datapoint) for datapoint in data))
+
+    transformation = ButterFingersPerturbation()
+    streaming = StreamingDataset.from_jsonl(
+        str(path), TaskType.TEXT_TO_TEXT_GENERATION, ["sentence", "target"]
+    ).apply_transformation(transformation, ["sentence"])
+    # nothing has been read yet, so the stream sees the rewritten file
+    path.write_text("\n".join(json.dumps(d) for d in data[:2]))
+
+    expected = key_value_dataset().apply_transformation(
+        transformation, ["sentence"]
+    )
+    assert list(streaming.data) == expected.data[:2]
+
+
+class KeyRecorder(SentenceOperation):
+    def __init__(self):
+        super().__init__()
+        self.keys = []
+
+    def filter(self, sentence):
+        self.keys.append(Operation.current_example_key())
+        return True
+
+
+def test_streaming_filters_keep_source_keys():
+    data = [{"sentence": sentence} for sentence in reversed(SENTENCES)]
+    streaming = StreamingDataset(data, fields=["sentence"])
+    recorder = KeyRecorder()
+    filtered = streaming.apply_filter(LongerThan(50), batch_size=2)
+    filtered = filtered.apply_filter(recorder, batch_size=2)
+    assert [row["sentence"] for row in filtered.data] == SENTENCES[2::-1]
+    # keyed by their index in the source stream, as if run alone
+    assert recorder.keys == [2, 3, 4]
+
+    # and so are the transformations, as in the in-memory datasets
+    transformed = streaming.apply_filter(LongerThan(50)).apply_transformation(
+        RandomSuffix()
+    )
+    expected = (
+        KeyValueDataset(data, fields=["sentence"])
+        .apply_filter(LongerThan(50))
+        .apply_transformation(RandomSuffix())
+    )
+    assert list(transformed.data) == [dict(row) for row in expected.data]
+
+
+def test_transformation_is_called_in_batches():
+    transformation = BatchUpperCase()
+    transformed = text_line_dataset().apply_transformation(
+        transformation, batch_size=2
+    )
+    assert transformation.batch_sizes == [2, 2, 1]
+    assert list(transformed.data) == [s.upper() for s in SENTENCES]
+
+
+def test_columnar_key_value_dataset():
+    pa = pytest.importorskip("pyarrow")
+    data = key_value_dataset().data
+    columnar = KeyValueDataset(
+        pa.Table.from_pylist(data),
+        TaskType.TEXT_TO_TEXT_GENERATION,
+        ["sentence", "target"],
+    )
+    assert [dict(datapoint) for datapoint in columnar.data[1:3]] == data[1:3]
+
+    transformation = ButterFingersPerturbation()
+    expected = key_value_dataset().apply_transformation(
+        transformation, ["sentence"]
+    )
+    transformed = columnar.apply_transformation(
+        transformation, ["sentence"], batch_size=2
+    )
+    assert [dict(datapoint) for datapoint in transformed.data] == expected.data
+
+
+def test_set_operations_keep_order():
+    dataset = TextLineDataset(["x", "y", "x", "z"], [1, 2, 3, 4])
+    other = TextLineDataset(["z", "w", "y"], [5, 6, 7])
+    assert list(dataset | other) == [("x", 1), ("y", 2), ("z", 4), ("w", 6)]
+    assert list(dataset & other) == [("y", 2), ("z", 4)]
+    assert list(dataset - other) == [("x", 1)]
+
+
+def test_cached_transformation_skips_operation(tmp_path):
+    cache = AugmentationCache(str(tmp_path / "cache.sqlite"))
+    transformation = BatchUpperCase()
+    dataset = text_line_dataset()
+    first = dataset.apply_transformation(transformation, cache=cache)
+    second = dataset.apply_transformation(transformation, cache=cache)
+    assert transformation.batch_sizes == [len(SENTENCES)]
+    assert list(first) == list(second)
+
+    # only the new datapoint reaches the operation
+    dataset = TextLineDataset(SENTENCES + ["new"], [0] * 6)
+    dataset.apply_transformation(transformation, batch_size=2, cache=cache)
+    assert transformation.batch_sizes == [len(SENTENCES), 1]
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = AugmentationCache(str(tmp_path / "cache.sqlite"), max_size=150)
+    cache.eviction_batch_size = 1
+    cache.put_many([(b"a", ["x" * 40])])
+    cache.put_many([(b"b", ["y" * 40])])
+    cache.get_many([b"a"])
+    cache.put_many([(b"c", ["z" * 40])])
+    assert set(cache.get_many([b"a", b"b", b"c"])) == {b"a", b"c"}
+    assert cache.size() <= 150
+
+
+class CrashingUpperCase(BatchUpperCase):
+    crash_on = None
+
+    def generate_batch(self, sentences):
+        if self.crash_on in sentences:
+            raise RuntimeError("crash")
+        return super().generate_batch(sentences)
+
+
+def test_transformation_resumes_from_checkpoint(tmp_path):
+    dataset = text_line_dataset()
+    transformation = CrashingUpperCase()
+    transformation.crash_on = "ok"
+    with pytest.raises(RuntimeError):
+        dataset.apply_transformation(
+            transformation, chunk_size=2, checkpoint_dir=str(tmp_path)
+        )
+    # the two completed chunks are not transformed again
+    transformation = CrashingUpperCase()
+    resumed = dataset.apply_transformation(
+        transformation, chunk_size=2, checkpoint_dir=str(tmp_path)
+    )
+    assert transformation.batch_sizes == [1]
+    assert list(resumed) == list(
+        dataset.apply_transformation(BatchUpperCase(), chunk_size=2)
+    )
+
+
+class RandomSuffix(SentenceOperation):
+    def generate(self, sentence):
+        return [f"{sentence} {self.rng().randint(0, 10 ** 6)}"]
+
+
+def test_sharded_transformation_matches_single_run():
+    transformation = RandomSuffix()
+    dataset = text_line_dataset()
+    expected = dataset.apply_transformation(transformation, batch_size=2)
+    shards = [
+        dataset.shard(3, index).apply_transformation(transformation)
+        for index in reversed(range(3))
+    ]
+    assert list(merge_shards(shards)) == list(expected)
+
+    parallel = dataset.apply_transformation(
+        transformation, num_workers=2, chunk_size=2
+    )
+    assert list(parallel) == list(expected)
+
+
+def test_sharded_pipelines_match_single_run():
+    # the rows rejected by the filter are spread over the shards
+    sentences = SENTENCES[::-1] + SENTENCES
+    dataset = TextLineDataset(sentences, [0] * len(sentences))
+    filter, transformation = LongerThan(50), RandomSuffix()
+
+    def run(dataset):
+        filtered = dataset.apply_filter(filter, batch_size=2)
+        transformed = filtered.apply_transformation(transformation)
+        return transformed.apply_transformation(transformation)
+
+    expected = run(dataset)
+    shards = [run(dataset.shard(3, index)) for index in range(3)]
+    assert list(merge_shards(shards)) == list(expected)
+    # the outputs are keyed by the sentences they come from
+    merged = merge_shards([dataset.shard(3, index) for index in range(3)])
+    assert list(run(merged)) == list(expected)
+    transformed = dataset.apply_filter(filter).apply_transformation(
+        transformation
+    )
+    assert list(transformed.provenance["transformed_indices"]) == [
+        2,
+        3,
+        4,
+        5,
+        6,
+        7,
+    ]
+
+
+def test_example_generators_are_thread_safe():
+    transformation = RandomSuffix()
+    datasets = [text_line_dataset().shard(2, index) for index in range(2)]
+    expected = [
+        list(dataset.apply_transformation(transformation, batch_size=1))
+        for dataset in datasets
+    ]
+    with ThreadPoolExecutor(2) as executor:
+        transformed = executor.map(
+            lambda dataset: list(
+                dataset.apply_transformation(transformation, batch_size=1)
+            ),
+            datasets,
+        )
+    assert list(transformed) == expected
+    # every example gets a generator of its own
+    assert len({output.split()[-1] for output, _ in sum(expected, [])}) > 1
+
+
+def test_transformation_stats():
+    transformed = text_line_dataset().apply_transformation(
+        ButterFingersPerturbation(max_outputs=2), batch_size=2
+    )
+    stats = json.loads(transformed.stats.to_json())
+    assert stats["examples"] == len(SENTENCES)
+    assert stats["outputs"] == 2 * len(SENTENCES)
+    assert stats["examples_per_second"] > 0
+    # the examples of a batch aren't timed on their own
+    assert len(transformed.stats.batch_latencies()) == 3
+    assert len(transformed.stats.latencies()) == 1
+    assert stats["batch_latency"]["p50"] <= stats["batch_latency"]["p99"]
+
+    timed = text_line_dataset().apply_transformation(
+        ButterFingersPerturbation(), example_timeout=10
+    )
+    assert len(timed.stats.latencies()) == len(SENTENCES)
+    latency = timed.stats.to_dict()["latency"]
+    assert latency["p50"] <= latency["p99"]
+
+
+def test_text_buffer():
+    pa = pytest.importorskip("pyarrow")
+    texts = ["héllo", "", "wörld", "x"]
+    for buffer in [
+        TextBuffer.from_strings(texts),
+        TextBuffer.from_arrow(pa.chunked_array([texts[:1], texts[1:]])),
+        TextBuffer.from_arrow(pa.array(["skipped"] + texts).slice(1)),
+    ]:
+        assert list(buffer) == texts
+        assert buffer[1:3] == texts[1:3] and buffer[-1] == "x"
+        assert list(buffer[1:] + buffer[:1]) == texts[1:] + texts[:1]
+        assert pickle.loads(pickle.dumps(buffer[2:])) == texts[2:]
+
+
+def test_text_line_dataset_mapping_is_lazy():
+    dataset = text_line_dataset()
+    assert "mapping" not in vars(dataset)
+    assert dataset.mapping[SENTENCES[1]] == 1
+    assert list(dataset)[1] == (SENTENCES[1], 1)
+
+
+def test_async_transformation_keeps_order():
+    dataset = text_line_dataset()
+    transformation = SlowUpperCase()
+    transformed = asyncio.run(
+        dataset.apply_transformation_async(
+            transformation, batch_size=2, max_concurrency=3
+        )
+    )
+    assert list(transformed.data) == [s.upper() for s in SENTENCES]
+    assert 1 < transformation.max_in_flight <= 3
+
+    # the default runs generate, with the same generator per example
+    expected = dataset.apply_transformation(RandomSuffix())
+    transformed = asyncio.run(
+        dataset.apply_transformation_async(RandomSuffix(), batch_size=2)
+    )
+    assert list(transformed) == list(expected)
+    transformed = asyncio.run(
+        key_value_dataset().apply_transformation_async(
+            RandomSuffix(), ["sentence"], max_concurrency=2
+        )
+    )
+    assert (
+        transformed.data
+        == key_value_dataset()
+        .apply_transformation(RandomSuffix(), ["sentence"])
+        .data
+    )
+
+
+def test_filters_return_views():
+    dataset = text_line_dataset()
+    filtered = dataset.apply_filter(LongerThan(2)).apply_filter(LongerThan(60))
+    assert isinstance(filtered.data, IndexedView)
+    assert filtered.data.parent is dataset.data
+    assert list(filtered) == [
+        (text, label) for text, label in dataset if len(text) > 60
+    ]
+    mask = dataset.filter_mask(LongerThan(2)) & ~dataset.filter_mask(
+        LongerThan(60)
+    )
+    assert list(dataset.select(mask).data) == SENTENCES[3:4]
+    unpickled = pickle.loads(pickle.dumps(filtered.data[1:]))
+    assert list(unpickled) == SENTENCES[1:3]
+
+    pa = pytest.importorskip("pyarrow")
+    columnar = KeyValueDataset(
+        pa.Table.from_pylist(key_value_dataset().data),
+        TaskType.TEXT_TO_TEXT_GENERATION,
+        ["sentence", "target"],
+    )
+    filtered = columnar.apply_filter(LongerThan(60), ["sentence"])
+    assert filtered.data.parent is columnar.data
+    transformation = ButterFingersPerturbation()
+    transformed = filtered.apply_transformation(transformation, ["sentence"])
+    expected = (
+        key_value_dataset()
+        .apply_filter(LongerThan(60), ["sentence"])
+        .apply_transformation(transformation, ["sentence"])
+    )
+    assert [dict(datapoint) for datapoint in transformed.data] == list(
+        expected.data
+    )
+
+
+def test_transformations_applied_in_a_single_pass():
+    dataset = text_line_dataset()
+    transformations = [
+        RandomSuffix(),
+        ButterFingersPerturbation(max_outputs=2),
+    ]
+    fanned_out = dataset.apply_transformations(transformations, batch_size=2)
+    for transformation, transformed in zip(transformations, fanned_out):
+        expected = dataset.apply_transformation(transformation)
+        assert list(transformed) == list(expected)
+        assert (
+            transformed.provenance["transformation"] == transformation.name()
+        )
+    assert list(fanned_out[1].provenance["source_indices"]) == [
+        index for index in range(len(SENTENCES)) for _ in range(2)
+    ]
+
+    dataset = key_value_dataset()
+    fanned_out = dataset.apply_transformations(
+        transformations, ["sentence"], batch_size=3
+    )
+    assert (
+        fanned_out[1].data
+        == dataset.apply_transformation(transformations[1], ["sentence"]).data
+    )
+
+
+def test_budgeted_transformation_samples_the_dataset():
+    dataset = TextLineDataset(
+        SENTENCES * 4, [i % 2 for i in range(4 * len(SENTENCES))]
+    )
+    transformation = RandomSuffix()
+    full = list(dataset.apply_transformation(transformation))
+    sampled = dataset.apply_transformation(
+        transformation, batch_size=2, max_perturbed=5, stratified=True
+    )
+    indices = sampled.provenance["transformed_indices"]
+    assert len(indices) == 6
+    # each datapoint gets the outputs of a full run
+    assert list(sampled) == [full[index] for index in indices]
+    # the sample holds as many datapoints of each label
+    assert sum(dataset.labels[indices]) == 3
+
+    sampled = dataset.apply_transformation(
+        transformation, batch_size=4, time_budget=0
+    )
+    assert len(sampled) == 4
+    with pytest.raises(ValueError):
+        dataset.apply_transformation(
+            transformation, num_workers=2, max_perturbed=5
+        )
+
+
+class SlowOnLongSentences(SentenceOperation):
+    def generate(self, sentence):
+        if len(sentence) > 50:
+            time.sleep(5)
+        return [sentence.upper()]
+
+
+def test_example_timeout_leaves_datapoints_unchanged():
+    dataset = text_line_dataset()
+    transformed = dataset.apply_transformation(
+        SlowOnLongSentences(), num_workers=2, chunk_size=2, example_timeout=0.2
+    )
+    assert list(transformed.data) == SENTENCES[:3] + [
+        sentence.upper() for sentence in SENTENCES[3:]
+    ]
+    assert transformed.stats.timeout_num == 3
+    assert transformed.stats.to_dict()["skipped"] == 0
+
+    # the transformation is disabled once max_timeouts datapoints timed out
+    transformed = key_value_dataset().apply_transformation(
+        SlowOnLongSentences(),
+        ["sentence"],
+        example_timeout=0.2,
+        max_timeouts=1,
+    )
+    assert [row["sentence"] for row in transformed.data] == SENTENCES
+    assert transformed.stats.timeout_num == 1
+    assert transformed.stats.skipped_num == len(SENTENCES) - 1
+
+
+def test_example_timeouts_are_not_counted_as_perturbations():
+    dataset = TextLineDataset(SENTENCES[1:], [0] * 4)
+    # in a full run and in a budgeted one, the two long sentences time out
+    for max_perturbed in (None, 4):
+        transformed = dataset.apply_transformation(
+            SlowOnLongSentences(),
+            example_timeout=0.2,
+            max_perturbed=max_perturbed,
+        )
+        stats = transformed.stats.to_dict()
+        assert stats["successful"] == 2
+        assert stats["failed"] == 0
+        assert stats["timeouts"] == 2
+        assert stats["perturb_rate"] == 1.0
@@ -0,0 +1,66 @@
+from dataset import TextLineDataset
+from deduplication import Deduplicator, MinHasher
+from interfaces.SentenceOperation import SentenceOperation
+from pipeline import Pipeline
+
+SENTENCES = [
+    "Andrew finally returned the French book to Chris that I bought last week",
+    "Andrew finally returned the French book to Chris that I bought last week",
+    "Andrew finally returned the French book to Chris that I bought last week.",
+    "The quick brown fox jumps over the lazy dog",
+]
+
+
+class RepeatOrAppend(SentenceOperation):
+    # returns the input unchanged, twice the same output and a new one
+    def generate(self, sentence):
+        return [sentence, sentence + " Really.", sentence + " Really.", "ok"]
+
+
+def test_exact_and_near_duplicates_are_removed():
+    dataset = TextLineDataset(SENTENCES, [0, 1, 0, 1])
+    deduplicated = dataset.apply_filter(Deduplicator(), batch_size=2)
+    assert list(deduplicated.data) == [SENTENCES[0], SENTENCES[3]]
+
+    exact = Deduplicator(near_duplicates=False)
+    deduplicated = dataset.apply_filter(exact)
+    assert list(deduplicated.data) == [SENTENCES[0]] + SENTENCES[2:]
+    assert exact.duplicate_num == 1
+
+    hasher = MinHasher()
+    similarity = (
+        hasher.signature(SENTENCES[0]) == hasher.signature(SENTENCES[3])
+    ).mean()
+    assert similarity < 0.2
+
+
+def test_deduplicator_drops_redundant_outputs():
+    dataset = TextLineDataset(SENTENCES[:1] + SENTENCES[3:], [0, 1])
+    dedup = Deduplicator(near_duplicates=False)
+    transformed = Pipeline([dedup, RepeatOrAppend(), dedup]).apply(dataset)
+    assert list(transformed.data) == [
+        SENTENCES[0] + " Really.",
+        "ok",
+        SENTENCES[3] + " Really.",
+    ]
+
+
+def test_deduplicator_memory_is_bounded():
+    dedup = Deduplicator(max_entries=2)
+    assert dedup.filter_batch(["a first text", "a second one", "a third"])
+    # the oldest text has been forgotten
+    assert dedup.filter_batch(["a first text", "a third"]) == [True, False]
+    assert len(dedup._signatures) == 2
+    assert sum(map(len, dedup._buckets)) <= 2 * dedup.bands
+
+
+def test_forgotten_entries_leave_no_buckets():
+    # a threshold above 1 keeps the near duplicates, which share buckets
+    dedup = Deduplicator(threshold=1.1, max_entries=1)
+    assert dedup.filter_batch([SENTENCES[0], SENTENCES[2]]) == [True, True]
+    assert all(
+        entry_ids == 1
+        for bucket in dedup._buckets
+        for entry_ids in bucket.values()
+    )
+    assert sum(map(len, dedup._buckets)) == dedup.bands
@@ -0,0 +1,57 @@
+import gzip
+import json
+
+import pytest
+
+from dataset import KeyValueDataset, StreamingDataset, TextLineDataset
+from exporters import open_writer
+from pipeline import Pipeline
+from tasks.TaskTypes import TaskType
+from transformations.butter_fingers_perturbation import (
+    ButterFingersPerturbation,
+)
+
+DATA = [
+    {"sentence": "A tab\there", "target": "and a\nnewline"},
+    {"sentence": "Héllo wörld", "target": "ok"},
+    {"sentence": "The quick brown fox", "target": "jumps"},
+]
+
+
+def test_jsonl_and_tsv_exports(tmp_path):
+    dataset = TextLineDataset([row["sentence"] for row in DATA], [0, 1, 0])
+    path = str(tmp_path / "data.jsonl.gz")
+    assert dataset.export(path, chunk_size=2) == len(DATA)
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        rows = [json.loads(line) for line in file]
+    assert rows == [{"text": text, "label": label} for text, label in dataset]
+
+    path = str(tmp_path / "data.tsv")
+    with open_writer(path, chunk_size=2) as writer:
+        writer.write_rows(DATA)
+    with open(path, encoding="utf-8") as file:
+        lines = file.read().splitlines()
+    assert lines[0] == "sentence\ttarget"
+    assert lines[1] == "A tab\\there\tand a\\nnewline"
+    assert len(lines) == len(DATA) + 1
+
+
+def test_parquet_export_of_streaming_pipeline(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    source = tmp_path / "data.jsonl"
+    source.write_text("\n".join(json.dumps(row) for row in DATA))
+    dataset = StreamingDataset.from_jsonl(
+        str(source), TaskType.TEXT_TO_TEXT_GENERATION, ["sentence", "target"]
+    )
+    pipeline = Pipeline([ButterFingersPerturbation()])
+    path = str(tmp_path / "data.parquet")
+    pipeline.apply(dataset, ["sentence"], batch_size=2).export(
+        path, chunk_size=2
+    )
+
+    expected = KeyValueDataset(
+        DATA, TaskType.TEXT_TO_TEXT_GENERATION, ["sentence", "target"]
+    ).apply_transformation(ButterFingersPerturbation(), ["sentence"])
+    assert pq.read_table(path).to_pylist() == [
+        dict(row) for row in expected.data
+    ]
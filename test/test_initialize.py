@@ -0,0 +1,114 @@
+import gc
+
+import spacy
+
+from initialize import (
+    DocCache,
+    ModelRegistry,
+    SpacyBatchMixin,
+    doc_cache,
+    parse,
+    tokenize,
+)
+from interfaces.SentenceOperation import SentenceOperation
+
+
+def test_doc_cache_shares_parses():
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    cache = DocCache(max_entries=2)
+    doc = cache.get(nlp, "Hello there. How are you?")
+    assert len(list(doc.sents)) == 2
+    assert cache.get(nlp, "Hello there. How are you?") is doc
+    # a full parse serves the requests disabling components, not the reverse
+    assert cache.get(nlp, "Hello there. How are you?", ["sentencizer"]) is doc
+    tokens = cache.get(nlp, "Fine, thanks.", ["sentencizer"])
+    assert cache.get(nlp, "Fine, thanks.") is not tokens
+    assert (cache.hits, cache.misses) == (2, 3)
+
+    # the least recently used Doc has been dropped
+    assert len(cache) == 2
+    assert cache.get(nlp, "Hello there. How are you?") is not doc
+
+
+def test_doc_cache_serves_pipelines_running_fewer_components():
+    nlp = spacy.blank("en")
+    for name in ["sentencizer", "merge_entities", "token_splitter"]:
+        nlp.add_pipe(name)
+    cache = DocCache()
+    text = "Hello there. How are you?"
+    doc = cache.get(nlp, text, ["token_splitter"])
+    # the operations disabling other components share the same parse
+    assert cache.get(nlp, text, ["merge_entities", "token_splitter"]) is doc
+    assert cache.get(nlp, text, ["sentencizer", "token_splitter"]) is doc
+    assert cache.get(nlp, text, ["sentencizer"]) is not doc
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+class Owner(object):
+    pass
+
+
+def test_model_registry_shares_and_releases_models():
+    registry = ModelRegistry()
+    first, second = Owner(), Owner()
+    nlp = registry.acquire("blank:en", first)
+    assert registry.acquire("blank:en", second) is nlp
+    report = registry.memory_report()
+    assert len(report) == 1
+    (model,) = report.values()
+    assert model["references"] == 2
+    assert model["load_time"] >= 0
+
+    del first
+    gc.collect()
+    (model,) = registry.memory_report().values()
+    assert model["references"] == 1
+    # unloaded once the last operation using it is collected, with its Docs
+    doc_cache.clear()
+    parse(nlp, "Unloaded with the model")
+    other = spacy.blank("en")
+    kept = parse(other, "Kept in the cache")
+    del second
+    gc.collect()
+    assert registry.memory_report() == {}
+    assert len(doc_cache) == 1
+    assert parse(other, "Kept in the cache") is kept
+    assert (doc_cache.hits, doc_cache.misses) == (1, 2)
+    doc_cache.clear()
+    assert registry.acquire("blank:en", exclude=["x"]) is not nlp
+
+
+class MultiSentenceFilter(SpacyBatchMixin, SentenceOperation):
+    pipe_disable = ["tagger"]
+
+    def __init__(self):
+        super().__init__()
+        self.nlp = spacy.blank("en")
+        self.nlp.add_pipe("sentencizer")
+
+    def filter(self, sentence):
+        doc = parse(self.nlp, sentence, self.pipe_disable)
+        return len(list(doc.sents)) > 1
+
+
+def test_batched_operations_parse_with_pipe():
+    sentences = ["One. Two.", "Only one", "One. Two.", "Yes. No. Maybe."]
+    doc_cache.clear()
+    operation = MultiSentenceFilter()
+    operation.pipe_batch_size = 2
+    assert operation.filter_batch(sentences) == [True, False, True, True]
+    # every distinct sentence was parsed once, by nlp.pipe
+    assert doc_cache.misses == 3
+    assert doc_cache.hits == len(sentences)
+    doc_cache.clear()
+
+
+def test_tokenize_matches_english_pipelines():
+    text = "Don't stop, it's 5.30 p.m. in the U.K.!"
+    assert tokenize(text) == tuple(
+        token.text for token in spacy.blank("en")(text)
+    )
+    hits = tokenize.cache_info().hits
+    tokenize(text)
+    assert tokenize.cache_info().hits == hits + 1
@@ -0,0 +1,57 @@
+import pytest
+
+from dataset import TextLineDataset
+from interfaces.SentenceOperation import SentenceOperation
+from pipeline import Pipeline
+from transformations.butter_fingers_perturbation import (
+    ButterFingersPerturbation,
+)
+
+from .test_dataset import (
+    SENTENCES,
+    BatchUpperCase,
+    RandomSuffix,
+    key_value_dataset,
+)
+
+
+class LongSentenceFilter(SentenceOperation):
+    def filter(self, sentence):
+        return len(sentence) > 10
+
+
+def test_pipeline_matches_chained_operations():
+    stages = [
+        LongSentenceFilter(),
+        ButterFingersPerturbation(max_outputs=2),
+        BatchUpperCase(),
+        RandomSuffix(),
+    ]
+    # the sentence rejected by the filter is in the middle of the dataset
+    sentences = SENTENCES[:2] + SENTENCES[-1:] + SENTENCES[2:-1]
+    dataset = TextLineDataset(sentences, [0] * len(sentences))
+    chained = dataset.apply_filter(stages[0])
+    for transformation in stages[1:]:
+        chained = chained.apply_transformation(transformation)
+
+    pipeline = Pipeline(stages)
+    assert list(pipeline.apply(dataset, batch_size=2)) == list(chained)
+    filter_counters, butter_counters, upper_counters, _ = pipeline.counters
+    assert (filter_counters.input_num, filter_counters.output_num) == (5, 4)
+    assert butter_counters.output_num == 8
+    assert upper_counters.input_num == 8
+
+
+def test_pipeline_on_key_value_dataset():
+    stages = [LongSentenceFilter(), ButterFingersPerturbation()]
+    dataset = key_value_dataset()
+    dataset = dataset.select([0, 1, 4, 2, 3])
+    chained = dataset.apply_filter(stages[0], ["sentence"])
+    chained = chained.apply_transformation(stages[1], ["sentence"])
+    piped = Pipeline(stages).apply(dataset, ["sentence"])
+    assert piped.data == chained.data
+
+
+def test_pipeline_rejects_ambiguous_operation():
+    with pytest.raises(ValueError):
+        Pipeline([SentenceOperation()])
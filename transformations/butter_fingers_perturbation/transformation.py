@@ -10,7 +10,7 @@ Base Class for implementing the different input transformations a generation sho
 
 
 def butter_finger(text, prob=0.1, keyboard="querty", seed=0, max_outputs=1):
-    random.seed(seed)
+    rng = random.Random(seed)
     key_approx = {}
 
     if keyboard == "querty":
@@ -55,8 +55,8 @@ def butter_finger(text, prob=0.1, keyboard="querty", seed=0, max_outputs=1):
             if lcletter not in key_approx.keys():
                 new_letter = lcletter
             else:
-                if random.choice(range(0, 100)) <= prob_of_typo:
-                    new_letter = random.choice(key_approx[lcletter])
+                if rng.choice(range(0, 100)) <= prob_of_typo:
+                    new_letter = rng.choice(key_approx[lcletter])
                 else:
                     new_letter = lcletter
             # go back to original case
@@ -87,7 +87,7 @@ class ButterFingersPerturbation(SentenceOperation):
         perturbed_texts = butter_finger(
             text=sentence,
             prob=0.05,
-            seed=self.seed,
+            seed=self.current_seed(),
             max_outputs=self.max_outputs,
         )
         return perturbed_texts
@@ -5,14 +5,14 @@ from tasks.TaskTypes import TaskType
 
 
 def change_char_case(text, prob=0.1, seed=0, max_outputs=1):
-    random.seed(seed)
+    rng = random.Random(seed)
     results = []
     for _ in range(max_outputs):
         result = []
         for c in text:
-            if c.isupper() and random.random() < prob:
+            if c.isupper() and rng.random() < prob:
                 result.append(c.lower())
-            elif c.islower() and random.random() < prob:
+            elif c.islower() and rng.random() < prob:
                 result.append(c.upper())
             else:
                 result.append(c)
@@ -39,6 +39,6 @@ class ChangeCharCase(SentenceOperation):
 
     def generate(self, sentence: str):
         perturbed = change_char_case(
-            text=sentence, prob=0.1, seed=self.seed, max_outputs=self.max_outputs
+            text=sentence, prob=0.1, seed=self.current_seed(), max_outputs=self.max_outputs
         )
         return perturbed
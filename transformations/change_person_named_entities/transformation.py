@@ -1,26 +1,27 @@
-import numpy as np
-import spacy
 from checklist.perturb import Perturb
-from initialize import spacy_nlp
+from initialize import SpacyBatchMixin, parse, spacy_model
 from interfaces.SentenceOperation import SentenceOperation
 from tasks.TaskTypes import TaskType
 
 
-class ChangePersonNamedEntities(SentenceOperation):
+class ChangePersonNamedEntities(SpacyBatchMixin, SentenceOperation):
     tasks = [TaskType.TEXT_CLASSIFICATION, TaskType.TEXT_TO_TEXT_GENERATION]
     languages = ["en"]
+    # only the named entities are needed
+    pipe_disable = ["parser", "tagger", "attribute_ruler", "lemmatizer"]
 
     def __init__(self, n=1, seed=0, max_outputs=2):
-        # TODO: Do not repeat parse computations.
         super().__init__(seed, max_outputs=max_outputs)
         self.n = n
-        self.nlp = spacy_nlp if spacy_nlp else spacy.load("en_core_web_sm")
+        self.nlp = spacy_model(owner=self)
 
     def generate(self, sentence: str):
-        np.random.seed(self.seed)
-        perturbed = Perturb.perturb(
-            [self.nlp(sentence)], Perturb.change_names, nsamples=1
-        )
+        doc = parse(self.nlp, sentence, self.pipe_disable)
+        # checklist samples the names with the global numpy generator
+        with self.seeded_global_rng():
+            perturbed = Perturb.perturb(
+                [doc], Perturb.change_names, nsamples=1
+            )
         perturbed_texts = (
             perturbed.data[0][1 : self.max_outputs]
             if len(perturbed.data) > 0
@@ -3,23 +3,24 @@ import random
 import spacy
 import numpy
 
+from initialize import SpacyBatchMixin, parse, spacy_model
 from interfaces.SentenceOperation import SentenceOperation
 from tasks.TaskTypes import TaskType
 from SoundsLike.SoundsLike import Search
 from spacy.attrs import LOWER, POS, ENT_TYPE, IS_ALPHA
 from spacy.tokens import Doc
 
-def close_homophones_swap(text, corrupt_prob, seed=0, max_outputs=1, nlp = None):
-    random.seed(seed)
-    doc = nlp(text)
+def close_homophones_swap(text, corrupt_prob, seed=0, max_outputs=1, nlp = None, disable=()):
+    rng = random.Random(seed)
+    doc = parse(nlp, text, disable)
     perturbed_texts = []
     spaces = [True if tok.whitespace_ else False for tok in doc]
     for _ in range(max_outputs):
         perturbed_text = []
         for index, token in enumerate(doc):
-            if random.uniform(0, 1) < corrupt_prob:
+            if rng.uniform(0, 1) < corrupt_prob:
                 try:
-                    replacement = random.choice(Search.closeHomophones(token.text))
+                    replacement = rng.choice(Search.closeHomophones(token.text))
                     if replacement.lower()!=token.text.lower() and token.text.lower()!='a':
                         perturbed_text.append(replacement)
                     else:
@@ -37,21 +38,23 @@ def close_homophones_swap(text, corrupt_prob, seed=0, max_outputs=1, nlp = None)
         perturbed_texts.append(''.join(textbf))
     return perturbed_texts
        
-class CloseHomophonesSwap(SentenceOperation):
+class CloseHomophonesSwap(SpacyBatchMixin, SentenceOperation):
     tasks = [
         TaskType.TEXT_CLASSIFICATION,
         TaskType.TEXT_TO_TEXT_GENERATION,
         TaskType.TEXT_TAGGING,
     ]
     languages = ["en"]
+    # only the tokens are needed
+    pipe_disable = ["parser", "tagger", "ner"]
 
     def __init__(self, seed=0, max_outputs=1):
         super().__init__(seed)
         self.max_outputs = max_outputs
-        self.nlp = spacy.load("en_core_web_sm")
+        self.nlp = spacy_model(owner=self)
 
     def generate(self, sentence: str):
         perturbed_texts = close_homophones_swap(
-            text=sentence, corrupt_prob=0.5, seed=self.seed, max_outputs=self.max_outputs, nlp = self.nlp
+            text=sentence, corrupt_prob=0.5, seed=self.current_seed(), max_outputs=self.max_outputs, nlp = self.nlp, disable=self.pipe_disable
         )
         return perturbed_texts
@@ -60,22 +60,22 @@ def discourse_marker_substitution(text, seed=0, max_output=1):
     """Performs a substitution of discourse markers with semantically equivalent marker
     in the input text
     """
-    random.seed(seed)
+    rng = random.Random(seed)
     perturbed_texts = []
     for _ in range(max_output):
         present_markers = [m for m in MARKER_TO_CLASS if m in text.lower().split()]
 
         if not present_markers:
             return [text]
-        original = random.choice(present_markers)
+        original = rng.choice(present_markers)
         same_class_markers = CLASS_TO_MARKERS[MARKER_TO_CLASS[original]]
         possible_substitutions = [m for m in same_class_markers if m not in original]
         if not possible_substitutions:
             return [text]
-        new = random.choice(possible_substitutions)
+        new = rng.choice(possible_substitutions)
         matched_markers = list(re.finditer("(?i)" + re.escape(original), text))
         if matched_markers:
-            m = random.choice(matched_markers)
+            m = rng.choice(matched_markers)
             # keep the same case type
             if m[0].isupper():
                 new_with_matching_case_type = new.upper()
@@ -105,6 +105,6 @@ class DiscourseMarkerSubstitution(SentenceOperation):
 
     def generate(self, sentence: str):
         perturbed_texts = discourse_marker_substitution(
-            text=sentence, seed=self.seed, max_output=self.max_output
+            text=sentence, seed=self.current_seed(), max_output=self.max_output
         )
         return perturbed_texts
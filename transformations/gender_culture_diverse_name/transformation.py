@@ -1,6 +1,7 @@
 import numpy as np
 import spacy
 
+from initialize import SpacyBatchMixin, parse, spacy_model
 from interfaces.SentenceOperation import SentenceOperation
 from tasks.TaskTypes import TaskType
 
@@ -11,7 +12,8 @@ import random
 import hashlib
 from checklist.perturb import process_ret
 
-def hash(input:str):
+def stable_hash(input:str):
+    # unlike the builtin hash of strings, the same in every process
     t_value = input.encode('utf8')
     h = hashlib.sha256(t_value)
     n = int(h.hexdigest(),base=16)
@@ -77,8 +79,8 @@ class ChangeGenderCultureDiverseName:
 
         """
 
-        if seed is not None:
-            random.seed(seed)
+        # a generator of its own, seeded for the sentence if a seed is given
+        rng = random.Random(seed)
         ents = [x.text for x in doc.ents if np.all([a.ent_type_ == 'PERSON' for a in x])]
         ret = []
         ret_m = []
@@ -98,9 +100,9 @@ class ChangeGenderCultureDiverseName:
                 else:
                     country_choose_from = self.countries
             
-                new_countries = random.choices(country_choose_from, k=n)
-                new_genders = random.choices(gender_choose_from, k=n)
-                new_names = [random.choice(self.names[c][n]) for c,n in zip(new_countries, new_genders)]
+                new_countries = rng.choices(country_choose_from, k=n)
+                new_genders = rng.choices(gender_choose_from, k=n)
+                new_names = [rng.choice(self.names[c][n]) for c,n in zip(new_countries, new_genders)]
                 if not capito:
                     new_names = [n.lower() for n in new_names]
                 
@@ -109,14 +111,14 @@ class ChangeGenderCultureDiverseName:
                     ret_m.append((name, new_name))
         
         if len(ret) > max_output:
-            idxs = random.choices(range(len(ret)), k=max_output)
+            idxs = rng.choices(range(len(ret)), k=max_output)
             return [ret[idx] for idx in idxs], [ret_m[idx] for idx in idxs]
         else:
             return ret, ret_m
                 
 
 
-class GenderCultureDiverseName(SentenceOperation):
+class GenderCultureDiverseName(SpacyBatchMixin, SentenceOperation):
     tasks = [TaskType.TEXT_CLASSIFICATION, TaskType.TEXT_TO_TEXT_GENERATION]
     languages = ['el', 'sr', 'ja', 'lt', 'en', 
         'ar', 'sa', 'ta', 'te', 'rw', 
@@ -136,10 +138,12 @@ class GenderCultureDiverseName(SentenceOperation):
         'ee', 'fi', 'cy'
         ]
     # language code following ISO 639-1 standard
+    # only the named entities are needed
+    pipe_disable = ["parser", "tagger", "attribute_ruler", "lemmatizer"]
 
     def __init__(self, n=1, seed=0, max_output=1, retain_gender=False, retain_culture=False, data_path=None):
         super().__init__(seed)
-        self.nlp = spacy.load("en_core_web_sm")
+        self.nlp = spacy_model(owner=self)
         self.n = n
         self.max_output = max_output
 
@@ -153,8 +157,8 @@ class GenderCultureDiverseName(SentenceOperation):
             )
 
     def generate(self, sentence: str, retain_gender: bool = False, retain_culture: bool = False):
-        seed = self.seed + hash(sentence) + retain_gender * 1 + retain_culture * 2
-        perturbed_texts, _ = self.changer.apply(self.nlp(sentence), retain_gender, retain_culture, self.n, self.max_output, seed)
+        seed = self.current_seed() + stable_hash(sentence) + retain_gender * 1 + retain_culture * 2
+        perturbed_texts, _ = self.changer.apply(parse(self.nlp, sentence, self.pipe_disable), retain_gender, retain_culture, self.n, self.max_output, seed)
 
         return perturbed_texts
 
@@ -1,6 +1,7 @@
 import numpy as np
 import spacy
 
+from initialize import SpacyBatchMixin, parse, spacy_model
 from interfaces.SentenceOperation import SentenceAndTargetOperation
 from tasks.TaskTypes import TaskType
 
@@ -12,7 +13,8 @@ import hashlib
 from checklist.perturb import process_ret
 
 
-def hash(input:str):
+def stable_hash(input:str):
+    # unlike the builtin hash of strings, the same in every process
     t_value = input.encode('utf8')
     h = hashlib.sha256(t_value)
     n = int(h.hexdigest(),base=16)
@@ -82,8 +84,8 @@ class ChangeGenderCultureDiverseNameTwoWay:
 
         """
 
-        if seed is not None:
-            random.seed(seed)
+        # a generator of its own, seeded for the sentence if a seed is given
+        rng = random.Random(seed)
         ents = [x.text for x in doc.ents if np.all([a.ent_type_ == 'PERSON' for a in x])]
         ret_s = []
         ret_t = []
@@ -104,9 +106,9 @@ class ChangeGenderCultureDiverseNameTwoWay:
                 else:
                     country_choose_from = self.countries
             
-                new_countries = random.choices(country_choose_from, k=n)
-                new_genders = random.choices(gender_choose_from, k=n)
-                new_names = [random.choice(self.names[c][n]) for c,n in zip(new_countries, new_genders)]
+                new_countries = rng.choices(country_choose_from, k=n)
+                new_genders = rng.choices(gender_choose_from, k=n)
+                new_names = [rng.choice(self.names[c][n]) for c,n in zip(new_countries, new_genders)]
                 if not capito:
                     new_names = [n.lower() for n in new_names]
                 
@@ -116,14 +118,14 @@ class ChangeGenderCultureDiverseNameTwoWay:
                     ret_m.append((name, new_name))
         
         if len(ret_s) > max_output:
-            idxs = random.choices(range(len(ret_s)), k=max_output)
+            idxs = rng.choices(range(len(ret_s)), k=max_output)
             return [ret_s[idx] for idx in idxs], [ret_t[idx] for idx in idxs], [ret_m[idx] for idx in idxs]
         else:
             return ret_s, ret_t, ret_m
                 
 
 
-class GenderCultureDiverseNameTwoWay(SentenceAndTargetOperation):
+class GenderCultureDiverseNameTwoWay(SpacyBatchMixin, SentenceAndTargetOperation):
     tasks = [TaskType.TEXT_TO_TEXT_GENERATION]
     languages = ['el', 'sr', 'ja', 'lt', 'en', 
         'ar', 'sa', 'ta', 'te', 'rw', 
@@ -161,10 +163,12 @@ class GenderCultureDiverseNameTwoWay(SentenceAndTargetOperation):
         ]
     
     # language code following ISO 639-1 standard
+    # only the named entities are needed
+    pipe_disable = ["parser", "tagger", "attribute_ruler", "lemmatizer"]
 
     def __init__(self, n=1, seed=0, max_output=1, data_path=None):
         super().__init__(seed)
-        self.nlp = spacy.load("en_core_web_sm")
+        self.nlp = spacy_model(owner=self)
         self.n = n
         self.max_output = max_output
 
@@ -178,9 +182,9 @@ class GenderCultureDiverseNameTwoWay(SentenceAndTargetOperation):
             )
 
     def generate(self, sentence: str, target: str, retain_gender: bool=False, retain_culture: bool=False):
-        seed = self.seed + hash(sentence) + retain_gender * 1 + retain_culture * 2
+        seed = self.current_seed() + stable_hash(sentence) + retain_gender * 1 + retain_culture * 2
         perturbed_source, perturbed_target, _ = self.changer.apply(
-            self.nlp(sentence), target, retain_gender, retain_culture, self.n, self.max_output, seed
+            parse(self.nlp, sentence, self.pipe_disable), target, retain_gender, retain_culture, self.n, self.max_output, seed
         )
 
         return [(perturbed_source[idx], perturbed_target[idx]) for idx in range(len(perturbed_source))]
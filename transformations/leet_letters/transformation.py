@@ -54,7 +54,7 @@ class LeetLetters(SentenceOperation):
         self.max_leet = max_leet
 
     def generate(self, sentence: str) -> List[str]:
-        random.seed(self.seed)
+        rng = self.rng()
         max_leet_replacements = int(self.max_leet * len(sentence))
         perturbed_texts = []
         # Perturb the input sentence max_output times
@@ -64,7 +64,7 @@ class LeetLetters(SentenceOperation):
             for idx, letter in enumerate(sentence):
                 if letter in leet_letter_mappings:
                     leet_candidates.append((idx, leet_letter_mappings[letter]))
-            leet_replacements = random.choices(leet_candidates, k=max_leet_replacements)
+            leet_replacements = rng.choices(leet_candidates, k=max_leet_replacements)
 
             # Conduct replacement
             sentence_list = list(sentence)
@@ -23,7 +23,7 @@ class LongerNamesNer(TaggingOperation):
     def generate(
         self, token_sequence: List[str], tag_sequence: List[str]
     ) -> List[Tuple[List[str], List[str]]]:
-        random.seed(self.seed)
+        rng = self.rng()
         token_seq = token_sequence.copy()
         tag_seq = tag_sequence.copy()
         perturbed_sentences = []
@@ -41,7 +41,7 @@ class LongerNamesNer(TaggingOperation):
                 if next < len(tag_seq) and i_tag == tag_seq[next]:
                     for _ in range(self.no_of_repeats):
                         random_upper_letter = chr(
-                            random.randint(ord("A"), ord("Z"))
+                            rng.randint(ord("A"), ord("Z"))
                         )
                         token_seq.insert(next, random_upper_letter)
                         tag_seq.insert(next, i_tag)
@@ -25,14 +25,14 @@ def translate(model, tokenizer, text, src_lang, target_lang):
 def mixed_language(
     model, tokenizer, text, prob_mix=0.1, src_lang="en", trg_lang="fr", seed=0
 ):
-    random.seed(seed)
+    rng = random.Random(seed)
 
     words = text.split()
     mixed_text = ""
     for word in words:
         if mixed_text != "":
             mixed_text += " "
-        if random.random() < prob_mix:
+        if rng.random() < prob_mix:
             plain_word = word.translate(
                 str.maketrans("", "", string.punctuation)
             ).strip()
@@ -86,7 +86,7 @@ class MixedLanguagePerturbation(SentenceOperation):
             prob_mix=self.prob_mix,
             src_lang=self.src_lang,
             trg_lang=self.trg_lang,
-            seed=self.seed,
+            seed=self.current_seed(),
         )
         return [perturbeds]
 
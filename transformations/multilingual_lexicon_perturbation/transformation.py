@@ -31,7 +31,7 @@ Ukrainian (uk), Urdu (ur), Uzbek (uz), Vietnamese (vi), Wolof (wo), Xhosa (xh),
 FOLDER_PATH = '/'.join(os.path.abspath(__file__).split('/')[:-1])
 
 def perturb_sentence(lexicon_df, text, prob_mix=0.5, mlt_src_lang="en", mlt_tgt_lang="zh", seed=0):
-    random.seed(seed)
+    rng = random.Random(seed)
     l_df = lexicon_df.set_index(mlt_src_lang)
 
     words = word_tokenize(text)
@@ -44,7 +44,7 @@ def perturb_sentence(lexicon_df, text, prob_mix=0.5, mlt_src_lang="en", mlt_tgt_
         if word.lower() not in l_df.index:
             mixed_text += word
         else:
-            rand_prob = random.random()
+            rand_prob = rng.random()
             if rand_prob < prob_mix:
                 plain_word = word.translate(str.maketrans('', '', string.punctuation)).strip().lower()
 
@@ -98,5 +98,5 @@ class MultilingualLexiconPerturbation(SentenceOperation):
         self.mlt_tgt_lang=mlt_tgt_lang
 
     def generate(self, sentence: str):
-        pertubed_sentence = perturb_sentence(lexicon_df=self.lexicon_df, text=sentence, prob_mix=self.prob_mix, mlt_src_lang=self.mlt_src_lang, mlt_tgt_lang=self.mlt_tgt_lang, seed=self.seed)
+        pertubed_sentence = perturb_sentence(lexicon_df=self.lexicon_df, text=sentence, prob_mix=self.prob_mix, mlt_src_lang=self.mlt_src_lang, mlt_tgt_lang=self.mlt_tgt_lang, seed=self.current_seed())
         return [pertubed_sentence]
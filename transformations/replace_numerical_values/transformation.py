@@ -3,26 +3,28 @@ import random
 import re
 from fractions import Fraction
 
-import spacy
 from num2words import num2words
 from word2number import w2n
 
-from initialize import spacy_nlp
+from initialize import SpacyBatchMixin, parse, spacy_model
 from interfaces.SentenceOperation import SentenceOperation
 from tasks.TaskTypes import TaskType
 
 
 class NumericalTransformation:
     nlp = None
+    # only the named entities are needed
+    pipe_disable = ["parser", "tagger", "attribute_ruler", "lemmatizer"]
 
     def __init__(self, seed=0, max_outputs=1):
-        self.nlp = spacy_nlp if spacy_nlp else spacy.load("en_core_web_sm")
+        self.nlp = spacy_model(owner=self)
         self.max_outputs = max_outputs
         self.seed = seed
 
-    def transform(self, input_text: str):
-        random.seed(self.seed)
-        doc = self.nlp(input_text)
+    # seed: the seed of this text, the one of the transformation by default
+    def transform(self, input_text: str, seed: int = None):
+        rng = random.Random(self.seed if seed is None else seed)
+        doc = parse(self.nlp, input_text, self.pipe_disable)
 
         for entity in doc.ents:
             new_value = None
@@ -55,9 +57,9 @@ class NumericalTransformation:
                     value_tens = self.value_tens_count(cardinal_value)
 
                     if isinstance(cardinal_value, numbers.Number):
-                        new_value = random.randint(0, value_tens)
+                        new_value = rng.randint(0, value_tens)
                     else:
-                        new_value = random.uniform(0.0, value_tens)
+                        new_value = rng.uniform(0.0, value_tens)
                         # Format value to same number of floating point values:
                         split_entity_value_list = cardinal_value.split(".")
                         floating_length = 0
@@ -78,7 +80,7 @@ class NumericalTransformation:
                     try:
                         num_value = w2n.word_to_num(cardinal_value)
                         value_tens = self.value_tens_count(num_value)
-                        new_value = random.randint(0, value_tens)
+                        new_value = rng.randint(0, value_tens)
                         new_value = num2words(new_value)
                     except ValueError:
                         print(
@@ -108,9 +110,10 @@ class NumericalTransformation:
                 return False
 
 
-class ReplaceNumericalValues(SentenceOperation):
+class ReplaceNumericalValues(SpacyBatchMixin, SentenceOperation):
     tasks = [TaskType.TEXT_CLASSIFICATION, TaskType.TEXT_TO_TEXT_GENERATION]
     languages = ["en"]
+    pipe_disable = NumericalTransformation.pipe_disable
 
     def __init__(self, seed=0, max_outputs=1):
         super().__init__(seed, max_outputs=max_outputs)
@@ -118,8 +121,14 @@ class ReplaceNumericalValues(SentenceOperation):
             seed, max_outputs
         )
 
+    @property
+    def nlp(self):
+        return self.numerical_transformation.nlp
+
     def generate(self, sentence: str):
-        result = self.numerical_transformation.transform(sentence)
+        result = self.numerical_transformation.transform(
+            sentence, self.current_seed()
+        )
         if self.verbose:
             print(f"Perturbed Input from {self.name()} : {result}")
         return [result]
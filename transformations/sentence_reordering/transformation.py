@@ -1,34 +1,37 @@
 import random
-from interfaces.SentenceOperation import SentenceOperation
-from tasks.TaskTypes import TaskType
-from initialize import spacy_nlp
-
-# for sent tokenizer
-import spacy
 
 # coref resolution from allennlp
 # ref: https://demo.allennlp.org/coreference-resolution
 from allennlp.predictors.predictor import Predictor
 
+# for sent tokenizer
+from initialize import SpacyBatchMixin, parse, spacy_model
+from interfaces.SentenceOperation import SentenceOperation
+from tasks.TaskTypes import TaskType
+
 """
 Shuffle sentence order
 """
 
 
-class SentenceReordering(SentenceOperation):
+class SentenceReordering(SpacyBatchMixin, SentenceOperation):
     tasks = [
         TaskType.TEXT_CLASSIFICATION,
         TaskType.TEXT_TO_TEXT_GENERATION,
     ]
     languages = ["en"]
     heavy = True
+    # only the sentence boundaries are needed
+    pipe_disable = ["tagger", "attribute_ruler", "lemmatizer", "ner"]
 
     def __init__(self, enable_coref=True, seed=42, max_outputs=1):
         super().__init__(seed, max_outputs=max_outputs)
         self.seed = seed
-        self.nlp = spacy_nlp if spacy_nlp else spacy.load("en_core_web_sm")
+        self.nlp = spacy_model(owner=self)
         self.enable_coref = enable_coref
         if enable_coref:
+            # the texts parsed are those resolved by the coref model
+            self.parsed_arguments = ()
             self.coref_model = Predictor.from_path(
                 "https://storage.googleapis.com/allennlp-public-models/coref-spanbert-large-2021.03.10.tar.gz"
             )
@@ -38,12 +41,14 @@ class SentenceReordering(SentenceOperation):
         return perturbed
 
     def sentence_reordering(self, text):
-        random.seed(self.seed)
+        rng = self.rng()
         # resolve coref
         if self.enable_coref:
             text = self.coref_model.coref_resolved(document=text)
 
         # tokenize and shuffle
-        text_split = [i.text for i in self.nlp(text).sents]
-        random.shuffle(text_split)
+        text_split = [
+            i.text for i in parse(self.nlp, text, self.pipe_disable).sents
+        ]
+        rng.shuffle(text_split)
         return " ".join(text_split)
@@ -2,9 +2,9 @@ import random
 import re
 
 import nltk
-import spacy
 from nltk.corpus import wordnet
 
+from initialize import SpacyBatchMixin, parse, spacy_model
 from interfaces.SentenceOperation import SentenceOperation
 from tasks.TaskTypes import TaskType
 
@@ -39,9 +39,9 @@ def untokenize(words):
 
 
 def synonym_substitution(
-    text, spacy_pipeline, seed=42, prob=0.5, max_outputs=1
+    text, spacy_pipeline, seed=42, prob=0.5, max_outputs=1, disable=()
 ):
-    random.seed(seed)
+    rng = random.Random(seed)
     upos_wn_dict = {
         "VERB": "v",
         "NOUN": "n",
@@ -49,8 +49,9 @@ def synonym_substitution(
         "ADJ": "s",
     }
 
-    doc = spacy_pipeline(text)
+    doc = parse(spacy_pipeline, text, disable)
     results = []
+    seen = set()
     for _ in range(max_outputs):
         result = []
         for token in doc:
@@ -62,15 +63,16 @@ def synonym_substitution(
                 syns = wordnet.synsets(word, pos=wn_pos)
                 syns = [syn.name().split(".")[0] for syn in syns]
                 syns = [syn for syn in syns if syn.lower() != word.lower()]
-                if len(syns) > 0 and random.random() < prob:
-                    result.append(random.choice(syns).replace("_", " "))
+                if len(syns) > 0 and rng.random() < prob:
+                    result.append(rng.choice(syns).replace("_", " "))
                 else:
                     result.append(word)
 
         # detokenize sentences
         result = untokenize(result)
-        if result not in results:
+        if result not in seen:
             # make sure there is no dup in results
+            seen.add(result)
             results.append(result)
     return results
 
@@ -80,25 +82,32 @@ Substitute words with synonyms using stanza (for POS) and wordnet via nltk (for
 """
 
 
-class SynonymSubstitution(SentenceOperation):
+class SynonymSubstitution(SpacyBatchMixin, SentenceOperation):
     tasks = [
         TaskType.TEXT_CLASSIFICATION,
         TaskType.TEXT_TO_TEXT_GENERATION,
     ]
     languages = ["en"]
+    # only the part-of-speech tags are needed
+    pipe_disable = ["parser", "ner", "lemmatizer"]
 
     def __init__(self, seed=42, prob=0.5, max_outputs=1):
         super().__init__(seed, max_outputs=max_outputs)
-        self.spacy_pipeline = spacy.load("en_core_web_sm")
+        self.spacy_pipeline = spacy_model(owner=self)
         self.prob = prob
         nltk.download("wordnet")
 
+    @property
+    def nlp(self):
+        return self.spacy_pipeline
+
     def generate(self, sentence: str):
         perturbed = synonym_substitution(
             text=sentence,
             spacy_pipeline=self.spacy_pipeline,
-            seed=self.seed,
+            seed=self.current_seed(),
             prob=self.prob,
             max_outputs=self.max_outputs,
+            disable=self.pipe_disable,
         )
         return perturbed
@@ -76,53 +76,53 @@ class VariableCharPerturbation(SentenceOperation):
         return word[:i]+d+word[i:]
 
     def generate(self, sentence:str) -> List[str]:
-        random.seed(self.seed)
+        rng = self.rng()
         perturbed_texts = []
         # Perturb the input sentence max_output times
         for _ in itertools.repeat(None, self.max_outputs):
             new = []
             for i in sentence.split():
-              if self.probability>random.uniform(0, 1) and len(i)>3 and i.isalpha(): # enter perturbation loop
+              if self.probability>rng.uniform(0, 1) and len(i)>3 and i.isalpha(): # enter perturbation loop
                 ch = []
                 for j in range(len(self.operations)):
                     if self.operations[j]:
                         ch.append(j+1)
 
-                choice = random.choice(ch)
+                choice = rng.choice(ch)
                 if choice == 1: # swap
-                  swap_point = random.randint(0,len(i)-1)
+                  swap_point = rng.randint(0,len(i)-1)
                   if swap_point == 0:
                     swap_target = 1
                   elif swap_point == len(i)-1:
                     swap_target = swap_point - 1
                   else:
                     seqs = [swap_point - 1,swap_point+1]
-                    swap_target = random.choice(seqs)
+                    swap_target = rng.choice(seqs)
                   swapped_word = self.swap(i,swap_point,swap_target)
 
                   new.append(swapped_word)
 
                 elif choice == 2: # delete
-                  delpoint = random.randint(0,len(i)-1)
+                  delpoint = rng.randint(0,len(i)-1)
                   del_word = self.delete(i,delpoint)
                   new.append(del_word)
 
                 elif choice == 3: #insert
-                  ipoint = random.randint(0,len(i)-1)
+                  ipoint = rng.randint(0,len(i)-1)
                   alphabets = "abcdefghijklmnopqrstuvwxyz"
-                  alphachoice = random.randint(0,len(alphabets)-1)
+                  alphachoice = rng.randint(0,len(alphabets)-1)
                   i_word = self.insert(i,ipoint,alphabets[alphachoice])
                   new.append(i_word)
                 
                 elif choice == 4: # duplicate
-                  dpoint = random.randint(0,len(i)-1)
+                  dpoint = rng.randint(0,len(i)-1)
                   d_word = self.duplicate(i,dpoint)
                   new.append(d_word)
 
                 else: # substitute
-                  spoint = random.randint(0,len(i)-1)
+                  spoint = rng.randint(0,len(i)-1)
                   alphabets = "abcdefghijklmnopqrstuvwxyz"
-                  alphachoice = random.randint(0,len(alphabets)-1)
+                  alphachoice = rng.randint(0,len(alphabets)-1)
                   s_word = self.substitute(i,spoint,alphabets[alphachoice])
                   new.append(s_word)
 